@@ -0,0 +1,100 @@
+import argparse
+import json
+import platform
+import random
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+from openapi_sorter import __version__
+from openapi_sorter.rules import ORDER_LEXICAL, ORDER_NATURAL, SortRule, SortRules, get_sort_key
+
+# 巨大なセクション(components.schemasなど)の並べ替えだけを、ルールを導入する前の実装(キーの一覧を並べ替えてから.getで辞書を作り直す)と比較する
+
+ORDERS = [ORDER_LEXICAL, ORDER_NATURAL]
+
+
+def generate_section(size: int, seed: int = 0) -> Dict[str, Any]:
+    names = [f'Schema{i}' for i in range(size)]
+    random.Random(seed).shuffle(names)
+
+    return {name: {'type': 'object'} for name in names}
+
+
+def baseline_sort(document: dict, order: str) -> dict:
+    section = document['components']['schemas']
+
+    if order == ORDER_LEXICAL:
+        # ルールを導入する前のOpenApiSorter._sort_dictと同じ処理
+        keys = [key for key, _ in section.items()]
+        keys = sorted(keys, key=lambda x: x)
+    else:
+        # 以前は自然順に対応していなかったので、同じ処理で比較用の値だけを変える
+        sort_key = get_sort_key(order)
+        keys = [key for key, _ in section.items()]
+        keys = sorted(keys, key=lambda x: sort_key(x))
+
+    document['components']['schemas'] = {key: section.get(key) for key in keys}
+
+    return document
+
+
+def measure(sort: Callable[[dict], Any], section: Dict[str, Any], repeat: int) -> float:
+    seconds = []
+    for _ in range(repeat):
+        # 毎回同じ並び順の入力から始める(コピーは計測に含めない)
+        document = {'components': {'schemas': dict(section)}}
+
+        start_time = perf_counter()
+        sort(document)
+        seconds.append(perf_counter() - start_time)
+
+    return min(seconds)
+
+
+def run(size: int, repeat: int) -> Dict[str, dict]:
+    unsorted_section = generate_section(size)
+    sorted_section = {key: unsorted_section[key] for key in sorted(unsorted_section)}
+
+    results = {}
+    for order in ORDERS:
+        rules = SortRules([SortRule(path=('components', 'schemas'), order=order)])
+
+        for state, section in [('unsorted', unsorted_section), ('sorted', sorted_section)]:
+            if order == ORDER_NATURAL and state == 'sorted':
+                section = baseline_sort({'components': {'schemas': dict(section)}}, order)['components']['schemas']
+
+            baseline = measure(lambda document: baseline_sort(document, order), section, repeat)
+            optimized = measure(rules.sort, section, repeat)
+
+            results[f'{order}-{state}'] = {'baseline': baseline, 'rules': optimized, 'speedup': baseline / optimized}
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the reorder step of a large section')
+    parser.add_argument('--schemas', type=int, default=20000, help='number of entries in the section')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs per case')
+    parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+
+    args = parser.parse_args()
+
+    results = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'schemas': args.schemas,
+        'results': run(args.schemas, args.repeat),
+    }
+
+    print(f"openapi-sorter {results['version']} / Python {results['python']} / {results['schemas']} schemas")
+    print(f"{'case':<20}{'baseline':>12}{'rules':>12}{'speedup':>10}")
+    for name, measured in results['results'].items():
+        print(f"{name:<20}{measured['baseline']:>12.4f}{measured['rules']:>12.4f}{measured['speedup']:>9.1f}x")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf_8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.spec_generator import SIZES, generate_spec_yaml
+from openapi_sorter import __version__
+from openapi_sorter.backends import BACKEND_AUTO, BACKENDS, get_backend
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+# 読み込み・ソート・YAML変換・書き込みのフェーズごとに処理時間とピークメモリを計測する
+
+PHASES = ['load', 'sort', 'dump', 'write']
+
+
+def measure(func: Callable, repeat: int, setup: Optional[Callable[[], tuple]] = None) -> Dict[str, float]:
+    # 処理時間はtracemallocを無効にした状態で計測し(最小値を採用)、ピークメモリは別に1回だけ計測する
+    # 入力を書き換える処理は、毎回setupで用意した新しい入力を渡す(setupは計測に含めない)
+    seconds = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start_time = perf_counter()
+        func(*args)
+        seconds.append(perf_counter() - start_time)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(seconds), 'peak_bytes': peak_bytes}
+
+
+def run_size(name: str, options: dict, backend: str, repeat: int, tmpdir: str) -> dict:
+    yaml_backend = get_backend(backend)
+
+    input_file = os.path.join(tmpdir, f'{name}.yaml')
+    output_file = os.path.join(tmpdir, f'{name}.sorted.yaml')
+
+    with open(input_file, mode='w', encoding='utf_8', newline='\n') as f:
+        f.write(generate_spec_yaml(**options))
+
+    size = os.path.getsize(input_file)
+
+    def load():
+        with open(input_file, mode='rb') as f:
+            return OpenApiSorter.load_yaml(f.read().decode('utf_8'), backend=yaml_backend)
+
+    # _sort_dictは引数の辞書を並べ替えるため、ソートは毎回読み込んだままの(ソートされていない)コピーに対して計測する
+    openapi_json = load()
+    sorted_json = OpenApiSorter._sort_dict(load())
+    dumped_content = OpenApiSorter._dump(sorted_json, backend=yaml_backend).encode('utf_8')
+
+    def remove_output() -> tuple:
+        # 毎回書き込みが発生するように出力先を削除しておく
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        return ()
+
+    phases = {
+        'load': measure(load, repeat),
+        'sort': measure(OpenApiSorter._sort_dict, repeat, setup=lambda: (copy.deepcopy(openapi_json),)),
+        'dump': measure(lambda: OpenApiSorter._dump(sorted_json, backend=yaml_backend), repeat),
+        'write': measure(
+            lambda: OpenApiSorter._write_if_changed(output_file, dumped_content), repeat, setup=remove_output
+        ),
+    }
+
+    for phase in phases.values():
+        phase['mb_per_s'] = size / 1024 / 1024 / phase['seconds'] if phase['seconds'] else None
+
+    return {'size': name, 'options': options, 'bytes': size, 'phases': phases}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    regressions = []
+
+    baseline_sizes = {result['size']: result for result in baseline.get('results', [])}
+
+    for result in results['results']:
+        baseline_result = baseline_sizes.get(result['size'])
+        if not baseline_result:
+            continue
+
+        for phase in PHASES:
+            seconds = result['phases'][phase]['seconds']
+            baseline_seconds = baseline_result['phases'].get(phase, {}).get('seconds')
+            if baseline_seconds and seconds > baseline_seconds * (1 + threshold):
+                regressions.append(
+                    f"{result['size']}/{phase}: {seconds:.4f}s > {baseline_seconds:.4f}s (+{threshold:.0%} allowed)"
+                )
+
+    return regressions
+
+
+def print_results(results: dict):
+    print(f"openapi-sorter {results['version']} / Python {results['python']} / backend: {results['backend']}")
+    print(f"{'size':<10}{'phase':<8}{'seconds':>12}{'MB/s':>10}{'peak MiB':>12}")
+    for result in results['results']:
+        for phase in PHASES:
+            measured = result['phases'][phase]
+            mb_per_s = f"{measured['mb_per_s']:.2f}" if measured['mb_per_s'] else '-'
+            print(
+                f"{result['size']:<10}{phase:<8}{measured['seconds']:>12.4f}{mb_per_s:>10}"
+                f"{measured['peak_bytes'] / 1024 / 1024:>12.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the phases of OpenAPI-Sorter with synthetic specs')
+    parser.add_argument('--sizes', default='small,medium', help=f"comma separated preset sizes ({', '.join(SIZES)})")
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_AUTO)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs per phase (the minimum is used)')
+    parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with the JSON results of a previous run')
+    parser.add_argument(
+        '--threshold', type=float, default=0.2, help='allowed slowdown against the baseline (default: 0.2 = 20%%)'
+    )
+
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown_sizes = [size for size in sizes if size not in SIZES]
+    if unknown_sizes:
+        parser.error(f"unknown sizes: {', '.join(unknown_sizes)}")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {
+            'version': __version__,
+            'python': platform.python_version(),
+            'backend': get_backend(args.backend).name,
+            'results': [run_size(size, SIZES[size], args.backend, args.repeat, tmpdir) for size in sizes],
+        }
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf_8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, mode='r', encoding='utf_8') as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'regression: {regression}')
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import random
+from typing import Any, Dict, Type
+
+import yaml
+
+# ベンチマーク・テスト用に、指定したサイズのOpenAPIドキュメントを生成する
+# キーの順番はシードに応じてシャッフルされる(ソートされていない状態になる)
+
+METHODS = ['get', 'post', 'put', 'patch', 'delete']
+
+# MATCH_REGEX/SEARCH_REGEXに該当する文字列や、複数行・Unicodeの文字列
+SPECIAL_STRINGS = [
+    '#hash',
+    '-dash',
+    '*asterisk',
+    '&ampersand',
+    '!exclamation',
+    '?question',
+    '|pipe',
+    '>greater',
+    '<less',
+    '=equal',
+    '%percent',
+    '@at',
+    'key: value',
+    'list [1, 2]',
+    'map {a: b}',
+    'say "hello"',
+    'on',
+    'yes',
+    '123',
+    '1.0',
+    'null',
+    'テスト',
+    'Ünïcödé ✓',
+]
+
+WORDS = [
+    'alpha',
+    'bravo',
+    'charlie',
+    'delta',
+    'echo',
+    'foxtrot',
+    'golf',
+    'hotel',
+    'india',
+    'juliett',
+    'kilo',
+    'lima',
+    'mike',
+    'november',
+    'oscar',
+    'papa',
+]
+
+SIZES = {
+    'small': {'paths': 100, 'schemas': 100, 'tags': 10, 'depth': 2, 'description_lines': 2},
+    'medium': {'paths': 1000, 'schemas': 1000, 'tags': 50, 'depth': 3, 'description_lines': 3},
+    'large': {'paths': 5000, 'schemas': 5000, 'tags': 200, 'depth': 3, 'description_lines': 5},
+}
+
+
+def generate_spec(
+    paths: int = 100,
+    schemas: int = 100,
+    tags: int = 10,
+    depth: int = 2,
+    description_lines: int = 2,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    rand = random.Random(seed)
+
+    def words(count: int) -> str:
+        return ' '.join(rand.choice(WORDS) for _ in range(count))
+
+    def description() -> str:
+        if description_lines <= 1:
+            return words(8)
+        lines = [words(8) for _ in range(description_lines)]
+        lines.insert(rand.randrange(len(lines)), rand.choice(SPECIAL_STRINGS))
+        return '\n'.join(lines)
+
+    def schema(level: int) -> Dict[str, Any]:
+        properties = {}
+        for i in range(3):
+            name = f'{rand.choice(WORDS)}_{i}'
+            if level < depth:
+                properties[name] = schema(level + 1)
+            else:
+                properties[name] = {
+                    'type': 'string',
+                    'description': rand.choice(SPECIAL_STRINGS),
+                    'example': rand.choice(SPECIAL_STRINGS),
+                }
+        return {'type': 'object', 'description': description(), 'properties': properties}
+
+    schema_names = [f'{rand.choice(WORDS).capitalize()}{i}' for i in range(schemas)]
+    tag_names = [f'{rand.choice(WORDS)}-{i}' for i in range(tags)]
+
+    generated_paths = {}
+    for i in range(paths):
+        path = f'/{rand.choice(WORDS)}/{i}/{{{rand.choice(WORDS)}_id}}'
+        operations = {}
+        for method in rand.sample(METHODS, rand.randint(1, len(METHODS))):
+            schema_name = rand.choice(schema_names) if schema_names else None
+            response = {'description': 'OK'}
+            if schema_name:
+                response['content'] = {'application/json': {'schema': {'$ref': f'#/components/schemas/{schema_name}'}}}
+            operations[method] = {
+                'summary': words(4),
+                'description': description(),
+                'operationId': f'{method}-{i}',
+                'tags': [rand.choice(tag_names)] if tag_names else [],
+                'responses': {'200': response},
+            }
+        generated_paths[path] = operations
+
+    request_bodies = {}
+    for name in rand.sample(schema_names, min(len(schema_names), max(1, schemas // 4))) if schema_names else []:
+        request_bodies[f'{name}Body'] = {
+            'content': {'application/json': {'schema': {'$ref': f'#/components/schemas/{name}'}}}
+        }
+
+    generated_schemas = {name: schema(1) for name in schema_names}
+
+    spec = {
+        'openapi': '3.0.0',
+        'info': {'title': 'benchmark spec', 'version': '1.0', 'description': description()},
+        'servers': [{'url': 'http://localhost:3000'}],
+        'paths': generated_paths,
+        'components': {'schemas': generated_schemas, 'requestBodies': request_bodies},
+        'tags': [{'name': name, 'description': words(4)} for name in tag_names],
+    }
+
+    return spec
+
+
+def generate_spec_yaml(dumper: Type = yaml.SafeDumper, **kwargs) -> str:
+    # 大きなspecを繰り返し生成する場合(テストなど)はdumper=yaml.CSafeDumperで生成時間を短縮できる
+    return yaml.dump(generate_spec(**kwargs), allow_unicode=True, sort_keys=False, Dumper=dumper)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic OpenAPI YAML file')
+    parser.add_argument('--size', choices=list(SIZES), help='preset size (overrides the individual options)')
+    parser.add_argument('--paths', type=int, default=100)
+    parser.add_argument('--schemas', type=int, default=100)
+    parser.add_argument('--tags', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--description-lines', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True, help='Path to the output file')
+
+    args = parser.parse_args()
+
+    options = {
+        'paths': args.paths,
+        'schemas': args.schemas,
+        'tags': args.tags,
+        'depth': args.depth,
+        'description_lines': args.description_lines,
+    }
+    if args.size:
+        options = dict(SIZES[args.size])
+
+    with open(args.output, mode='w', encoding='utf_8', newline='\n') as f:
+        f.write(generate_spec_yaml(seed=args.seed, **options))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from statistics import median
+from time import perf_counter
+from typing import Dict, List
+
+from benchmarks.spec_generator import generate_spec_yaml
+from openapi_sorter import __version__
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+# pre-commitフックのように小さいファイル1つで起動する場合の所要時間(インタプリタ起動 + import + 処理)を計測する
+
+MAIN = 'from openapi_sorter.cli import main; main()'
+
+
+def commands(input_file: str) -> Dict[str, List[str]]:
+    return {
+        'python': [sys.executable, '-c', 'pass'],
+        'import': [sys.executable, '-c', 'import openapi_sorter.cli'],
+        'check': [sys.executable, '-c', MAIN, input_file, '--check'],
+        'check-no-validate': [sys.executable, '-c', MAIN, input_file, '--check', '--no-validate'],
+    }
+
+
+def measure(command: List[str], repeat: int) -> Dict[str, float]:
+    seconds = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        seconds.append(perf_counter() - start_time)
+
+    return {'min': min(seconds), 'median': median(seconds)}
+
+
+def run(repeat: int, tmpdir: str) -> dict:
+    input_file = os.path.join(tmpdir, 'small.yaml')
+
+    with open(input_file, mode='w', encoding='utf_8', newline='\n') as f:
+        f.write(generate_spec_yaml(paths=5, schemas=5, tags=2))
+
+    # チェックモードが成功するようにソートしておく
+    OpenApiSorter.sort(input_files=[input_file], is_overwrite=True)
+
+    return {name: measure(command, repeat) for name, command in commands(input_file).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the OpenAPI-Sorter command')
+    parser.add_argument('--repeat', type=int, default=10, help='number of runs per command')
+    parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {
+            'version': __version__,
+            'python': platform.python_version(),
+            'results': run(args.repeat, tmpdir),
+        }
+
+    print(f"openapi-sorter {results['version']} / Python {results['python']}")
+    print(f"{'command':<20}{'min':>10}{'median':>10}")
+    for name, measured in results['results'].items():
+        print(f"{name:<20}{measured['min']:>10.4f}{measured['median']:>10.4f}")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf_8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
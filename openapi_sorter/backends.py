@@ -0,0 +1,43 @@
+from typing import Any, NamedTuple, Type
+
+import yaml
+from openapi_sorter.dumper import DUMP_OPTIONS, COpenApiDumper, OpenApiDumper
+
+# PyYAMLがlibyamlを使ってビルドされている場合はCのLoader/Dumperを使い、そうでなければPure Pythonにフォールバックする
+
+BACKEND_AUTO = 'auto'
+BACKEND_C = 'c'
+BACKEND_PYTHON = 'python'
+
+BACKENDS = [BACKEND_AUTO, BACKEND_C, BACKEND_PYTHON]
+
+
+class YamlBackend(NamedTuple):
+    name: str
+    loader: Type
+    dumper: Type
+
+    def dump(self, data: Any) -> str:
+        return yaml.dump(data, Dumper=self.dumper, **DUMP_OPTIONS)
+
+
+def is_c_available() -> bool:
+    return getattr(yaml, '__with_libyaml__', False) and hasattr(yaml, 'CSafeLoader') and COpenApiDumper is not None
+
+
+# バックエンドはファイルごとに作らず、設定済みのものを使い回す
+PYTHON_BACKEND = YamlBackend(name=BACKEND_PYTHON, loader=yaml.SafeLoader, dumper=OpenApiDumper)
+C_BACKEND = YamlBackend(name=BACKEND_C, loader=yaml.CSafeLoader, dumper=COpenApiDumper) if is_c_available() else None
+
+
+def get_backend(name: str = BACKEND_AUTO) -> YamlBackend:
+    if name not in BACKENDS:
+        raise ValueError(f'unknown backend: {name}')
+
+    if name == BACKEND_C and not is_c_available():
+        raise ValueError('the c backend is not available (PyYAML is built without libyaml)')
+
+    if name != BACKEND_PYTHON and C_BACKEND:
+        return C_BACKEND
+
+    return PYTHON_BACKEND
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from openapi_sorter import __version__
+
+DEFAULT_CACHE_MAX_SIZE = 16 * 1024 * 1024
+
+# 出力(並び順・YAMLの書式・JSONの出力)が変わる変更のたびに上げる
+# キーには__version__も含めるが、リリースの間の変更でも前の出力を「ソート済み」として扱わないようにする
+# 1: 最初のキャッシュ, 2: 文字列のスタイルの判定, 3: 専用のDumper, 4: 並べ替えのルール, 5: JSON形式の入出力
+OUTPUT_FORMAT_VERSION = 5
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'openapi-sorter')
+
+
+class SortCache:
+    # 入力内容のハッシュ + ソーターと出力形式のバージョン + オプションをキーにして「ソート済み」であることを記録する
+    # エントリは1キー1ファイルで保存するので、複数のワーカープロセスから同時に書き込んでも壊れない
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = max_size
+
+    def key(self, content: bytes, namespace: str = 'sorted', **options) -> str:
+        digest = self._digest(namespace, options)
+        digest.update(content)
+        return digest.hexdigest()
+
+    def file_key(self, path: str, namespace: str = 'sorted', **options) -> str:
+        # 巨大なファイルでもメモリに載せずにハッシュを計算する(keyと同じ値になる)
+        digest = self._digest(namespace, options)
+        with open(path, mode='rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _digest(cls, namespace: str, options: dict):
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps([namespace, __version__, OUTPUT_FORMAT_VERSION, options], sort_keys=True).encode('utf_8')
+        )
+        digest.update(b'\0')
+        return digest
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def contains(self, key: str) -> bool:
+        entry_path = self._entry_path(key)
+
+        try:
+            # ヒットしたエントリは更新日時を更新し、追い出しの対象から外す
+            os.utime(entry_path)
+            return True
+        except OSError:
+            return False
+
+    def add(self, key: str):
+        entry_path = self._entry_path(key)
+
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path))
+            with os.fdopen(fd, mode='w', encoding='utf_8') as f:
+                f.write(__version__)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # キャッシュに書き込めなくてもソート自体は成功しているので無視する
+            pass
+
+    def evict(self):
+        entries = []
+        total_size = 0
+
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # エントリは小さいのでファイルサイズではなくディスク上の使用量で数える
+                size = getattr(stat, 'st_blocks', 0) * 512 or stat.st_size
+                entries.append((stat.st_mtime, size, path))
+                total_size += size
+
+        if total_size <= self.max_size:
+            return
+
+        # 古いものから順に削除する
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total_size -= size
+            if total_size <= self.max_size:
+                break
@@ -0,0 +1,96 @@
+import os
+import subprocess
+from typing import Dict, Iterable, Iterator, List, Set
+
+from openapi_sorter.refs import resolve_ref, scan_refs
+
+# --since: gitで指定したリビジョンから変更されたファイルと、$refで変更されたファイルを参照している入力ファイルだけを処理する
+# 参照関係はパースせずにテキストから拾う(全ファイルのパースを省略するため)
+
+
+class GitError(Exception):
+    pass
+
+
+def _git(args: List[str], cwd: str) -> bytes:
+    try:
+        completed = subprocess.run(['git', *args], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise GitError(f'git cannot be run: {e}') from e
+
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.decode('utf_8', errors='replace').strip())
+
+    return completed.stdout
+
+
+def changed_files(since: str, cwd: str = '.') -> Set[str]:
+    # リビジョンとの差分(コミット済み・ステージ済み・作業ツリーの変更)と、追跡されていない新しいファイルを実パスで返す
+    toplevel = os.fsdecode(_git(['rev-parse', '--show-toplevel'], cwd).rstrip(b'\n'))
+
+    # 'since -- 'のように区切らないと、リビジョンとファイル名が同じ場合に曖昧になる
+    output = _git(['diff', '--name-only', '-z', '--no-renames', since, '--'], toplevel)
+    output += _git(['ls-files', '--others', '--exclude-standard', '-z'], toplevel)
+
+    return {os.path.realpath(os.path.join(toplevel, os.fsdecode(path))) for path in output.split(b'\0') if path}
+
+
+class ChangeFilter:
+    def __init__(self, changed: Set[str]):
+        self.changed = changed
+        # 実パス → 変更されたファイルを参照しているかどうか(調べ終わったファイルのみ)
+        self.results: Dict[str, bool] = {}
+        self.refs: Dict[str, List[str]] = {}
+
+    def filter(self, input_files: Iterable[str]) -> Iterator[str]:
+        # 入力ファイルの一覧は必要になった分だけ読み進める
+        for input_file in input_files:
+            if self.is_changed(input_file):
+                yield input_file
+
+    def is_changed(self, path: str) -> bool:
+        key = os.path.realpath(path)
+
+        if key not in self.results:
+            self.results[key] = self._reaches_changed(key)
+
+        return self.results[key]
+
+    def _reaches_changed(self, key: str) -> bool:
+        # 参照先を辿り、変更されたファイルが見つかった時点で打ち切る
+        visited = {key}
+        stack = [key]
+
+        while stack:
+            current = stack.pop()
+
+            if current in self.changed or self.results.get(current):
+                return True
+
+            # 調べ終わったファイルから辿れるファイルは変更されていない
+            if current != key and current in self.results:
+                continue
+
+            for target in self._refs(current):
+                if target not in visited:
+                    visited.add(target)
+                    stack.append(target)
+
+        # 最後まで辿れたファイルはどれも変更されたファイルを参照していない
+        for current in visited:
+            self.results[current] = False
+
+        return False
+
+    def _refs(self, key: str) -> List[str]:
+        if key not in self.refs:
+            try:
+                with open(key, mode='r', encoding='utf_8', errors='replace') as f:
+                    content = f.read()
+            except OSError:
+                content = ''
+
+            targets = [os.path.realpath(resolve_ref(key, ref)) for ref in scan_refs(content)]
+            self.refs[key] = [target for target in targets if os.path.isfile(target)]
+
+        return self.refs[key]
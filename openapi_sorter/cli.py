@@ -1,10 +1,76 @@
 import argparse
+import locale
+import os
 import sys
+from itertools import chain
+from typing import BinaryIO, Iterator, List
 
-from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.backends import BACKEND_AUTO, BACKENDS, get_backend
+from openapi_sorter.cache import DEFAULT_CACHE_MAX_SIZE, SortCache
+from openapi_sorter.changes import ChangeFilter, GitError, changed_files
+from openapi_sorter.formats import FORMAT_AUTO, FORMAT_JSON, FORMATS
+from openapi_sorter.instrumentation import TIMINGS_FORMATS, TIMINGS_TEXT, TimingReporter
+from openapi_sorter.limits import DEFAULT_LIMITS, ResourceLimits
+from openapi_sorter.openapi_sorter import DEFAULT_VALIDATE_TIMEOUT, STDIO, OpenApiSorter, SortFileResult
+from openapi_sorter.rules import RuleError, load_rules
+from openapi_sorter.server import ServerError, default_socket_path, forward, serve
+from openapi_sorter.watcher import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, Watcher
+
+# --files-fromのファイル一覧を読み込む単位
+FILE_LIST_CHUNK_SIZE = 64 * 1024
+
+
+def print_changed(result: SortFileResult):
+    # 標準出力にはソート結果を出力するので、メッセージは出さない
+    if result.is_changed and result.output_file != STDIO:
+        print(f'{result.output_file} was sorted.')
+
+
+def iter_file_list(stream: BinaryIO, separator: bytes = b'\n') -> Iterator[str]:
+    # 一覧全体をメモリに載せず、読み込んだ分から順にファイル名を返す
+    buffer = b''
+
+    for chunk in iter(lambda: stream.read(FILE_LIST_CHUNK_SIZE), b''):
+        *paths, buffer = (buffer + chunk).split(separator)
+        yield from _decode_paths(paths, separator)
+
+    yield from _decode_paths([buffer], separator)
+
+
+def _decode_paths(paths: List[bytes], separator: bytes) -> Iterator[str]:
+    for path in paths:
+        if separator == b'\n':
+            path = path.rstrip(b'\r')
+        if path:
+            yield os.fsdecode(path)
+
+
+def print_errors(errors: List[str]):
+    for error in errors:
+        print(error)
+
+
+def serve_main(argv: List[str]):
+    parser = argparse.ArgumentParser(
+        prog='openapi_sorter serve',
+        description='Keep a sorter process running on a Unix domain socket. '
+        'Other openapi_sorter commands forward their work to it while it is running.',
+    )
+    parser.add_argument('--socket', metavar='PATH', help=f'Path of the socket (default: {default_socket_path()})')
+
+    args = parser.parse_args(argv)
+
+    try:
+        serve(args.socket, on_ready=lambda server: print(f'listening on {server.socket_path}', file=sys.stderr))
+    except ServerError as e:
+        parser.error(str(e))
 
 
 def main():
+    if sys.argv[1:2] == ['serve']:
+        serve_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description='OpenAPI-Sorter is a utility for parsing, sorting,'
         ' and outputting OpenAPI YAML files by organizing path,'
@@ -15,29 +81,317 @@ def main():
 
     group = parser.add_mutually_exclusive_group(required=True)
 
-    parser.add_argument('inputs', metavar='FILE', nargs='+', help='one or more input files to process')
+    parser.add_argument(
+        'inputs', metavar='FILE', nargs='*', help='one or more input files to process (-: read standard input)'
+    )
 
-    group.add_argument('-o', '--output', help='Path to the output file')
+    group.add_argument('-o', '--output', help='Path to the output file (-: write to standard output)')
     group.add_argument('--overwrite', action='store_true', help='Overwrite to the input file')
+    group.add_argument(
+        '--check', action='store_true', help='Only check that the input files are sorted (exit 1 if not)'
+    )
+    group.add_argument(
+        '--watch', metavar='DIR', help='Keep running and sort the YAML files in DIR in place whenever they change'
+    )
+
+    parser.add_argument(
+        '--files-from',
+        metavar='FILE',
+        type=argparse.FileType('rb'),
+        help='Read the input files from FILE, one per line (-: read the list from standard input)',
+    )
+    parser.add_argument(
+        '-0', '--null', action='store_true', help='The file names in --files-from are separated by NUL characters'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=BACKENDS,
+        default=BACKEND_AUTO,
+        help='YAML loader/dumper backend (auto: use libyaml when available)',
+    )
+    parser.add_argument(
+        '--format',
+        choices=FORMATS,
+        default=FORMAT_AUTO,
+        help='Output format (auto: the extension of the output file, otherwise the format of the input file)',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes used to sort multiple files (default: CPU count)',
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Sort at the YAML event level without loading the whole document (for very large files)',
+    )
+    parser.add_argument(
+        '--splice',
+        action='store_true',
+        help='Reorder the original text blocks instead of re-emitting YAML (keeps comments, anchors and quoting)',
+    )
+    parser.add_argument(
+        '--splice-verify',
+        action='store_true',
+        help='With --splice, always parse the reordered text again and compare it with the sorted document',
+    )
+    parser.add_argument(
+        '--timings', choices=TIMINGS_FORMATS, help='Print the time spent in each phase per file to stderr'
+    )
+    parser.add_argument('--profile', metavar='PATH', help='Write cProfile stats of the slowest file to PATH')
+    parser.add_argument(
+        '--cache', action='store_true', help='Skip files whose content is recorded as already sorted in the cache'
+    )
+    parser.add_argument('--cache-dir', help='Directory of the cache (implies --cache)')
+    parser.add_argument(
+        '--cache-max-size',
+        type=int,
+        default=DEFAULT_CACHE_MAX_SIZE,
+        help='Maximum size of the cache directory in bytes',
+    )
+    parser.add_argument(
+        '--follow-refs',
+        action='store_true',
+        help='Sort files split with $ref together: parse each file once and sort referenced files first',
+    )
+    parser.add_argument(
+        '--since',
+        metavar='REV',
+        help='Only process the input files changed since the git revision REV, '
+        'and the input files that reference a changed file with $ref',
+    )
+    parser.add_argument(
+        '--config',
+        metavar='PATH',
+        help='Sort rules configuration (default: .openapi-sorter.yaml or [tool.openapi-sorter] in pyproject.toml)',
+    )
+    validate_group = parser.add_mutually_exclusive_group()
+    validate_group.add_argument(
+        '--validate',
+        dest='validate_schema',
+        action='store_true',
+        help='Validate the input files against the OpenAPI schema (cached with --cache)',
+    )
+    validate_group.add_argument(
+        '--no-validate',
+        dest='validate',
+        action='store_false',
+        help='Skip the OpenAPI check and only require the input to be YAML (faster startup)',
+    )
+    parser.add_argument(
+        '--validate-timeout',
+        type=float,
+        default=DEFAULT_VALIDATE_TIMEOUT,
+        help='Seconds the schema validation of a single file may take (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--max-bytes',
+        type=int,
+        default=DEFAULT_LIMITS.max_bytes,
+        help='Reject input files larger than this many bytes before reading them (0: no limit, default: %(default)s)',
+    )
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        default=0,
+        help='Reject documents nested deeper than this many levels (0: no limit, default: %(default)s)',
+    )
+    parser.add_argument(
+        '--max-nodes',
+        type=int,
+        default=DEFAULT_LIMITS.max_nodes,
+        help='Reject documents with more nodes, counting expanded aliases (0: no limit, default: %(default)s)',
+    )
+    parser.add_argument(
+        '--max-aliases',
+        type=int,
+        default=DEFAULT_LIMITS.max_aliases,
+        help='Reject documents with more aliases (*name) than this (0: no limit, default: %(default)s)',
+    )
+    parser.add_argument(
+        '--no-server',
+        action='store_true',
+        help="Do not forward to a running 'openapi_sorter serve' process",
+    )
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help='Seconds between scans of the watched directory',
+    )
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        help='Seconds a file has to stay unchanged before it is sorted in watch mode',
+    )
 
     args = parser.parse_args()
 
-    if args.output and len(args.inputs) > 1:
+    if args.watch:
+        if args.inputs:
+            parser.error("the '--watch' option does not take input files")
+        if not os.path.isdir(args.watch):
+            parser.error(f"argument --watch: {args.watch} is not a directory")
+    elif not args.inputs and not args.files_from:
+        parser.error('the following arguments are required: FILE')
+
+    if args.watch and args.files_from:
+        parser.error("the '--watch' option does not take input files")
+
+    if args.null and not args.files_from:
+        parser.error("the '-0/--null' option can only be used with '--files-from'")
+
+    if args.output and (len(args.inputs) > 1 or args.files_from):
         parser.error("the '--output' option can only be used when processing a single input file")
 
+    if STDIO in args.inputs:
+        # 標準入力は1回しか読めないため、他の入力ファイルと組み合わせない
+        if len(args.inputs) > 1 or args.files_from is sys.stdin.buffer:
+            parser.error("the standard input '-' can only be used as the only input")
+        if args.overwrite or args.follow_refs:
+            parser.error("the standard input '-' cannot be used with '--overwrite' or '--follow-refs'")
+
+    if args.since and (args.watch or STDIO in args.inputs):
+        parser.error("the '--since' option cannot be used with '--watch' or the standard input '-'")
+
+    if args.follow_refs and (args.stream or args.output):
+        parser.error("the '--follow-refs' option cannot be used with '--stream' or '--output'")
+
+    if args.format == FORMAT_JSON and args.stream:
+        parser.error("the '--format json' option cannot be used with '--stream'")
+
+    if args.splice and args.stream:
+        parser.error("the '--splice' option cannot be used with '--stream'")
+
+    if args.splice_verify and not args.splice:
+        parser.error("the '--splice-verify' option requires '--splice'")
+
+    if args.validate_schema and args.stream:
+        parser.error("the '--validate' option cannot be used with '--stream'")
+
+    if args.validate_timeout <= 0:
+        parser.error("argument --validate-timeout: must be a positive number")
+
+    if args.jobs < 1:
+        parser.error("argument -j/--jobs: must be a positive integer")
+
+    for option in ('max_bytes', 'max_depth', 'max_nodes', 'max_aliases'):
+        if getattr(args, option) < 0:
+            parser.error(f"argument --{option.replace('_', '-')}: must not be negative")
+
+    try:
+        get_backend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        rules = load_rules(args.config)
+    except (RuleError, OSError) as e:
+        parser.error(f'argument --config: {e}')
+
+    # order: localeのルールは環境変数(LC_ALL / LC_COLLATE / LANG)の照合順序で並べる
+    try:
+        locale.setlocale(locale.LC_COLLATE, '')
+    except locale.Error:
+        pass
+
     kwargs = {}
 
-    kwargs.update({'input_files': args.inputs})
+    kwargs.update({'backend': args.backend, 'jobs': args.jobs, 'rules': rules, 'on_result': print_changed})
+
+    # 入力の大きさの上限(0は無制限)
+    limits = ResourceLimits(
+        max_bytes=args.max_bytes or None,
+        max_depth=args.max_depth or None,
+        max_nodes=args.max_nodes or None,
+        max_aliases=args.max_aliases or None,
+    )
+    kwargs.update({'limits': limits})
+
+    if args.timings:
+        kwargs.update({'on_timing': TimingReporter(format=args.timings)})
+    elif args.watch:
+        # 監視モードでは変更のたびにファイルごとの処理時間を出力する
+        kwargs.update({'on_timing': TimingReporter(format=TIMINGS_TEXT)})
+
+    if args.profile:
+        kwargs.update({'profile_file': args.profile})
+
+    if args.cache or args.cache_dir:
+        kwargs.update({'cache': SortCache(cache_dir=args.cache_dir, max_size=args.cache_max_size)})
+
+    if args.stream:
+        kwargs.update({'is_stream': args.stream})
+
+    if args.splice:
+        kwargs.update({'is_splice': args.splice})
+
+    if args.splice_verify:
+        kwargs.update({'is_splice_verify': args.splice_verify})
+
+    if args.format != FORMAT_AUTO:
+        kwargs.update({'output_format': args.format})
+
+    if not args.validate:
+        kwargs.update({'is_validate': args.validate})
+
+    if args.follow_refs:
+        kwargs.update({'is_follow_refs': args.follow_refs})
+
+    if args.validate_schema:
+        kwargs.update({'is_validate_schema': args.validate_schema, 'validate_timeout': args.validate_timeout})
+
+    if args.watch:
+        watcher = Watcher(
+            args.watch,
+            sort_kwargs=kwargs,
+            on_errors=print_errors,
+            poll_interval=args.poll_interval,
+            debounce=args.debounce,
+        )
+
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+
+        return
+
+    if args.files_from:
+        separator = b'\0' if args.null else b'\n'
+        kwargs.update({'input_files': chain(args.inputs, iter_file_list(args.files_from, separator=separator))})
+    else:
+        kwargs.update({'input_files': args.inputs})
+
+    if args.since:
+        try:
+            changed = changed_files(args.since)
+        except GitError as e:
+            parser.error(f'argument --since: {e}')
+
+        kwargs.update({'input_files': ChangeFilter(changed).filter(kwargs['input_files'])})
 
     if args.output:
         kwargs.update({'output_file': args.output})
     elif args.overwrite:
         kwargs.update({'is_overwrite': args.overwrite})
+    elif args.check:
+        kwargs.update({'is_check': args.check})
+
+    forwarded = None
+
+    # サーバーが起動していれば処理を任せる(ファイル一覧を逐次読み込む場合と標準入出力は対象外)
+    if not args.no_server and not args.files_from and STDIO not in args.inputs + [args.output]:
+        # --sinceで絞り込んだ一覧は1回しか読めないため、転送できずにローカルで実行し直す場合に備えてリストにしておく
+        kwargs.update({'input_files': list(kwargs['input_files'])})
+        forwarded = forward(kwargs)
 
-    result, errors = OpenApiSorter.sort(**kwargs)
+    result, errors = forwarded if forwarded is not None else OpenApiSorter.sort(**kwargs)
 
     if not result:
-        for error in errors:
-            print(error)
+        print_errors(errors)
 
         sys.exit(1)
@@ -0,0 +1,66 @@
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import yaml
+from yaml.representer import SafeRepresenter
+
+# 特殊文字(special characters)は先頭にある場合にのみクオーテーションがつくものと、出現位置に関係なくクオーテーションがつくものがある
+# stoplightでon・off・yes・no・y・n・fa・seにクォーテーションがつく → PyYAMLで読み込んだ後もクォーテーションがついたままなので対応不要
+# API定義のクエリパラメータ以外にtrue/falseを記載するとエラーになる
+# on・off・yes・no・y・n・fa・seはエラーにならない
+
+MATCH_REGEX = re.compile(r"[&*#!?|\-<>=%@]")
+SEARCH_REGEX = re.compile(r"[\[\]{}:\"]")
+
+# 改行・MATCH_REGEX(先頭のみ)・SEARCH_REGEXを1回の走査で判定する
+STYLE_REGEX = re.compile(r"\n|^[&*#!?|\-<>=%@]|[\[\]{}:\"]")
+
+STR_TAG = 'tag:yaml.org,2002:str'
+
+# description: OKや$refの参照先など、同じ文字列が何度も出現するため判定結果をキャッシュする
+STYLE_CACHE_SIZE = 8192
+
+DUMP_OPTIONS = {'allow_unicode': True, 'sort_keys': False, 'indent': 2}
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def _classify_str(instance: str) -> Tuple[Optional[str], str]:
+    match = STYLE_REGEX.search(instance)
+
+    if match is None:
+        return None, instance
+
+    # 改行より前に特殊文字が見つかった場合も、改行を含んでいればリテラルスタイルにする
+    if match.group() == "\n" or "\n" in instance[match.end() :]:
+        return "|", "\n".join([line.rstrip() for line in instance.splitlines()])
+
+    return "'", instance
+
+
+def represent_str(representer: SafeRepresenter, instance: str):
+    style, instance = _classify_str(instance)
+    return representer.represent_scalar(STR_TAG, instance, style=style)
+
+
+# yaml.SafeDumperのrepresenterを書き換えるとプロセス内の他の利用箇所にも影響するため、専用のクラスに登録する
+# クラスの定義時に1回だけ登録し、以降は読み取りのみなので複数スレッドから同時にdumpしても安全
+class OpenApiRepresenter(SafeRepresenter):
+    pass
+
+
+class OpenApiDumper(yaml.SafeDumper):
+    pass
+
+
+OpenApiRepresenter.add_representer(str, represent_str)
+OpenApiDumper.add_representer(str, represent_str)
+
+if hasattr(yaml, 'CSafeDumper'):
+
+    class COpenApiDumper(yaml.CSafeDumper):
+        pass
+
+    COpenApiDumper.add_representer(str, represent_str)
+else:
+    COpenApiDumper = None
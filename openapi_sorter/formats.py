@@ -0,0 +1,91 @@
+import datetime
+import json
+import os
+from typing import Any, AnyStr, Optional, TextIO, Tuple
+
+# JSONのspec(openapi.jsonなど)はPyYAMLを使わずに標準ライブラリのjsonで読み書きする
+# 入力の形式は拡張子で判定し、拡張子で分からない場合は先頭の文字で判定する
+
+FORMAT_AUTO = 'auto'
+FORMAT_YAML = 'yaml'
+FORMAT_JSON = 'json'
+
+FORMATS = [FORMAT_AUTO, FORMAT_YAML, FORMAT_JSON]
+
+EXTENSIONS = {'.json': FORMAT_JSON, '.yaml': FORMAT_YAML, '.yml': FORMAT_YAML}
+
+JSON_INDENT = 2
+
+# 形式の判定には先頭部分だけを使う
+SNIFF_SIZE = 4096
+
+
+def format_from_path(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def sniff_format(content: AnyStr) -> str:
+    head = content[:SNIFF_SIZE]
+    if isinstance(head, bytes):
+        head = head.decode('utf_8', errors='ignore')
+
+    # JSONのドキュメントは必ず{か[で始まる(YAMLのフロースタイルも同じなので、読み込みに失敗した場合はYAMLとして扱う)
+    return FORMAT_JSON if head.lstrip('\ufeff \t\r\n')[:1] in ('{', '[') else FORMAT_YAML
+
+
+def detect_format(path: Optional[str], content: AnyStr) -> str:
+    return format_from_path(path) or sniff_format(content)
+
+
+def read_head(path: str) -> bytes:
+    # 読み込めないファイルのエラーは、ファイル全体を読み込む際に報告する
+    try:
+        with open(path, mode='rb') as f:
+            return f.read(SNIFF_SIZE)
+    except OSError:
+        return b''
+
+
+class _PrefixedStream:
+    # 形式の判定のために読んだ先頭部分を戻した入力(標準入力のように読み直せないストリームにも使える)
+    def __init__(self, head: str, stream: TextIO):
+        self.head = head
+        self.stream = stream
+        self.name = getattr(stream, 'name', '<file>')
+
+    def read(self, size: int = -1) -> str:
+        if not self.head:
+            return self.stream.read(size)
+
+        if size is None or size < 0:
+            content, self.head = self.head + self.stream.read(), ''
+        else:
+            content, self.head = self.head[:size], self.head[size:]
+
+        return content
+
+
+def sniff_stream(stream: TextIO) -> Tuple[str, TextIO]:
+    # 形式と、先頭から読み直せるストリームを返す
+    head = stream.read(SNIFF_SIZE)
+    return sniff_format(head), _PrefixedStream(head, stream)
+
+
+def load_json(content: str) -> Any:
+    # 失敗した場合はValueError(json.JSONDecodeError)を送出する
+    return json.loads(content.lstrip('\ufeff'))
+
+
+def _default(value: Any) -> Any:
+    # YAMLから変換する場合、クォートされていない日付はdate/datetimeとして読み込まれる
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dump_json(data: Any) -> str:
+    return json.dumps(data, indent=JSON_INDENT, ensure_ascii=False, default=_default) + '\n'
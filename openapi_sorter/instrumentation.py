@@ -0,0 +1,102 @@
+import cProfile
+import json
+import marshal
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, Optional, TextIO
+
+# フェーズごとの処理時間の計測とプロファイリング
+
+PHASE_READ = 'read'
+PHASE_LOAD = 'load'
+PHASE_VALIDATE = 'validate'
+PHASE_CHECK = 'check'
+PHASE_SORT = 'sort'
+PHASE_DUMP = 'dump'
+PHASE_WRITE = 'write'
+PHASE_STREAM = 'stream'
+PHASE_TOTAL = 'total'
+
+TIMINGS_JSON = 'json'
+TIMINGS_TEXT = 'text'
+
+TIMINGS_FORMATS = [TIMINGS_JSON, TIMINGS_TEXT]
+
+# (input_file, phase, seconds)
+TimingCallback = Callable[[str, str, float], None]
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + perf_counter() - start_time
+
+
+class FileProfiler:
+    # ワーカープロセスからも結果を返せるように、pstatsに読み込める形式のdict(Profile.stats)を保持する
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stats: Optional[dict] = None
+
+    @contextmanager
+    def profile(self):
+        if not self.enabled:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            self.stats = profiler.stats
+
+
+def dump_profile_stats(stats: dict, path: str):
+    # cProfile.Profile.dump_statsと同じ形式で書き出す(pstats.Stats(path)で読み込める)
+    with open(path, mode='wb') as f:
+        marshal.dump(stats, f)
+
+
+def format_timings_json(input_file: str, timings: Dict[str, float]) -> str:
+    return json.dumps({'file': input_file, 'timings': timings}, ensure_ascii=False)
+
+
+def format_timings_text(input_file: str, timings: Dict[str, float]) -> str:
+    return f'{input_file}: ' + ', '.join(f'{phase}={seconds:.4f}s' for phase, seconds in timings.items())
+
+
+class TimingReporter:
+    # TimingCallbackとして渡し、ファイルごとにtotalが届いた時点で1行にまとめて出力する
+
+    def __init__(self, format: str = TIMINGS_JSON, stream: Optional[TextIO] = None):
+        self.format = format
+        self.stream = stream
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def __call__(self, input_file: str, phase: str, seconds: float):
+        timings = self.timings.setdefault(input_file, {})
+        timings[phase] = seconds
+
+        if phase != PHASE_TOTAL:
+            return
+
+        del self.timings[input_file]
+
+        if self.format == TIMINGS_JSON:
+            line = format_timings_json(input_file, timings)
+        else:
+            line = format_timings_text(input_file, timings)
+
+        print(line, file=self.stream or sys.stderr)
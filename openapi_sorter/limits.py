@@ -0,0 +1,199 @@
+import os
+import re
+from functools import partial
+from typing import IO, Any, List, NamedTuple, Optional, Type, Union
+
+import yaml
+from yaml.events import AliasEvent, CollectionEndEvent, CollectionStartEvent, ScalarEvent
+
+# 共有のCIランナーなどメモリが限られた環境で、巨大なファイルやエイリアスの展開(billion laughs)でメモリを使い切らないように、
+# 辞書を構築する前に安価な事前スキャンで入力の大きさを確認する
+# YAMLはイベント単位で読み進めて(ノードツリーも辞書も作らない)深さ・ノード数・エイリアス数を数える
+# エイリアスは参照先のアンカーのノード数と深さを展開した分として数える
+
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+# アンカー(&name)とエイリアス(*name)になり得る名前(説明文やURLの'&'と'*'も拾うが、同じ名前の組がなければ展開は起こらない)
+ANCHOR_REGEX = re.compile(r'&([^\s\[\]{},]+)')
+ALIAS_REGEX = re.compile(r'\*([^\s\[\]{},]+)')
+ANCHOR_BYTES_REGEX = re.compile(ANCHOR_REGEX.pattern.encode('ascii'))
+ALIAS_BYTES_REGEX = re.compile(ALIAS_REGEX.pattern.encode('ascii'))
+
+
+class LimitError(ValueError):
+    pass
+
+
+def has_alias(content: str) -> bool:
+    # 同じ名前のアンカーとエイリアスの組があるかどうか(なければエイリアスの展開は起こらない)
+    return not set(ANCHOR_REGEX.findall(content)).isdisjoint(ALIAS_REGEX.findall(content))
+
+
+class ResourceLimits(NamedTuple):
+    # Noneは無制限
+    max_bytes: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_nodes: Optional[int] = None
+    max_aliases: Optional[int] = None
+
+    @property
+    def is_scan_needed(self) -> bool:
+        return self.max_depth is not None or self.max_nodes is not None or self.max_aliases is not None
+
+    def check_size(self, size: int):
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise LimitError(f'the file is larger than {self.max_bytes} bytes')
+
+    def check_content(self, content: str):
+        # 読み込み済みの文字列(サーバーへのリクエストなど)はUTF-8にした場合のサイズで確認する
+        if self.max_bytes is not None:
+            self.check_size(len(content.encode('utf_8')))
+
+    def check_file(self, path: str):
+        # ファイルを読み込む前にサイズだけを確認する
+        if self.max_bytes is not None:
+            self.check_size(os.stat(path).st_size)
+
+    def read(self, stream: IO[bytes]) -> bytes:
+        # サイズの分からない入力(標準入力)は上限を1バイト超えた時点で読み込みをやめる
+        content = stream.read() if self.max_bytes is None else stream.read(self.max_bytes + 1)
+        self.check_size(len(content))
+
+        return content
+
+    def to_config(self) -> dict:
+        return {key: value for key, value in self._asdict().items() if value is not None}
+
+    def is_scan_skippable(self, size: int, has_alias: bool) -> bool:
+        # アンカーを参照するエイリアスがなければ展開は起こらず、ノード数は文字数の2倍を超えないので、
+        # 深さの制限がなければスキャンを省略できる
+        return not has_alias and self.max_depth is None and (self.max_nodes is None or size * 2 <= self.max_nodes)
+
+    def scan_yaml(self, content: str, loader: Type = yaml.SafeLoader):
+        if not self.is_scan_needed:
+            return
+
+        if self.is_scan_skippable(len(content), has_alias(content)):
+            return
+
+        self._scan_events(content, loader)
+
+    def scan_yaml_file(self, path: str, loader: Type = yaml.SafeLoader):
+        # ストリームモード用: ファイル全体をメモリに載せずにスキャンする
+        self.check_file(path)
+
+        if not self.is_scan_needed:
+            return
+
+        size = 0
+        anchors = set()
+        aliases = set()
+        rest = b''
+        with open(path, mode='rb') as f:
+            for chunk in iter(partial(f.read, SCAN_CHUNK_SIZE), b''):
+                size += len(chunk)
+
+                # アンカー名は改行を含まないので、チャンクの最後の行は次のチャンクと合わせて探す
+                lines, _, rest = (rest + chunk).rpartition(b'\n')
+                anchors.update(ANCHOR_BYTES_REGEX.findall(lines))
+                aliases.update(ALIAS_BYTES_REGEX.findall(lines))
+
+        anchors.update(ANCHOR_BYTES_REGEX.findall(rest))
+        aliases.update(ALIAS_BYTES_REGEX.findall(rest))
+
+        if not self.is_scan_skippable(size, not anchors.isdisjoint(aliases)):
+            with open(path, mode='r', encoding='utf_8') as f:
+                self._scan_events(f, loader)
+
+    def _scan_events(self, content: Union[str, IO[str]], loader: Type):
+        max_depth = self.max_depth
+        max_nodes = self.max_nodes
+        max_aliases = self.max_aliases
+
+        depth = 0
+        nodes = 0
+        aliases = 0
+        # アンカー名 → (ノード数, 深さ)
+        anchors = {}
+        # 開いているコレクションごとの[アンカー名, 開始時のノード数, 開始時の深さ, 内部の最大の深さ]
+        frames: List[list] = []
+
+        parser = loader(content)
+        try:
+            while parser.check_event():
+                event = parser.get_event()
+
+                if isinstance(event, ScalarEvent):
+                    nodes += 1
+                    if event.anchor:
+                        anchors[event.anchor] = (1, 0)
+                elif isinstance(event, CollectionStartEvent):
+                    nodes += 1
+                    depth += 1
+                    if max_depth is not None and depth > max_depth:
+                        raise LimitError(f'the document is nested deeper than {max_depth} levels')
+
+                    frames.append([event.anchor, nodes, depth, depth])
+                elif isinstance(event, CollectionEndEvent):
+                    anchor, start_nodes, start_depth, inner_depth = frames.pop()
+                    if anchor:
+                        anchors[anchor] = (nodes - start_nodes + 1, inner_depth - start_depth + 1)
+                    if frames and inner_depth > frames[-1][3]:
+                        frames[-1][3] = inner_depth
+
+                    depth -= 1
+                elif isinstance(event, AliasEvent):
+                    aliases += 1
+                    if max_aliases is not None and aliases > max_aliases:
+                        raise LimitError(f'the document has more than {max_aliases} aliases')
+
+                    # 未定義のアンカーは構築時にエラーになるので、ここでは1ノードとして数える
+                    size, height = anchors.get(event.anchor, (1, 0))
+                    nodes += size
+                    if max_depth is not None and depth + height > max_depth:
+                        raise LimitError(f'the document is nested deeper than {max_depth} levels')
+                    if frames and depth + height > frames[-1][3]:
+                        frames[-1][3] = depth + height
+                else:
+                    continue
+
+                if max_nodes is not None and nodes > max_nodes:
+                    raise LimitError(f'the document has more than {max_nodes} nodes')
+        finally:
+            parser.dispose()
+
+    def check_document(self, document: Any):
+        # JSONは読み込みに必要なメモリがファイルサイズに比例するので、読み込んだ後に深さとノード数を確認する
+        if self.max_depth is None and self.max_nodes is None:
+            return
+
+        nodes = 0
+        stack = [(document, 1)]
+
+        while stack:
+            value, depth = stack.pop()
+            nodes += 1
+
+            if self.max_nodes is not None and nodes > self.max_nodes:
+                raise LimitError(f'the document has more than {self.max_nodes} nodes')
+
+            if isinstance(value, dict):
+                children = value.values()
+            elif isinstance(value, list):
+                children = value
+            else:
+                continue
+
+            if self.max_depth is not None and depth > self.max_depth:
+                raise LimitError(f'the document is nested deeper than {self.max_depth} levels')
+
+            # マッピングのキーも1ノードとして数える(YAMLのスキャンと同じ数え方)
+            if isinstance(value, dict):
+                nodes += len(value)
+
+            stack.extend((child, depth + 1) for child in children)
+
+
+# CLIの既定の上限(数GBのファイルや大量のエイリアスの展開は拒否し、通常の大きなspecは通す)
+# 深さは既定では制限しない(制限するとアンカーのないファイルでもスキャンが必要になる)
+DEFAULT_LIMITS = ResourceLimits(max_bytes=256 * 1024 * 1024, max_nodes=50_000_000, max_aliases=100_000)
@@ -1,136 +1,887 @@
-import re
-import traceback
-from time import perf_counter
-from typing import List, Tuple
+import filecmp
+import locale
+import os
+import shutil
+import sys
+import tempfile
+from collections import deque
+from functools import partial
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
 
 
 import yaml
-from openapi_spec_validator.readers import read_from_filename
-from openapi_spec_validator.validation.exceptions import OpenAPIValidationError, ValidatorDetectError
+from openapi_sorter.backends import BACKEND_AUTO, YamlBackend, get_backend
+from openapi_sorter.cache import SortCache
+from openapi_sorter.dumper import MATCH_REGEX, SEARCH_REGEX, represent_str  # noqa: F401
+from openapi_sorter.formats import (
+    FORMAT_AUTO,
+    FORMAT_JSON,
+    FORMAT_YAML,
+    FORMATS,
+    detect_format,
+    dump_json,
+    format_from_path,
+    load_json,
+    read_head,
+    sniff_format,
+    sniff_stream,
+)
+from openapi_sorter.instrumentation import (
+    PHASE_CHECK,
+    PHASE_DUMP,
+    PHASE_LOAD,
+    PHASE_READ,
+    PHASE_SORT,
+    PHASE_STREAM,
+    PHASE_TOTAL,
+    PHASE_VALIDATE,
+    PHASE_WRITE,
+    FileProfiler,
+    PhaseTimer,
+    TimingCallback,
+    dump_profile_stats,
+)
+from openapi_sorter.limits import LimitError, ResourceLimits
+from openapi_sorter.refs import ParseCache, ParsedFile, RefGraph
+from openapi_sorter.rules import DEFAULT_RULES, ORDER_LOCALE, SortRules
+from openapi_sorter.splice import SpliceError, SpliceSorter
+from openapi_sorter.streaming import AliasOrderError, StreamingSorter
+from openapi_sorter.validation import get_validator
 from yaml import YAMLError
 from yaml.scanner import ScannerError
 
 
-# 特殊文字(special characters)は先頭にある場合にのみクオーテーションがつくものと、出現位置に関係なくクオーテーションがつくものがある
-# stoplightでon・off・yes・no・y・n・fa・seにクォーテーションがつく → PyYAMLで読み込んだ後もクォーテーションがついたままなので対応不要
-# API定義のクエリパラメータ以外にtrue/falseを記載するとエラーになる
-# on・off・yes・no・y・n・fa・seはエラーにならない
+# 入力・出力のファイル名に指定すると標準入力・標準出力を使う
+STDIO = '-'
 
-MATCH_REGEX = re.compile(r"[&*#!?|\-<>=%@]")
-SEARCH_REGEX = re.compile(r"[\[\]{}:\"]")
+# スキーマ検証の1ファイルあたりの制限時間(秒)
+DEFAULT_VALIDATE_TIMEOUT = 30.0
+
+# 新規に作成するファイルのパーミッションに使う(os.umaskはプロセス全体の設定を書き換えるため読み込み時に1回だけ取得する)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+class OpenApiSorterError(ValueError):
+    pass
+
+
+class InvalidYamlError(OpenApiSorterError):
+    pass
+
+
+class InvalidOpenApiError(OpenApiSorterError):
+    pass
+
+
+class SortFileResult(NamedTuple):
+    input_file: str
+    error: Optional[str] = None
+    output_file: Optional[str] = None
+    is_changed: bool = False
+    timings: Dict[str, float] = {}
+    profile_stats: Optional[dict] = None
 
 
 class OpenApiSorter:
     @classmethod
     def sort(
-        cls, input_files: List[str], output_file: str = None, is_overwrite: bool = False
+        cls,
+        input_files: Iterable[str],
+        output_file: str = None,
+        is_overwrite: bool = False,
+        is_check: bool = False,
+        is_stream: bool = False,
+        backend: str = BACKEND_AUTO,
+        jobs: int = 1,
+        cache: Optional[SortCache] = None,
+        on_result: Optional[Callable[[SortFileResult], None]] = None,
+        on_timing: Optional[TimingCallback] = None,
+        profile_file: Optional[str] = None,
+        is_validate: bool = True,
+        is_validate_schema: bool = False,
+        validate_timeout: Optional[float] = DEFAULT_VALIDATE_TIMEOUT,
+        rules: Optional[SortRules] = None,
+        is_follow_refs: bool = False,
+        is_splice: bool = False,
+        is_splice_verify: bool = False,
+        output_format: str = FORMAT_AUTO,
+        limits: Optional[ResourceLimits] = None,
     ) -> Tuple[bool, List[str]]:
+        # バックエンドの指定が不正な場合はワーカーを起動する前にエラーにする
+        yaml_backend = get_backend(backend)
+
+        if is_stream and is_validate_schema:
+            raise ValueError('schema validation needs the whole document and cannot be used with stream mode')
+
+        if is_follow_refs and (is_stream or output_file):
+            raise ValueError('following $ref cannot be used with stream mode or an output file')
+
+        if is_stream and is_splice:
+            raise ValueError('splice mode needs the original text and cannot be used with stream mode')
+
+        if output_format not in FORMATS:
+            raise ValueError(f'unknown format: {output_format}')
+
+        if is_stream and output_format == FORMAT_JSON:
+            raise ValueError('stream mode writes YAML and cannot be used with the json format')
+
+        sort_file = partial(
+            cls._sort_file,
+            output_file=output_file,
+            is_overwrite=is_overwrite,
+            is_check=is_check,
+            is_stream=is_stream,
+            backend=backend,
+            cache=cache,
+            is_profile=bool(profile_file),
+            is_validate=is_validate,
+            is_validate_schema=is_validate_schema,
+            validate_timeout=validate_timeout,
+            rules=rules,
+            is_splice=is_splice,
+            is_splice_verify=is_splice_verify,
+            output_format=output_format,
+            limits=limits,
+        )
+
+        # 入力ファイルが膨大な場合(--files-from)に備えて、結果はエラーだけを保持する
         errors = []
+        slowest = None
 
-        for input_file in input_files:
-            if not cls.is_valid_yaml(input_file=input_file):
-                errors.append(f'{input_file} is not YAML file.')
-                continue
+        def collect(result: SortFileResult):
+            nonlocal slowest
+
+            # プロファイルは最も遅かったファイルの分だけ保持する
+            if result.profile_stats is not None:
+                if slowest is None or result.timings[PHASE_TOTAL] > slowest.timings[PHASE_TOTAL]:
+                    slowest = result
+                result = result._replace(profile_stats=None)
+
+            if result.error:
+                errors.append(result.error)
+
+            if on_timing:
+                for phase, seconds in result.timings.items():
+                    on_timing(result.input_file, phase, seconds)
+
+            if on_result:
+                on_result(result)
+
+        if is_follow_refs:
+            # 参照でつながっていないファイルのグループ同士は独立しているので、グループ単位で並列に処理する
+            tasks = cls._ref_tasks(list(input_files), yaml_backend, limits=limits)
+        else:
+            # 入力ファイルの一覧は必要になった分だけ読み進める
+            tasks = ([(input_file, {})] for input_file in input_files)
+
+        for result in cls._run_tasks(tasks, partial(cls._sort_files, sort_file=sort_file), jobs):
+            collect(result)
+
+        if cache:
+            cache.evict()
+
+        if profile_file and slowest is not None:
+            dump_profile_stats(slowest.profile_stats, profile_file)
+
+        return not errors, errors
+
+    @classmethod
+    def _run_tasks(
+        cls, tasks: Iterable[List[Tuple[str, dict]]], sort_files: Callable[..., List[SortFileResult]], jobs: int
+    ) -> Iterator[SortFileResult]:
+        tasks = iter(tasks)
+        head = list(islice(tasks, jobs))
+
+        if len(head) < 2:
+            # multiprocessingの読み込みは重いので、1ファイルだけの実行(pre-commitフックなど)では読み込まない
+            for task in chain(head, tasks):
+                yield from sort_files(task)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # ファイル(参照を辿る場合はグループ)単位でワーカープロセスに分散し、入力順に結果を返す
+        # 実行待ちのタスクはワーカー数の2倍までに抑え、入力ファイルが膨大でもメモリ使用量を一定に保つ
+        with ProcessPoolExecutor(max_workers=len(head)) as executor:
+            pending = deque()
+            for task in chain(head, tasks):
+                pending.append(executor.submit(sort_files, task))
+                if len(pending) > len(head) * 2:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    @classmethod
+    def sort_document(cls, openapi_json: dict, rules: Optional[SortRules] = None) -> dict:
+        # パース済みのドキュメントを直接ソートする(引数のdictを更新して返す)
+        if not cls.is_openapi_document(openapi_json):
+            raise InvalidOpenApiError('document is not OpenAPI.')
+
+        return cls._sort_dict(openapi_json, rules=rules)
+
+    @classmethod
+    def sort_string(
+        cls,
+        content: str,
+        backend: str = BACKEND_AUTO,
+        rules: Optional[SortRules] = None,
+        is_splice: bool = False,
+        is_splice_verify: bool = False,
+        output_format: str = FORMAT_AUTO,
+        limits: Optional[ResourceLimits] = None,
+    ) -> str:
+        yaml_backend = get_backend(backend)
+        limits = limits or ResourceLimits()
+        limits.check_content(content)
+
+        input_format = sniff_format(content)
+        output_format = input_format if output_format == FORMAT_AUTO else output_format
+        is_splice = is_splice and input_format == output_format == FORMAT_YAML
+
+        if is_splice:
+            splicer = SpliceSorter(yaml_backend, rules=rules, is_verify=is_splice_verify)
+            try:
+                limits.scan_yaml(content, yaml_backend.loader)
+                node, openapi_json = splicer.load(content)
+            except (YAMLError, ScannerError) as e:
+                raise InvalidYamlError('content is not YAML.') from e
+        else:
+            openapi_json = cls.load_content(content, input_format, backend=yaml_backend, limits=limits)
+
+        if not cls.is_yaml_document(openapi_json):
+            raise InvalidYamlError('content is not YAML.')
 
-            if not cls.is_valid_openapi(input_file=input_file):
-                errors.append(f'{input_file} is not OpenAPI file.')
-                continue
+        sorted_openapi_json = cls.sort_document(openapi_json, rules=rules)
 
-            if is_overwrite:
-                output_file = input_file
+        if output_format == FORMAT_JSON:
+            return dump_json(sorted_openapi_json)
 
-            print(f"{input_file}のソートを実施します")
+        spliced = cls._splice(splicer, content, node, sorted_openapi_json) if is_splice else None
 
-            load_yaml_start_time = perf_counter()
+        return spliced if spliced is not None else cls._dump(sorted_openapi_json, backend=yaml_backend)
+
+    @classmethod
+    def is_sorted_string(
+        cls,
+        content: str,
+        backend: str = BACKEND_AUTO,
+        rules: Optional[SortRules] = None,
+        limits: Optional[ResourceLimits] = None,
+    ) -> bool:
+        limits = limits or ResourceLimits()
+        limits.check_content(content)
 
-            loaded_yaml = open(input_file, mode='r', encoding='utf_8')
+        openapi_json = cls.load_content(content, backend=get_backend(backend), limits=limits)
 
-            load_yaml_end_time = perf_counter()
-            print(f"YAMLファイルの読み込みにかかった時間 → {load_yaml_end_time - load_yaml_start_time}秒")
+        if not cls.is_yaml_document(openapi_json):
+            raise InvalidYamlError('content is not YAML.')
 
-            convert_dict_start_time = perf_counter()
+        if not cls.is_openapi_document(openapi_json):
+            raise InvalidOpenApiError('document is not OpenAPI.')
 
-            openapi_json = yaml.load(loaded_yaml, Loader=yaml.SafeLoader)
+        return cls._is_sorted(openapi_json, rules=rules)
+
+    @classmethod
+    def sort_stream(
+        cls,
+        input_stream: TextIO,
+        output_stream: TextIO,
+        backend: str = BACKEND_AUTO,
+        is_stream: bool = False,
+        rules: Optional[SortRules] = None,
+    ):
+        # JSONはイベント単位では出力できないため、ストリームモードでもドキュメント全体を読み込む
+        input_format, input_stream = sniff_stream(input_stream)
+        if not is_stream or input_format == FORMAT_JSON:
+            output_stream.write(cls.sort_string(input_stream.read(), backend=backend, rules=rules))
+            return
+
+        # イベント単位で逐次出力するため、OpenAPIでないことが分かった時点で出力先には書き込み済みになる
+        try:
+            result = StreamingSorter(get_backend(backend), rules=rules).sort(input_stream, output_stream)
+        except AliasOrderError as e:
+            raise OpenApiSorterError(f'content cannot be sorted in stream mode: {e}.') from e
+        except (YAMLError, ScannerError) as e:
+            raise InvalidYamlError('content is not YAML.') from e
 
-            convert_dict_end_time = perf_counter()
-            print(f"YAMLから辞書への変換にかかった時間 → {convert_dict_end_time - convert_dict_start_time}秒")
+        if not result.documents:
+            raise InvalidYamlError('content is not YAML.')
 
-            sort_dict_start_time = perf_counter()
+        if not cls.is_openapi_document(result.header):
+            raise InvalidOpenApiError('document is not OpenAPI.')
 
-            for key, value in openapi_json.items():
-                if key == 'paths':
-                    paths = [path for path, _ in value.items()]
-                    paths = sorted(paths, key=lambda x: x)
-                    new_value = {path: value.get(path) for path in paths}
-                    openapi_json.update({'paths': new_value})
-                elif key == 'components':
-                    for component_key, component_value in value.items():
-                        if component_key in ['requestBodies', 'schemas']:
-                            keys = [key for key, _ in component_value.items()]
-                            keys = sorted(keys, key=lambda x: x)
-                            new_value = {key: component_value.get(key) for key in keys}
-                            value.update({component_key: new_value})
-                elif key == 'tags':
-                    if isinstance(value, List):
-                        openapi_json.update({'tags': sorted(value, key=lambda x: x.get('name'))})
+    @classmethod
+    def _ref_tasks(
+        cls, input_files: List[str], backend: YamlBackend, limits: Optional[ResourceLimits] = None
+    ) -> List[List[Tuple[str, dict]]]:
+        # 入力ファイルから$refで辿れるファイルを1回ずつパースし、そのパース結果をソートでも使う
+        parse_cache = ParseCache(load=partial(cls.load_content, backend=backend, limits=limits), limits=limits)
+        graph = RefGraph(parse_cache)
 
-            sort_dict_end_time = perf_counter()
-            print(f"辞書のソートにかかった時間 → {sort_dict_end_time - sort_dict_start_time}秒")
+        for input_file in input_files:
+            graph.add(input_file)
 
-            yaml.add_representer(str, cls._represent_str, Dumper=yaml.SafeDumper)
+        tasks = []
+        for group in graph.groups(input_files):
+            task = []
+            for input_file in group:
+                parsed = parse_cache.get(input_file)
+                options = {'preloaded': parsed}
 
-            # 時間計測のため辞書→yamlの変換とファイル書き込みを分離(.dumpで直接ファイル出力しない)
+                # 他のファイルから参照されている断片(スキーマだけのファイルなど)はOpenAPIとしての検証を行わない
+                if parsed and graph.is_referenced(input_file) and not cls.is_openapi_document(parsed.document):
+                    options['is_fragment'] = True
 
-            dump_dict_start_time = perf_counter()
+                task.append((input_file, options))
+            tasks.append(task)
 
-            dumped_yaml = yaml.dump(openapi_json, allow_unicode=True, sort_keys=False, indent=2, Dumper=yaml.SafeDumper)
+        return tasks
 
-            dump_dict_end_time = perf_counter()
-            print(f"辞書からYAMLの変換にかかった時間 → {dump_dict_end_time - dump_dict_start_time}秒")
+    @classmethod
+    def _sort_files(
+        cls, task: List[Tuple[str, dict]], sort_file: Callable[..., SortFileResult]
+    ) -> List[SortFileResult]:
+        return [sort_file(input_file, **options) for input_file, options in task]
 
-            create_file_start_time = perf_counter()
+    @classmethod
+    def _sort_file(
+        cls,
+        input_file: str,
+        output_file: str = None,
+        is_overwrite: bool = False,
+        is_check: bool = False,
+        is_stream: bool = False,
+        backend: str = BACKEND_AUTO,
+        cache: Optional[SortCache] = None,
+        is_profile: bool = False,
+        is_validate: bool = True,
+        is_validate_schema: bool = False,
+        validate_timeout: Optional[float] = DEFAULT_VALIDATE_TIMEOUT,
+        rules: Optional[SortRules] = None,
+        preloaded: Optional[ParsedFile] = None,
+        is_fragment: bool = False,
+        is_splice: bool = False,
+        is_splice_verify: bool = False,
+        output_format: str = FORMAT_AUTO,
+        limits: Optional[ResourceLimits] = None,
+    ) -> SortFileResult:
+        yaml_backend = get_backend(backend)
+
+        if is_overwrite:
+            output_file = input_file
+
+        # JSONのファイルはイベント単位では出力できず、標準入力は読み直せないため、ストリームモードでもドキュメント全体を読み込む
+        # (入力の形式は通常のモードと同じく、拡張子で分からない場合は先頭の内容で判定する)
+        if STDIO in (input_file, output_file):
+            is_stream = False
+        if is_stream and FORMAT_JSON in (format_from_path(output_file), output_format):
+            is_stream = False
+        if is_stream and detect_format(input_file, read_head(input_file)) == FORMAT_JSON:
+            is_stream = False
+
+        if is_fragment:
+            is_validate = False
+            is_validate_schema = False
+
+        timer = PhaseTimer()
+        profiler = FileProfiler(enabled=is_profile)
+
+        with profiler.profile(), timer.phase(PHASE_TOTAL):
+            options = {'is_check': is_check, 'backend': yaml_backend, 'cache': cache, 'timer': timer, 'rules': rules}
+
+            try:
+                if is_stream:
+                    result = cls._sort_file_stream(
+                        input_file, output_file, is_validate=is_validate, limits=limits, **options
+                    )
+                else:
+                    result = cls._sort_file_document(
+                        input_file,
+                        output_file,
+                        is_validate=is_validate,
+                        is_validate_schema=is_validate_schema,
+                        validate_timeout=validate_timeout,
+                        preloaded=preloaded,
+                        is_splice=is_splice,
+                        is_splice_verify=is_splice_verify,
+                        output_format=output_format,
+                        limits=limits,
+                        **options,
+                    )
+            except LimitError as e:
+                result = SortFileResult(input_file=input_file, error=f'{input_file} was rejected: {e}')
+            # 読み書きできないファイルやUTF-8でないファイルがあっても、他のファイルの処理は続ける
+            except UnicodeDecodeError:
+                result = SortFileResult(input_file=input_file, error=f'{input_file} is not UTF-8 file.')
+            except OSError as e:
+                result = SortFileResult(input_file=input_file, error=f'{input_file} cannot be processed: {e}')
+
+        return result._replace(timings=timer.timings, profile_stats=profiler.stats)
 
-            with open(
+    @classmethod
+    def _sort_file_document(
+        cls,
+        input_file: str,
+        output_file: str,
+        is_check: bool = False,
+        backend: YamlBackend = None,
+        cache: Optional[SortCache] = None,
+        timer: PhaseTimer = None,
+        is_validate: bool = True,
+        is_validate_schema: bool = False,
+        validate_timeout: Optional[float] = DEFAULT_VALIDATE_TIMEOUT,
+        rules: Optional[SortRules] = None,
+        preloaded: Optional[ParsedFile] = None,
+        is_splice: bool = False,
+        is_splice_verify: bool = False,
+        output_format: str = FORMAT_AUTO,
+        limits: Optional[ResourceLimits] = None,
+    ) -> SortFileResult:
+        timer = timer or PhaseTimer()
+        limits = limits or ResourceLimits()
+
+        # 参照を辿る際の読み込みで上限を超えたファイル
+        if preloaded is not None and preloaded.error:
+            raise LimitError(preloaded.error)
+
+        # ファイルの読み込みとパースは1回だけ行い、検証・ソート・出力で同じ辞書を使い回す
+        with timer.phase(PHASE_READ):
+            if preloaded is not None:
+                raw_content = preloaded.raw_content
+            elif input_file == STDIO:
+                raw_content = limits.read(sys.stdin.buffer)
+            else:
+                # 上限を超えるファイルは読み込まない
+                limits.check_file(input_file)
+                with open(input_file, mode='rb') as f:
+                    raw_content = f.read()
+
+            # 形式は拡張子、分からない場合は内容の先頭で判定する(出力先は指定がなければ出力先の拡張子、入力と同じ形式の順)
+            input_format = detect_format(input_file, raw_content)
+            if output_format == FORMAT_AUTO:
+                output_format = format_from_path(output_file) or input_format
+
+            is_splice = is_splice and input_format == output_format == FORMAT_YAML
+            splicer = SpliceSorter(backend, rules=rules, is_verify=is_splice_verify) if is_splice else None
+            cache_options = cls._cache_options(is_validate, is_validate_schema, rules, is_splice, output_format)
+
+            # 前回の実行でソート済みと記録された内容であれば、パース・ソート・出力を省略する
+            is_cached = cache and cache.contains(cache.key(raw_content, **cache_options))
+
+        if is_cached:
+            if is_check or (output_file == input_file and output_file != STDIO):
+                return SortFileResult(input_file=input_file, output_file=output_file)
+
+            with timer.phase(PHASE_WRITE):
+                is_changed = cls._write_if_changed(
+                    output_file, raw_content, original_content=raw_content if output_file == STDIO else None
+                )
+
+            return SortFileResult(input_file=input_file, output_file=output_file, is_changed=is_changed)
+
+        with timer.phase(PHASE_LOAD):
+            if splicer is not None:
+                # テキスト上の位置が必要なため、読み込み済みの場合もノードツリーを作り直す
+                content = raw_content.decode('utf_8')
+                try:
+                    limits.scan_yaml(content, backend.loader)
+                    node, openapi_json = splicer.load(content)
+                except (YAMLError, ScannerError):
+                    node, openapi_json = None, None
+            elif preloaded is None:
+                openapi_json = cls.load_content(
+                    raw_content.decode('utf_8'), input_format, backend=backend, limits=limits
+                )
+            else:
+                openapi_json = preloaded.document
+
+        with timer.phase(PHASE_VALIDATE):
+            if not cls.is_yaml_document(openapi_json):
+                file_type = 'JSON' if input_format == FORMAT_JSON else 'YAML'
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not {file_type} file.')
+
+            # 検証を省略する場合も、ソートできるようにトップレベルがマッピングであることだけは確認する
+            if not isinstance(openapi_json, dict) or (is_validate and not cls.is_openapi_document(openapi_json)):
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not OpenAPI file.')
+
+            if is_validate_schema:
+                # 検証に成功した内容はキャッシュに記録し、ソートされていないファイルでも次回以降の検証を省略する
+                validated_key = cache.key(raw_content, namespace='validated') if cache else None
+
+                if not (cache and cache.contains(validated_key)):
+                    error = cls.validate_schema(openapi_json, timeout=validate_timeout)
+                    if error:
+                        return SortFileResult(
+                            input_file=input_file, error=f'{input_file} is not valid OpenAPI file: {error}'
+                        )
+
+                    if cache:
+                        cache.add(validated_key)
+
+        # チェックモードでは並び順の確認だけを行い、YAMLへの変換やファイル書き込みは行わない
+        if is_check:
+            with timer.phase(PHASE_CHECK):
+                is_sorted = cls._is_sorted(openapi_json, rules=rules)
+
+            if not is_sorted:
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not sorted.')
+
+            return SortFileResult(input_file=input_file)
+
+        with timer.phase(PHASE_SORT):
+            cls._sort_dict(openapi_json, rules=rules)
+
+        # 時間計測のため辞書→yamlの変換とファイル書き込みを分離(.dumpで直接ファイル出力しない)
+        with timer.phase(PHASE_DUMP):
+            if output_format == FORMAT_JSON:
+                try:
+                    dumped = dump_json(openapi_json)
+                except (TypeError, ValueError) as e:
+                    return SortFileResult(input_file=input_file, error=f'{input_file} cannot be written as JSON: {e}')
+            else:
+                dumped = cls._splice(splicer, content, node, openapi_json) if splicer is not None else None
+                if dumped is None:
+                    dumped = cls._dump(openapi_json, backend=backend)
+
+            dumped_content = dumped.encode('utf_8')
+
+        # 出力先と内容が同じ場合は書き込まない(更新日時を変えない)
+        with timer.phase(PHASE_WRITE):
+            is_changed = cls._write_if_changed(
                 output_file,
-                mode='w',
-                encoding='utf_8',
-                newline='\n',
-            ) as f:
-                f.write(dumped_yaml)
+                dumped_content,
+                original_content=raw_content if output_file in (input_file, STDIO) else None,
+            )
 
-            create_file_end_time = perf_counter()
-            print(f"ファイル書き込みにかかった時間 → {create_file_end_time - create_file_start_time}秒")
+            # ソート結果はそのままソート済みの内容なので、次回以降はこの内容であればスキップできる
+            if cache:
+                cache.add(cache.key(dumped_content, **cache_options))
 
-        return not errors, errors
+        return SortFileResult(input_file=input_file, output_file=output_file, is_changed=is_changed)
+
+    @classmethod
+    def _sort_file_stream(
+        cls,
+        input_file: str,
+        output_file: str,
+        is_check: bool = False,
+        backend: YamlBackend = None,
+        cache: Optional[SortCache] = None,
+        timer: PhaseTimer = None,
+        is_validate: bool = True,
+        rules: Optional[SortRules] = None,
+        limits: Optional[ResourceLimits] = None,
+    ) -> SortFileResult:
+        timer = timer or PhaseTimer()
+        limits = limits or ResourceLimits()
+        cache_options = cls._cache_options(is_validate, rules=rules, is_stream=True)
+
+        # ファイル全体を辞書や文字列としてメモリに載せず、イベント単位でソートして一時ファイルに書き出す
+        with timer.phase(PHASE_READ):
+            limits.check_file(input_file)
+            is_cached = cache and cache.contains(cache.file_key(input_file, **cache_options))
+
+        if is_cached:
+            if is_check or output_file == input_file:
+                return SortFileResult(input_file=input_file, output_file=output_file)
+
+            with timer.phase(PHASE_WRITE):
+                tmp_file = cls._create_temp_file(output_file)
+                shutil.copyfile(input_file, tmp_file)
+                is_changed = cls._replace_if_changed(tmp_file, output_file)
+
+            return SortFileResult(input_file=input_file, output_file=output_file, is_changed=is_changed)
+
+        # 出力しながらソートするため、上限を超えていないことを先に確認する
+        with timer.phase(PHASE_LOAD):
+            try:
+                limits.scan_yaml_file(input_file, backend.loader)
+            except (YAMLError, ScannerError):
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not YAML file.')
+
+        tmp_file = None if is_check else cls._create_temp_file(output_file)
+
+        try:
+            with timer.phase(PHASE_STREAM):
+                sorter = StreamingSorter(backend, rules=rules)
+
+                with open(input_file, mode='r', encoding='utf_8') as input_stream:
+                    if is_check:
+                        result = sorter.sort(input_stream)
+                    else:
+                        with open(tmp_file, mode='w', encoding='utf_8', newline='\n') as output_stream:
+                            result = sorter.sort(input_stream, output_stream)
+        except AliasOrderError as e:
+            # 入力は正しいYAMLだが、並べ替えた結果をイベント単位では出力できない
+            cls._remove_temp_file(tmp_file)
+            return SortFileResult(input_file=input_file, error=f'{input_file} cannot be sorted in stream mode: {e}.')
+        except (YAMLError, ScannerError):
+            result = None
+        except BaseException:
+            cls._remove_temp_file(tmp_file)
+            raise
+
+        with timer.phase(PHASE_VALIDATE):
+            if result is None or not result.documents:
+                cls._remove_temp_file(tmp_file)
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not YAML file.')
+
+            if is_validate and not cls.is_openapi_document(result.header):
+                cls._remove_temp_file(tmp_file)
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not OpenAPI file.')
+
+        if is_check:
+            if not result.is_sorted:
+                return SortFileResult(input_file=input_file, error=f'{input_file} is not sorted.')
+
+            return SortFileResult(input_file=input_file)
+
+        with timer.phase(PHASE_WRITE):
+            is_changed = cls._replace_if_changed(tmp_file, output_file)
+
+            if cache:
+                cache.add(cache.file_key(output_file, **cache_options))
+
+        return SortFileResult(input_file=input_file, output_file=output_file, is_changed=is_changed)
+
+    @classmethod
+    def _cache_options(
+        cls,
+        is_validate: bool,
+        is_validate_schema: bool = False,
+        rules: Optional[SortRules] = None,
+        is_splice: bool = False,
+        output_format: str = FORMAT_YAML,
+        is_stream: bool = False,
+    ) -> dict:
+        options = {}
+
+        # 検証を省略して記録した内容は、検証ありの実行ではソート済みとして扱わない
+        if is_validate_schema:
+            options['validate'] = 'schema'
+        elif not is_validate:
+            options['validate'] = False
+
+        # ルールが異なればソート済みかどうかも変わる
+        if rules is not None and rules != DEFAULT_RULES:
+            options['rules'] = rules.to_config()
+
+            # ロケール順のルールは実行環境の照合順序によって結果が変わる
+            if any(rule.order == ORDER_LOCALE for rule in rules.rules):
+                options['locale'] = locale.setlocale(locale.LC_COLLATE)
+
+        # 元のテキストを並べ替えた結果は、出力し直した結果とは書式が異なる
+        if is_splice:
+            options['splice'] = True
+
+        # イベント単位で出力した結果はアンカー名を入力のまま残すため、ドキュメント全体から出力し直した結果とは異なる
+        if is_stream:
+            options['stream'] = True
+
+        # キャッシュには出力した内容を記録するので、JSONで出力した内容はYAMLの出力先ではソート済みとして扱わない
+        if output_format == FORMAT_JSON:
+            options['format'] = FORMAT_JSON
+
+        return options
+
+    @classmethod
+    def _splice(cls, splicer: SpliceSorter, content: str, node: Any, openapi_json: dict) -> Optional[str]:
+        # 元のテキストを並べ替えられない書き方の場合や、読み直した内容がソート結果と一致しない場合(アンカーやマージキー、
+        # |+の末尾の改行など)はNoneを返し、通常どおりYAMLを出力し直す
+        try:
+            spliced = splicer.splice(content, node)
+        except SpliceError:
+            return None
+
+        # 読み直しはファイル全体のパースになるため、必要な場合だけ行う
+        if splicer.needs_verify(content) and not splicer.verify(spliced, openapi_json):
+            return None
+
+        return spliced
+
+    @classmethod
+    def _write_if_changed(cls, output_file: str, content: bytes, original_content: Optional[bytes] = None) -> bool:
+        # 標準出力には常に書き出し、入力から変わったかどうかを返す
+        if output_file == STDIO:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(content)
+            sys.stdout.buffer.flush()
+            return content != original_content
+
+        if original_content is None:
+            try:
+                with open(output_file, mode='rb') as f:
+                    original_content = f.read()
+            except OSError:
+                original_content = None
+
+        if content == original_content:
+            return False
+
+        tmp_file = cls._create_temp_file(output_file)
+
+        try:
+            with open(tmp_file, mode='wb') as f:
+                f.write(content)
+        except BaseException:
+            cls._remove_temp_file(tmp_file)
+            raise
+
+        cls._replace(tmp_file, output_file)
+
+        return True
+
+    @classmethod
+    def _create_temp_file(cls, output_file: str) -> str:
+        # 同じディレクトリに一時ファイルを作成してからリネームすることで、書き込み途中のファイルが見えないようにする
+        # シンボリックリンクはリンク先のファイルを置き換えるので、リンク先のディレクトリに作成する
+        real_file = os.path.realpath(output_file)
+        output_dir = os.path.dirname(real_file)
+        fd, tmp_file = tempfile.mkstemp(dir=output_dir, prefix=f'.{os.path.basename(real_file)}.', suffix='.tmp')
+        os.close(fd)
+
+        return tmp_file
+
+    @classmethod
+    def _remove_temp_file(cls, tmp_file: Optional[str]):
+        if tmp_file and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+    @classmethod
+    def _replace_if_changed(cls, tmp_file: str, output_file: str) -> bool:
+        if os.path.isfile(output_file) and filecmp.cmp(tmp_file, output_file, shallow=False):
+            cls._remove_temp_file(tmp_file)
+            return False
+
+        cls._replace(tmp_file, output_file)
+
+        return True
+
+    @classmethod
+    def _replace(cls, tmp_file: str, output_file: str):
+        try:
+            # シンボリックリンク自体を通常のファイルで置き換えず、リンク先のファイルを(パーミッションを保って)置き換える
+            real_file = os.path.realpath(output_file)
+            try:
+                mode = os.stat(real_file).st_mode & 0o777
+            except OSError:
+                mode = 0o666 & ~UMASK
+            os.chmod(tmp_file, mode)
+
+            os.replace(tmp_file, real_file)
+        except BaseException:
+            cls._remove_temp_file(tmp_file)
+            raise
+
+    @classmethod
+    def _sort_dict(cls, openapi_json: dict, rules: Optional[SortRules] = None) -> dict:
+        return (rules or DEFAULT_RULES).sort(openapi_json)
+
+    @classmethod
+    def _is_sorted(cls, openapi_json: dict, rules: Optional[SortRules] = None) -> bool:
+        # _sort_dictと同じ箇所を走査し、順序が崩れているキーが見つかった時点で打ち切る
+        return (rules or DEFAULT_RULES).is_sorted(openapi_json)
+
+    @classmethod
+    def _dump(cls, openapi_json: dict, backend: YamlBackend = None) -> str:
+        backend = backend or get_backend()
+
+        # 文字列のrepresenterは専用のDumper(OpenApiDumper)に登録済みなので、ここでは何も変更しない
+        return backend.dump(openapi_json)
 
     @classmethod
     def _represent_str(cls, dumper, instance):
-        if "\n" in instance:
-            instance = "\n".join([line.rstrip() for line in instance.splitlines()])
-            return dumper.represent_scalar('tag:yaml.org,2002:str', instance, style="|")
-        elif re.match(MATCH_REGEX, instance) or re.search(SEARCH_REGEX, instance):
-            return dumper.represent_scalar('tag:yaml.org,2002:str', instance, style="'")
-        else:
-            return dumper.represent_scalar('tag:yaml.org,2002:str', instance)
+        return represent_str(dumper, instance)
 
     @classmethod
-    def is_valid_openapi(cls, input_file: str) -> bool:
+    def load_content(
+        cls,
+        content: str,
+        input_format: Optional[str] = None,
+        backend: YamlBackend = None,
+        limits: Optional[ResourceLimits] = None,
+    ) -> Optional[Any]:
+        # JSONはPyYAMLを使わずに読み込み、JSONとして読めない場合(YAMLのフロースタイルなど)はYAMLとして読み込む
+        # 上限を超える場合はLimitErrorを送出する
+        if (input_format or sniff_format(content)) == FORMAT_JSON:
+            try:
+                document = load_json(content)
+            except ValueError:
+                pass
+            else:
+                if limits:
+                    limits.check_document(document)
+                return document
+
+        if limits:
+            try:
+                limits.scan_yaml(content, (backend or get_backend()).loader)
+            except (YAMLError, ScannerError):
+                return None
+
+        return cls.load_yaml(content, backend=backend)
+
+    @classmethod
+    def load_yaml(cls, content: str, backend: YamlBackend = None) -> Optional[Any]:
+        backend = backend or get_backend()
+
+        # パースに失敗した場合はNoneを返し、is_yaml_documentで弾く
+        try:
+            return yaml.load(content, Loader=backend.loader)
+        except (YAMLError, ScannerError):
+            return None
+
+    @classmethod
+    def is_openapi_document(cls, spec_dict: Any) -> bool:
+        # openapi_spec_validatorは読み込みに時間がかかるため、検証が必要になった時点で読み込む
+        from openapi_spec_validator.validation import openapi_spec_validator_proxy
+        from openapi_spec_validator.validation.exceptions import OpenAPIValidationError, ValidatorDetectError
+
         try:
+            # パース済みの辞書からOpenAPIのバージョンを判定する(ファイルの再読み込みはしない)
             # If no exception is raised by validate_spec(), the spec is valid.
-            spec_dict, spec_url = read_from_filename(input_file)
+            if not isinstance(spec_dict, dict):
+                raise ValidatorDetectError("Spec schema version not detected")
+
+            openapi_spec_validator_proxy.detect(spec_dict)
 
             # validate_spec(spec_dict)
 
             return True
-        except (OpenAPIValidationError, ValidatorDetectError):
-            traceback.print_exc()
+        except (OpenAPIValidationError, ValidatorDetectError, AttributeError):
             return False
 
     @classmethod
-    def is_valid_yaml(cls, input_file: str):
+    def validate_schema(cls, spec_dict: dict, timeout: Optional[float] = DEFAULT_VALIDATE_TIMEOUT) -> Optional[str]:
+        # OpenAPIのスキーマで検証し、エラーがあればその内容を返す
+        # 制限時間がある場合は、プロセスごとに1つ起動して使い回す検証用のプロセスで実行する
+        return get_validator().validate(spec_dict, timeout)
+
+    @classmethod
+    def is_yaml_document(cls, data: Any) -> bool:
+        return data is not None
+
+    @classmethod
+    def is_valid_openapi(cls, input_file: str) -> bool:
+        # ファイルを読み込んで判定する(パース済みの辞書はis_openapi_documentで判定する)
+        return cls.is_openapi_document(cls._load_file(input_file))
+
+    @classmethod
+    def is_valid_yaml(cls, input_file: str) -> bool:
+        # ファイルを読み込んで判定する(パース済みの内容はis_yaml_documentで判定する)
+        return cls.is_yaml_document(cls._load_file(input_file))
+
+    @classmethod
+    def _load_file(cls, input_file: str) -> Optional[Any]:
+        with open(input_file, mode='rb') as f:
+            raw_content = f.read()
+
         try:
-            with open(input_file, "r") as file:
-                data = yaml.safe_load(file)
-            return data is not None
-        except (YAMLError, ScannerError):
-            return False
+            content = raw_content.decode('utf_8')
+        except UnicodeDecodeError:
+            return None
+
+        return cls.load_content(content, detect_format(input_file, raw_content))
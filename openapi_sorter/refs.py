@@ -0,0 +1,177 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from openapi_sorter.limits import LimitError, ResourceLimits
+
+# 複数ファイルに分割されたspec($ref: './schemas/user.yaml'など)の参照関係を解析する
+# 各ファイルは1回だけ読み込んでパースし、参照の解析とソートで同じ結果を使い回す
+
+REF_KEY = '$ref'
+
+# パースせずにテキストから参照先を拾う(YAMLの'$ref: ./a.yaml'とJSONの'"$ref": "./a.yaml"'の両方)
+REF_TEXT_REGEX = re.compile(r'''["']?\$ref["']?\s*:\s*["']?([^"'\s#,{}\[\]]*)''')
+
+
+class ParsedFile(NamedTuple):
+    raw_content: bytes
+    # パースに失敗した場合はNone
+    document: Any
+    # 上限を超えて読み込まなかった場合の理由
+    error: Optional[str] = None
+
+
+class ParseCache:
+    def __init__(self, load: Callable[[str], Any], limits: Optional[ResourceLimits] = None):
+        self.load = load
+        self.limits = limits or ResourceLimits()
+        self.files: Dict[str, Optional[ParsedFile]] = {}
+
+    def get(self, path: str) -> Optional[ParsedFile]:
+        key = os.path.realpath(path)
+
+        if key not in self.files:
+            try:
+                self.limits.check_file(path)
+                with open(path, mode='rb') as f:
+                    raw_content = f.read()
+            except LimitError as e:
+                self.files[key] = ParsedFile(raw_content=b'', document=None, error=str(e))
+            except OSError:
+                self.files[key] = None
+            else:
+                error = None
+                try:
+                    document = self.load(raw_content.decode('utf_8'))
+                except UnicodeDecodeError:
+                    document = None
+                except LimitError as e:
+                    document, error = None, str(e)
+                self.files[key] = ParsedFile(raw_content=raw_content, document=document, error=error)
+
+        return self.files[key]
+
+
+def find_refs(document: Any) -> List[str]:
+    # 外部ファイルへの参照だけを集める(同じファイル内の'#/...'とURLは対象外)
+    refs = []
+    stack = [document]
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, dict):
+            ref = value.get(REF_KEY)
+            if isinstance(ref, str):
+                path = ref.split('#', 1)[0]
+                if path and '://' not in path and path not in refs:
+                    refs.append(path)
+
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+
+    return refs
+
+
+def scan_refs(content: str) -> List[str]:
+    # find_refsの高速な近似: 説明文などに書かれた'$ref:'も拾うので、参照先が実際より多くなることはあっても少なくはならない
+    # (エイリアスや複数行に分けて書いた参照は拾えない)
+    refs = []
+
+    for path in REF_TEXT_REGEX.findall(content):
+        if path and '://' not in path and path not in refs:
+            refs.append(path)
+
+    return refs
+
+
+def resolve_ref(base_file: str, ref: str) -> str:
+    return os.path.normpath(os.path.join(os.path.dirname(base_file), ref))
+
+
+class RefGraph:
+    def __init__(self, parse_cache: ParseCache):
+        self.parse_cache = parse_cache
+        # 実パス -> 参照先の実パス
+        self.edges: Dict[str, List[str]] = {}
+        self.referenced: Set[str] = set()
+
+    def add(self, path: str):
+        # 入力ファイルから辿れるファイルを(入力に含まれないものも)すべて読み込み、参照関係を記録する
+        queue = [path]
+
+        while queue:
+            current = queue.pop()
+            key = os.path.realpath(current)
+            if key in self.edges:
+                continue
+
+            parsed = self.parse_cache.get(current)
+            refs = find_refs(parsed.document) if parsed is not None else []
+
+            targets = []
+            for ref in refs:
+                target = resolve_ref(current, ref)
+                if os.path.isfile(target):
+                    target_key = os.path.realpath(target)
+                    targets.append(target_key)
+                    self.referenced.add(target_key)
+                    queue.append(target)
+
+            self.edges[key] = targets
+
+    def is_referenced(self, path: str) -> bool:
+        return os.path.realpath(path) in self.referenced
+
+    def groups(self, input_files: List[str]) -> List[List[str]]:
+        # 参照でつながっているファイルごとに入力ファイルをまとめ、各グループ内は参照先が先になるように並べる
+        parents = {key: key for key in self.edges}
+
+        def find(key: str) -> str:
+            while parents[key] != key:
+                parents[key] = parents[parents[key]]
+                key = parents[key]
+            return key
+
+        for key, targets in self.edges.items():
+            for target in targets:
+                parents[find(target)] = find(key)
+
+        order = self._dependency_order()
+
+        input_keys = {}
+        for input_file in input_files:
+            input_keys.setdefault(os.path.realpath(input_file), input_file)
+
+        groups: Dict[str, List[str]] = {}
+        for key in order:
+            if key in input_keys:
+                groups.setdefault(find(key), []).append(input_keys[key])
+
+        return list(groups.values())
+
+    def _dependency_order(self) -> List[str]:
+        # 参照先を先に並べる(循環参照している場合は先に辿った方を先にする)
+        order = []
+        visited = set()
+
+        for root in self.edges:
+            if root in visited:
+                continue
+
+            visited.add(root)
+            stack = [(root, iter(self.edges[root]))]
+
+            while stack:
+                key, targets = stack[-1]
+                target = next(targets, None)
+
+                if target is None:
+                    stack.pop()
+                    order.append(key)
+                elif target not in visited:
+                    visited.add(target)
+                    stack.append((target, iter(self.edges.get(target, []))))
+
+        return order
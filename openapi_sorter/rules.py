@@ -0,0 +1,374 @@
+import locale
+import os
+import re
+from itertools import islice
+from operator import gt
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import yaml
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10以前
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# どのセクションをどの順序で並べ替えるかを宣言的に定義する
+# ルールはキーのパス(*は任意のキー・配列の要素)ごとのトライ木にまとめておき、ドキュメントを1回走査するだけで全ルールを適用する
+
+ORDER_LEXICAL = 'lexical'
+ORDER_NATURAL = 'natural'
+# 実行環境のロケール(LC_COLLATE)の照合順序
+ORDER_LOCALE = 'locale'
+
+ORDERS = [ORDER_LEXICAL, ORDER_NATURAL, ORDER_LOCALE]
+
+WILDCARD = '*'
+
+CONFIG_FILES = ['.openapi-sorter.yaml', '.openapi-sorter.yml']
+PYPROJECT_FILE = 'pyproject.toml'
+PYPROJECT_SECTION = 'openapi-sorter'
+
+NATURAL_REGEX = re.compile(r'(\d+)')
+
+
+class RuleError(ValueError):
+    pass
+
+
+class SortRule(NamedTuple):
+    path: Tuple[str, ...]
+    # ORDER_LEXICAL / ORDER_NATURAL / ORDER_LOCALE、またはキーの並び順のリスト(リストにないキーはその後ろに辞書順で並べる)
+    order: Union[str, Tuple[str, ...]] = ORDER_LEXICAL
+    # 配列の場合に並べ替えに使う要素のキー(tagsのnameなど)
+    by: Optional[str] = None
+
+    def to_config(self) -> dict:
+        config = {'path': list(self.path), 'order': self.order if isinstance(self.order, str) else list(self.order)}
+        if self.by is not None:
+            config['by'] = self.by
+        return config
+
+
+DEFAULT_RULES_CONFIG = [
+    SortRule(path=('paths',)),
+    SortRule(path=('components', 'requestBodies')),
+    SortRule(path=('components', 'schemas')),
+    SortRule(path=('tags',), by='name'),
+]
+
+
+def lexical_key(value: Any) -> tuple:
+    # 値がない要素(nameのないタグなど)は最後に並べる
+    return (value is None, '' if value is None else str(value))
+
+
+def natural_key(value: Any) -> tuple:
+    if value is None:
+        return (True, [])
+
+    # splitの結果は文字列と数字が交互に並ぶので、同じ位置同士は常に同じ型で比較される
+    parts = NATURAL_REGEX.split(str(value))
+    parts[1::2] = map(int, parts[1::2])
+    return (False, parts)
+
+
+def locale_key(value: Any) -> tuple:
+    return (value is None, '' if value is None else locale.strxfrm(str(value)))
+
+
+class OrderKey:
+    def __init__(self, order: Sequence[str]):
+        self.index = {key: i for i, key in enumerate(order)}
+
+    def __call__(self, value: Any) -> tuple:
+        if value in self.index:
+            return (0, self.index[value], '')
+
+        return (1, 0) + lexical_key(value)
+
+
+def sort_keys(values: List[Any], sort_key) -> List[Any]:
+    # 文字列だけを辞書順に並べる場合(ほとんどのセクション)は、キー関数を呼ばずに値をそのまま比較する
+    if sort_key is lexical_key and all(type(value) is str for value in values):
+        return values
+
+    return [sort_key(value) for value in values]
+
+
+def is_ordered(keys: List[Any]) -> bool:
+    return not any(map(gt, keys, islice(keys, 1, None)))
+
+
+def sorted_indexes(values: List[Any], sort_key) -> Optional[List[int]]:
+    # 比較用の値は要素ごとに1回だけ計算し、すでに並んでいる場合(ほとんどのファイル)は並べ替えずにNoneを返す
+    keys = sort_keys(values, sort_key)
+    if is_ordered(keys):
+        return None
+
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+def get_sort_key(order: Union[str, Sequence[str]]):
+    if order == ORDER_LEXICAL:
+        return lexical_key
+    if order == ORDER_NATURAL:
+        return natural_key
+    if order == ORDER_LOCALE:
+        return locale_key
+
+    return OrderKey(order)
+
+
+class RuleNode:
+    def __init__(self):
+        self.rule: Optional[SortRule] = None
+        self.sort_key = None
+        self.children: Dict[str, 'RuleNode'] = {}
+        self.wildcard: Optional['RuleNode'] = None
+
+    def child(self, key: Any) -> Optional['RuleNode']:
+        if isinstance(key, str):
+            node = self.children.get(key)
+            if node is not None:
+                return node
+
+        return self.wildcard
+
+    def item(self) -> Optional['RuleNode']:
+        return self.wildcard
+
+
+class SortRules:
+    def __init__(self, rules: Iterable[SortRule]):
+        self.rules = list(rules)
+        self.root = self._compile(self.rules)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SortRules) and self.rules == other.rules
+
+    def to_config(self) -> List[dict]:
+        return [rule.to_config() for rule in self.rules]
+
+    def sort(self, document: Any) -> Any:
+        return self._sort(document, self.root)
+
+    def is_sorted(self, document: Any) -> bool:
+        return self._is_sorted(document, self.root)
+
+    @classmethod
+    def _compile(cls, rules: List[SortRule]) -> RuleNode:
+        root = RuleNode()
+
+        for rule in rules:
+            node = root
+            for segment in rule.path:
+                if segment == WILDCARD:
+                    node.wildcard = node.wildcard or RuleNode()
+                    node = node.wildcard
+                else:
+                    node = node.children.setdefault(segment, RuleNode())
+
+            # 同じパスのルールは後から定義したものを優先する
+            node.rule = rule
+            node.sort_key = get_sort_key(rule.order)
+
+        return cls._merge_wildcards(root)
+
+    @classmethod
+    def _merge_wildcards(cls, node: RuleNode) -> RuleNode:
+        # 「components.*」と「components.schemas.*.properties」のように*と具体的なキーの両方に一致するルールを
+        # 走査時に両方辿らなくて済むよう、*のルールを具体的なキーの子に事前に取り込む
+        if node.wildcard is not None:
+            node.wildcard = cls._merge_wildcards(node.wildcard)
+
+        for key, child in node.children.items():
+            node.children[key] = cls._merge_wildcards(cls._merge(node.wildcard, child) if node.wildcard else child)
+
+        return node
+
+    @classmethod
+    def _merge(cls, base: RuleNode, override: RuleNode) -> RuleNode:
+        merged = RuleNode()
+
+        source = override if override.rule is not None else base
+        merged.rule = source.rule
+        merged.sort_key = source.sort_key
+
+        for key in base.children.keys() | override.children.keys():
+            if key in base.children and key in override.children:
+                merged.children[key] = cls._merge(base.children[key], override.children[key])
+            else:
+                merged.children[key] = override.children.get(key) or base.children[key]
+
+        if base.wildcard and override.wildcard:
+            merged.wildcard = cls._merge(base.wildcard, override.wildcard)
+        else:
+            merged.wildcard = override.wildcard or base.wildcard
+
+        return merged
+
+    @classmethod
+    def _item_value(cls, item: Any, by: Optional[str]) -> Any:
+        if by is None:
+            return None if isinstance(item, (dict, list)) else item
+
+        return item.get(by) if isinstance(item, dict) else None
+
+    @classmethod
+    def _sort(cls, value: Any, node: RuleNode) -> Any:
+        if node.rule is not None:
+            sort_key = node.sort_key
+
+            if isinstance(value, dict):
+                keys = list(value)
+                sort_values = sort_keys(keys, sort_key)
+
+                # 並べ替えが必要な場合だけ、並べ替えたキーの順に1回で新しい辞書を作る(文字列のキーはそのまま並べ替える)
+                if not is_ordered(sort_values):
+                    if sort_values is keys:
+                        keys = sorted(keys)
+                    else:
+                        keys = [keys[i] for i in sorted(range(len(keys)), key=sort_values.__getitem__)]
+                    value = {key: value[key] for key in keys}
+            elif isinstance(value, list):
+                indexes = sorted_indexes([cls._item_value(item, node.rule.by) for item in value], sort_key)
+                if indexes is not None:
+                    value = [value[i] for i in indexes]
+
+        if node.children or node.wildcard:
+            if isinstance(value, dict):
+                for key, child_value in value.items():
+                    child = node.child(key)
+                    if child is not None:
+                        sorted_value = cls._sort(child_value, child)
+                        if sorted_value is not child_value:
+                            value[key] = sorted_value
+            elif isinstance(value, list) and node.wildcard:
+                for i, item in enumerate(value):
+                    value[i] = cls._sort(item, node.wildcard)
+
+        return value
+
+    @classmethod
+    def _is_sorted(cls, value: Any, node: RuleNode) -> bool:
+        if node.rule is not None:
+            sort_key = node.sort_key
+
+            if isinstance(value, dict):
+                keys = sort_keys(list(value), sort_key)
+            elif isinstance(value, list):
+                keys = sort_keys([cls._item_value(item, node.rule.by) for item in value], sort_key)
+            else:
+                keys = []
+
+            if not is_ordered(keys):
+                return False
+
+        if node.children or node.wildcard:
+            if isinstance(value, dict):
+                for key, child_value in value.items():
+                    child = node.child(key)
+                    if child is not None and not cls._is_sorted(child_value, child):
+                        return False
+            elif isinstance(value, list) and node.wildcard:
+                return all(cls._is_sorted(item, node.wildcard) for item in value)
+
+        return True
+
+
+DEFAULT_RULES = SortRules(DEFAULT_RULES_CONFIG)
+
+
+def parse_rule(config: Any) -> SortRule:
+    if not isinstance(config, dict) or 'path' not in config:
+        raise RuleError(f'a rule must be a mapping with a path: {config!r}')
+
+    unknown_keys = set(config) - {'path', 'order', 'by'}
+    if unknown_keys:
+        raise RuleError(f"unknown rule keys: {', '.join(sorted(unknown_keys))}")
+
+    path = config['path']
+    if isinstance(path, str):
+        path = path.split('.')
+    if not isinstance(path, list) or not path or not all(isinstance(segment, str) and segment for segment in path):
+        raise RuleError(f'invalid rule path: {config["path"]!r}')
+
+    order = config.get('order', ORDER_LEXICAL)
+    if isinstance(order, list) and all(isinstance(key, str) for key in order):
+        order = tuple(order)
+    elif order not in ORDERS:
+        raise RuleError(f"invalid rule order: {order!r} ({', '.join(ORDERS)} or a list of keys)")
+
+    by = config.get('by')
+    if by is not None and not isinstance(by, str):
+        raise RuleError(f'invalid rule by: {by!r}')
+
+    return SortRule(path=tuple(path), order=order, by=by)
+
+
+def rules_from_config(config: Any) -> SortRules:
+    if config is None:
+        config = {}
+    if not isinstance(config, dict):
+        raise RuleError('the configuration must be a mapping')
+
+    rules = config.get('rules', [])
+    if not isinstance(rules, list):
+        raise RuleError('rules must be a list')
+
+    # 既定のルール(paths, components.requestBodies, components.schemas, tags)に追加する(default-rules: falseで置き換える)
+    default_rules = DEFAULT_RULES_CONFIG if config.get('default-rules', True) else []
+
+    return SortRules(default_rules + [parse_rule(rule) for rule in rules])
+
+
+def read_config(path: str) -> Optional[dict]:
+    with open(path, mode='rb') as f:
+        content = f.read()
+
+    if os.path.basename(path) != PYPROJECT_FILE:
+        try:
+            return yaml.safe_load(content.decode('utf_8'))
+        except yaml.YAMLError as e:
+            raise RuleError(f'{path} is not YAML file.') from e
+
+    if tomllib is None:
+        if f'[tool.{PYPROJECT_SECTION}'.encode('utf_8') not in content:
+            return None
+        raise RuleError(f'reading the configuration from {path} requires Python 3.11 or the tomli package')
+
+    try:
+        return tomllib.loads(content.decode('utf_8')).get('tool', {}).get(PYPROJECT_SECTION)
+    except tomllib.TOMLDecodeError as e:
+        raise RuleError(f'{path} is not TOML file.') from e
+
+
+def find_config(directory: Optional[str] = None) -> Optional[str]:
+    # カレントディレクトリから親方向に設定ファイルを探す(pyproject.tomlはopenapi-sorterの設定がある場合だけ使う)
+    directory = os.path.abspath(directory or os.getcwd())
+
+    while True:
+        for name in CONFIG_FILES:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return path
+
+        path = os.path.join(directory, PYPROJECT_FILE)
+        if os.path.isfile(path) and read_config(path) is not None:
+            return path
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def load_rules(path: Optional[str] = None, directory: Optional[str] = None) -> SortRules:
+    path = path or find_config(directory)
+    if path is None:
+        return DEFAULT_RULES
+
+    return rules_from_config(read_config(path))
@@ -0,0 +1,358 @@
+import json
+import os
+import socket
+import socketserver
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from openapi_sorter import __version__
+from openapi_sorter.backends import BACKEND_AUTO
+from openapi_sorter.cache import SortCache
+from openapi_sorter.formats import FORMAT_AUTO
+from openapi_sorter.limits import DEFAULT_LIMITS, LimitError, ResourceLimits
+from openapi_sorter.openapi_sorter import DEFAULT_VALIDATE_TIMEOUT, OpenApiSorter, OpenApiSorterError, SortFileResult
+from openapi_sorter.rules import ORDER_LOCALE, RuleError, SortRules, parse_rule
+from openapi_sorter.validation import SchemaValidator, set_validator
+
+# 起動済みのプロセスをUnixドメインソケットで待ち受けさせ、インタプリタの起動やopenapi_spec_validatorの読み込みを省略する
+# 1接続につき1リクエスト: クライアントはJSONを1行送り、サーバーはJSONを1行ずつ返して接続を閉じる
+# runの結果はファイルごとに{"result": ...}を返し、最後に{"ok": ..., "errors": [...]}を返す
+
+SOCKET_ENV = 'OPENAPI_SORTER_SOCKET'
+
+CONNECT_TIMEOUT = 1.0
+
+COMMANDS = ['ping', 'sort', 'check', 'validate', 'run']
+
+
+class ServerError(Exception):
+    pass
+
+
+def default_socket_path() -> str:
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'openapi-sorter.sock')
+
+    return os.path.join(tempfile.gettempdir(), f'openapi-sorter-{os.getuid()}.sock')
+
+
+def encode_sort_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # OpenApiSorter.sortの引数をJSONにする(サーバーのカレントディレクトリは異なるため、パスは絶対パスにする)
+    data = {}
+
+    for key, value in kwargs.items():
+        if key in ('on_result', 'on_timing'):
+            continue
+
+        if key == 'input_files':
+            value = [os.path.abspath(input_file) for input_file in value]
+        elif key in ('output_file', 'profile_file') and value is not None:
+            value = os.path.abspath(value)
+        elif key in ('rules', 'limits') and value is not None:
+            value = value.to_config()
+        elif key == 'cache' and value is not None:
+            value = {'cache_dir': os.path.abspath(value.cache_dir), 'max_size': value.max_size}
+
+        data[key] = value
+
+    return data
+
+
+def decode_sort_kwargs(data: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = dict(data)
+
+    if kwargs.get('rules') is not None:
+        kwargs['rules'] = decode_rules(kwargs['rules'])
+    if kwargs.get('cache') is not None:
+        kwargs['cache'] = SortCache(**kwargs['cache'])
+    if kwargs.get('limits') is not None:
+        kwargs['limits'] = ResourceLimits(**kwargs['limits'])
+
+    return kwargs
+
+
+def decode_rules(config: Optional[List[dict]]) -> Optional[SortRules]:
+    return None if config is None else SortRules([parse_rule(rule) for rule in config])
+
+
+def encode_result(result: SortFileResult) -> Dict[str, Any]:
+    return {
+        'input_file': result.input_file,
+        'error': result.error,
+        'output_file': result.output_file,
+        'is_changed': result.is_changed,
+        'timings': result.timings,
+    }
+
+
+def handle_request(request: Any, send: Callable[[dict], None]):
+    if not isinstance(request, dict) or request.get('command') not in COMMANDS:
+        send({'ok': False, 'error': 'invalid request'})
+        return
+
+    # バージョンが異なるサーバーでは結果が変わる可能性があるため、クライアントにローカルで実行させる
+    if request.get('version', __version__) != __version__:
+        send({'ok': False, 'error': f'the server runs openapi-sorter {__version__}', 'version': __version__})
+        return
+
+    command = request['command']
+
+    if command == 'ping':
+        send({'ok': True, 'version': __version__, 'pid': os.getpid()})
+        return
+
+    if command == 'run':
+        try:
+            result, errors = OpenApiSorter.sort(
+                **decode_sort_kwargs(request.get('kwargs', {})),
+                on_result=lambda sort_file_result: send({'result': encode_result(sort_file_result)}),
+            )
+        except (OSError, RuleError, TypeError, ValueError) as e:
+            send({'ok': False, 'error': str(e)})
+            return
+
+        send({'ok': result, 'errors': errors})
+        return
+
+    content = request.get('content')
+    if not isinstance(content, str):
+        send({'ok': False, 'error': 'content must be a string'})
+        return
+
+    backend = request.get('backend', BACKEND_AUTO)
+
+    try:
+        rules = decode_rules(request.get('rules'))
+        # 上限の指定がなければCLIの既定の上限で、巨大な内容やエイリアスの展開を拒否する
+        limits = DEFAULT_LIMITS if request.get('limits') is None else ResourceLimits(**request['limits'])
+
+        if command == 'sort':
+            sorted_content = OpenApiSorter.sort_string(
+                content,
+                backend=backend,
+                rules=rules,
+                is_splice=request.get('is_splice', False),
+                is_splice_verify=request.get('is_splice_verify', False),
+                output_format=request.get('output_format', FORMAT_AUTO),
+                limits=limits,
+            )
+            send({'ok': True, 'content': sorted_content})
+        elif command == 'check':
+            is_sorted = OpenApiSorter.is_sorted_string(content, backend=backend, rules=rules, limits=limits)
+            send({'ok': True, 'is_sorted': is_sorted})
+        else:
+            limits.check_content(content)
+            openapi_json = OpenApiSorter.load_content(content, limits=limits)
+            if not OpenApiSorter.is_yaml_document(openapi_json):
+                raise OpenApiSorterError('content is not YAML.')
+
+            error = OpenApiSorter.validate_schema(
+                openapi_json, timeout=request.get('timeout', DEFAULT_VALIDATE_TIMEOUT)
+            )
+            send({'ok': error is None, 'error': error})
+    except LimitError as e:
+        send({'ok': False, 'error': f'content was rejected: {e}'})
+    except (OpenApiSorterError, RuleError, TypeError, ValueError) as e:
+        send({'ok': False, 'error': str(e)})
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        def send(message: dict):
+            # 応答を待たずに切断したクライアントには送らない
+            try:
+                self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf_8') + b'\n')
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        line = self.rfile.readline()
+        # 何も送らずに切断した接続(サーバーの起動確認など)
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+        except ValueError:
+            send({'ok': False, 'error': 'invalid request'})
+            return
+
+        handle_request(request, send)
+
+
+class SortServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # リクエストは接続ごとのスレッドで並行して処理する(長いrunの実行中もほかのクライアントを待たせない)
+    daemon_threads = True
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or default_socket_path()
+
+        if os.path.exists(self.socket_path):
+            if SortClient(self.socket_path).ping() is not None:
+                raise ServerError(f'a server is already running on {self.socket_path}')
+
+            # 前回異常終了したサーバーのソケットが残っている
+            os.remove(self.socket_path)
+
+        # 同じユーザーだけが接続できるようにする
+        umask = os.umask(0o077)
+        try:
+            super().__init__(self.socket_path, RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        super().server_close()
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def serve(socket_path: Optional[str] = None, on_ready: Optional[Callable[[SortServer], None]] = None):
+    import multiprocessing
+
+    # リクエストを処理するスレッドが動いているプロセスからforkしないように、検証用のプロセスはforkserverから起動する
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        set_validator(SchemaValidator('forkserver'))
+
+    with SortServer(socket_path) as server:
+        if on_ready:
+            on_ready(server)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class SortClient:
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or default_socket_path()
+
+    def is_available(self) -> bool:
+        # 他のユーザーが作成したソケットには接続しない
+        try:
+            return os.stat(self.socket_path).st_uid == os.getuid()
+        except OSError:
+            return False
+
+    def request(self, message: dict, on_message: Optional[Callable[[dict], None]] = None) -> dict:
+        # 最後の応答を返し、それより前の応答(runのファイルごとの結果)はon_messageに渡す
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(CONNECT_TIMEOUT)
+            client.connect(self.socket_path)
+            # 接続後はソートが終わるまで待つ
+            client.settimeout(None)
+
+            client.sendall(json.dumps({**message, 'version': __version__}).encode('utf_8') + b'\n')
+
+            response = None
+            with client.makefile('rb') as stream:
+                for line in stream:
+                    if response is not None and on_message:
+                        on_message(response)
+                    response = json.loads(line)
+
+        if response is None:
+            raise ConnectionError('the server closed the connection without a response')
+
+        return response
+
+    def ping(self) -> Optional[dict]:
+        try:
+            response = self.request({'command': 'ping'})
+        except (OSError, ValueError):
+            return None
+
+        return response if response.get('ok') else None
+
+    def sort_string(self, content: str, **options) -> str:
+        response = self.request({'command': 'sort', 'content': content, **options})
+        if not response.get('ok'):
+            raise OpenApiSorterError(response.get('error'))
+
+        return response['content']
+
+    def run(
+        self,
+        kwargs: Dict[str, Any],
+        on_result: Optional[Callable[[SortFileResult], None]] = None,
+        on_timing: Optional[Callable[[str, str, float], None]] = None,
+    ) -> Tuple[bool, List[str]]:
+        # サーバーには絶対パスを送るので、結果のパスはクライアントが指定したパスに戻す(ローカルで実行した場合と同じ出力にする)
+        input_files = list(kwargs.get('input_files', []))
+        kwargs = {**kwargs, 'input_files': input_files}
+
+        paths = {}
+        for path in input_files + [kwargs.get('output_file')]:
+            if path is not None:
+                paths.setdefault(os.path.abspath(path), path)
+
+        # 参照を辿って見つかったファイルなど、指定していないファイルは入力ファイルと同じく相対パスで表す
+        is_relative = not any(os.path.isabs(path) for path in input_files)
+
+        def restore_path(path: Optional[str]) -> Optional[str]:
+            if path in paths:
+                return paths[path]
+            if path is not None and is_relative and os.path.isabs(path):
+                return os.path.relpath(path)
+            return path
+
+        errors = []
+
+        def on_message(message: dict):
+            result = SortFileResult(**message['result'])
+
+            input_file = restore_path(result.input_file)
+            error = result.error
+            if error is not None:
+                # エラーの内容(OSErrorのメッセージなど)に含まれるパスも戻す
+                error = error.replace(result.input_file, input_file)
+                errors.append(error)
+
+            result = result._replace(input_file=input_file, output_file=restore_path(result.output_file), error=error)
+
+            if on_timing:
+                for phase, seconds in result.timings.items():
+                    on_timing(result.input_file, phase, seconds)
+
+            if on_result:
+                on_result(result)
+
+        response = self.request({'command': 'run', 'kwargs': encode_sort_kwargs(kwargs)}, on_message=on_message)
+        if 'errors' not in response:
+            raise ServerError(response.get('error'))
+
+        # エラーはファイルごとの結果と同じ順に並んでいる
+        return response['ok'], errors
+
+
+def forward(kwargs: Dict[str, Any], socket_path: Optional[str] = None) -> Optional[Tuple[bool, List[str]]]:
+    # サーバーが起動していればOpenApiSorter.sortの処理をサーバーに任せる(起動していなければNoneを返す)
+    # order: localeのルールはサーバーの照合順序(LC_COLLATE)で並ぶため、クライアントの環境と異なる可能性があり任せない
+    rules = kwargs.get('rules')
+    if rules is not None and any(rule.order == ORDER_LOCALE for rule in rules.rules):
+        return None
+
+    client = SortClient(socket_path)
+    if not client.is_available():
+        return None
+
+    results = []
+
+    def on_result(result: SortFileResult):
+        results.append(result)
+        if kwargs.get('on_result'):
+            kwargs['on_result'](result)
+
+    try:
+        return client.run(kwargs, on_result=on_result, on_timing=kwargs.get('on_timing'))
+    except (OSError, ValueError, ServerError):
+        # 1ファイルも処理されていなければローカルで実行し直す
+        if not results:
+            return None
+        raise
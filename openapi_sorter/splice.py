@@ -0,0 +1,187 @@
+import re
+from typing import Any, List, Optional, Tuple
+
+from openapi_sorter.backends import YamlBackend
+from openapi_sorter.limits import has_alias
+from openapi_sorter.rules import DEFAULT_RULES, RuleNode, SortRules, sorted_indexes
+from yaml.constructor import SafeConstructor
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+# YAMLを出力し直さず、元のテキストの並べ替え対象の要素(キーから次のキーの直前まで)を切り出して並べ替える
+# コメント・アンカー・スカラーの書式はそのまま残り、それ以外の部分は元のテキストをそのままコピーする
+# 要素の直前のコメント行と空行はその要素と一緒に移動する
+# 行単位で移動しても各要素の内容は変わらないので、並べ替えた結果は通常は読み直さない
+# 移動すると内容が変わり得る書き方(アンカーとエイリアス、後続の空行を取り込む|+・>+のブロックスカラー)を含む場合だけ、
+# 読み直してソート済みの辞書と一致することを確認する
+
+# 末尾の改行を保持するブロックスカラーのヘッダー(|+、>2+など。説明文中の'|+'も拾うが、読み直しが増えるだけ)
+KEEP_CHOMPING_REGEX = re.compile(r'[|>](?:[1-9]?\+|\+[1-9])[ \t]*(?:#.*)?$', re.MULTILINE)
+
+
+class SpliceError(Exception):
+    # テキストの並べ替えでは対応できない書き方(フロースタイルなど)の場合に送出する
+    pass
+
+
+class SpliceSorter:
+    def __init__(self, backend: YamlBackend, rules: Optional[SortRules] = None, is_verify: bool = False):
+        self.backend = backend
+        self.rules = rules or DEFAULT_RULES
+        # Trueの場合は常に読み直して確認する
+        self.is_verify = is_verify
+        self.constructor = SafeConstructor()
+        self.text = ''
+        self.size = 0
+
+    def load(self, text: str) -> Tuple[Node, Any]:
+        # 1回のパースでノードツリー(位置情報)と辞書の両方を得る
+        loader = self.backend.loader(text)
+        try:
+            node = loader.get_single_node()
+            document = loader.construct_document(node) if node is not None else None
+        finally:
+            loader.dispose()
+
+        return node, document
+
+    def splice(self, text: str, node: Node) -> str:
+        # 最後の要素もほかの要素と同じく改行で終わるようにしておく
+        has_newline = text.endswith('\n')
+        self.text = text if has_newline else text + '\n'
+        self.size = len(text)
+
+        try:
+            spliced = self._render(0, len(self.text), node, self.rules.root)
+        finally:
+            self.text = ''
+
+        return spliced if has_newline else spliced[:-1]
+
+    def needs_verify(self, text: str) -> bool:
+        return self.is_verify or has_alias(text) or KEEP_CHOMPING_REGEX.search(text) is not None
+
+    def verify(self, spliced: str, document: Any) -> bool:
+        # 並べ替え後のテキストを読み直し、内容がソート済みの辞書と一致することを確認する
+        try:
+            loaded = self.backend.loader(spliced)
+            try:
+                spliced_document = loaded.get_single_data()
+            finally:
+                loaded.dispose()
+        except Exception:
+            return False
+
+        return spliced_document == document and self.rules.is_sorted(spliced_document)
+
+    def _render(self, start: int, end: int, node: Node, section: Optional[RuleNode]) -> str:
+        if section is None or not isinstance(node, (MappingNode, SequenceNode)) or not node.value:
+            return self.text[start:end]
+
+        is_mapping = isinstance(node, MappingNode)
+
+        children: List[Tuple[Node, Node, Optional[RuleNode], Any]] = []
+        for child in node.value:
+            if is_mapping:
+                key_node, value_node = child
+                key = self._value(key_node)
+                children.append((key_node, value_node, section.child(key), key))
+            else:
+                value = self._find_value(child, section.rule.by) if section.rule is not None else None
+                children.append((child, child, section.item(), value))
+
+        indexes = None
+        if section.rule is not None:
+            indexes = sorted_indexes([value for _, _, _, value in children], section.sort_key)
+
+        is_reordered = indexes is not None
+        order = indexes if is_reordered else range(len(children))
+
+        if node.flow_style:
+            if is_reordered:
+                raise SpliceError('flow style collections cannot be reordered')
+            return self.text[start:end]
+
+        boundaries = []
+        floor = start
+        for start_node, _, _, _ in children:
+            boundary, is_line_start = self._entry_start(start_node.start_mark.index, floor, is_mapping)
+            if is_reordered and not is_line_start:
+                raise SpliceError('entries that do not start a line cannot be reordered')
+
+            boundaries.append(max(boundary, start))
+            floor = self._line_end(start_node.start_mark.index)
+
+        boundaries.append(min(max(self._section_end(node.end_mark.index, floor), boundaries[-1]), end))
+
+        pieces = [
+            self._render(boundaries[i], boundaries[i + 1], child_node, child_section)
+            for i, (_, child_node, child_section, _) in enumerate(children)
+        ]
+
+        return self.text[start : boundaries[0]] + ''.join(pieces[i] for i in order) + self.text[boundaries[-1] : end]
+
+    def _entry_start(self, index: int, floor: int, is_mapping: bool) -> Tuple[int, bool]:
+        line_start = self._line_start(index)
+        prefix = self.text[line_start:index]
+
+        # マッピングのキーは行頭(インデントのみ)、シーケンスの要素は「- 」の後から始まる場合だけ行単位で扱う
+        if prefix.strip() != ('' if is_mapping else '-'):
+            return index, False
+
+        # コメント行を含めるかどうかはキー(シーケンスでは「-」)の桁で判断する
+        column = len(prefix) - len(prefix.lstrip())
+
+        return self._backtrack(line_start, floor, column), True
+
+    def _section_end(self, index: int, floor: int) -> int:
+        # 末尾に改行がないファイルでは、終端の位置を追加した改行の後ろに合わせる
+        if index >= self.size:
+            index = len(self.text)
+
+        line_start = self._line_start(index)
+        if self.text[line_start:index].strip():
+            return index
+
+        return self._backtrack(line_start, floor, index - line_start)
+
+    def _backtrack(self, index: int, floor: int, column: int) -> int:
+        # 直前の空行と、キー以下のインデントのコメント行を含める(ブロックスカラーの中身はキーより深いので含まれない)
+        while index > floor:
+            line_start = self._line_start(index - 1)
+            if line_start < floor:
+                break
+
+            line = self.text[line_start:index]
+            stripped = line.lstrip(' ')
+            if stripped.strip() and not (stripped.startswith('#') and len(line) - len(stripped) <= column):
+                break
+
+            index = line_start
+
+        return index
+
+    def _line_start(self, index: int) -> int:
+        return self.text.rfind('\n', 0, index) + 1
+
+    def _line_end(self, index: int) -> int:
+        line_end = self.text.find('\n', index)
+        return len(self.text) if line_end < 0 else line_end + 1
+
+    def _value(self, node: Node) -> Any:
+        if not isinstance(node, ScalarNode):
+            return None
+
+        return self.constructor.construct_object(node)
+
+    def _find_value(self, node: Node, by: Optional[str]) -> Any:
+        if by is None:
+            return self._value(node)
+
+        if not isinstance(node, MappingNode):
+            return None
+
+        for key_node, value_node in node.value:
+            if self._value(key_node) == by:
+                return self._value(value_node)
+
+        return None
@@ -0,0 +1,261 @@
+from typing import Any, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+import yaml
+from openapi_sorter.backends import YamlBackend
+from openapi_sorter.dumper import OpenApiRepresenter
+from openapi_sorter.rules import DEFAULT_RULES, RuleNode, SortRules, sorted_indexes
+from yaml.constructor import SafeConstructor
+from yaml.events import (
+    AliasEvent,
+    CollectionEndEvent,
+    CollectionStartEvent,
+    DocumentEndEvent,
+    DocumentStartEvent,
+    Event,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+    StreamStartEvent,
+)
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
+
+# 辞書を経由せず、PyYAMLのイベント単位でソートする
+# 並べ替えが必要なセクションの子要素だけをバッファし、それ以外のイベントはそのまま出力へ流す
+
+MAP_TAG = 'tag:yaml.org,2002:map'
+SEQ_TAG = 'tag:yaml.org,2002:seq'
+
+# マージキー(<<)のタグ。構築できる値がないため、ソートでは文字列の<<として扱い、イベントはそのまま出力する
+MERGE_TAG = 'tag:yaml.org,2002:merge'
+MERGE_KEY = '<<'
+
+# OpenAPIのバージョン判定に使うトップレベルのキー
+HEADER_KEYS = ['openapi', 'swagger']
+
+
+class AliasOrderError(yaml.YAMLError):
+    # 並べ替えによってエイリアスがアンカーより前に出力される(入力は正しいYAML)
+    def __init__(self, anchor: str):
+        super().__init__(f'alias *{anchor} would precede its anchor')
+        self.anchor = anchor
+
+
+class StreamingSortResult(NamedTuple):
+    header: dict
+    is_sorted: bool
+    documents: int
+
+
+class StreamingSorter:
+    def __init__(self, backend: YamlBackend, rules: Optional[SortRules] = None):
+        self.backend = backend
+        self.rules = rules or DEFAULT_RULES
+
+        self.resolver = Resolver()
+        self.constructor = SafeConstructor()
+        self.representer = OpenApiRepresenter(default_flow_style=False, sort_keys=False)
+
+        self.header = {}
+        self.is_sorted = True
+        self.documents = 0
+
+    def sort(self, input_stream: TextIO, output_stream: Optional[TextIO] = None) -> StreamingSortResult:
+        events = self._check_anchors(self._sort_events(iter(yaml.parse(input_stream, Loader=self.backend.loader))))
+
+        if output_stream is None:
+            # 出力先がない場合(チェックモード)はイベントを読み捨てて並び順だけを確認する
+            for _ in events:
+                pass
+        else:
+            yaml.emit(events, output_stream, Dumper=self.backend.dumper, allow_unicode=True, indent=2)
+
+        return StreamingSortResult(header=self.header, is_sorted=self.is_sorted, documents=self.documents)
+
+    def _sort_events(self, events: Iterator[Event]) -> Iterator[Event]:
+        for event in events:
+            if isinstance(event, StreamStartEvent):
+                yield StreamStartEvent()
+            elif isinstance(event, StreamEndEvent):
+                yield StreamEndEvent()
+            elif isinstance(event, DocumentStartEvent):
+                self.documents += 1
+                yield DocumentStartEvent(explicit=False)
+            elif isinstance(event, DocumentEndEvent):
+                yield DocumentEndEvent(explicit=False)
+            else:
+                yield from self._node(events, event, self.rules.root, is_root=True)
+
+    def _node(self, events: Iterator[Event], event: Event, section: Optional[RuleNode] = None, is_root: bool = False):
+        if isinstance(event, ScalarEvent):
+            yield event if self._scalar_tag(event) == MERGE_TAG else self._scalar(event)
+        elif isinstance(event, AliasEvent):
+            yield event
+        elif isinstance(event, MappingStartEvent):
+            yield MappingStartEvent(event.anchor, MAP_TAG, True, flow_style=False)
+            if section is not None and section.rule is not None:
+                yield from self._sorted_mapping(events, section)
+            else:
+                yield from self._mapping(events, section, is_root)
+            yield MappingEndEvent()
+        elif isinstance(event, SequenceStartEvent):
+            yield SequenceStartEvent(event.anchor, SEQ_TAG, True, flow_style=False)
+            if section is not None and section.rule is not None:
+                yield from self._sorted_sequence(events, section)
+            else:
+                yield from self._sequence(events, section)
+            yield SequenceEndEvent()
+        else:
+            raise yaml.YAMLError(f'unexpected event: {event}')
+
+    def _mapping(self, events: Iterator[Event], section: Optional[RuleNode], is_root: bool):
+        while True:
+            key_event = next(events)
+            if isinstance(key_event, MappingEndEvent):
+                return
+
+            key = self._scalar_value(key_event) if isinstance(key_event, ScalarEvent) else None
+            yield from self._node(events, key_event)
+
+            value_event = next(events)
+            if is_root and key in HEADER_KEYS and isinstance(value_event, ScalarEvent):
+                self.header[key] = self._scalar_value(value_event)
+
+            yield from self._node(events, value_event, section.child(key) if section else None)
+
+    def _sequence(self, events: Iterator[Event], section: Optional[RuleNode]):
+        item_section = section.item() if section else None
+
+        while True:
+            event = next(events)
+            if isinstance(event, SequenceEndEvent):
+                return
+
+            yield from self._node(events, event, item_section)
+
+    def _sorted_mapping(self, events: Iterator[Event], section: RuleNode):
+        entries = []
+
+        while True:
+            key_event = next(events)
+            if isinstance(key_event, MappingEndEvent):
+                break
+
+            key = self._scalar_value(key_event) if isinstance(key_event, ScalarEvent) else None
+            entries.append((key, [key_event] + self._collect(events, next(events))))
+
+        yield from self._reorder(entries, section, pairs=True)
+
+    def _sorted_sequence(self, events: Iterator[Event], section: RuleNode):
+        items = []
+
+        while True:
+            event = next(events)
+            if isinstance(event, SequenceEndEvent):
+                break
+
+            buffered = self._collect(events, event)
+            items.append((self._find_value(buffered, section.rule.by), buffered))
+
+        yield from self._reorder(items, section, pairs=False)
+
+    def _reorder(self, entries: List[Tuple[Any, List[Event]]], section: RuleNode, pairs: bool):
+        indexes = sorted_indexes([key for key, _ in entries], section.sort_key)
+        if indexes is None:
+            sorted_entries = entries
+        else:
+            sorted_entries = [entries[i] for i in indexes]
+            self.is_sorted = False
+
+        for key, buffered in sorted_entries:
+            buffered_events = iter(buffered)
+            if pairs:
+                yield from self._node(buffered_events, next(buffered_events))
+                yield from self._node(buffered_events, next(buffered_events), section.child(key))
+            else:
+                yield from self._node(buffered_events, next(buffered_events), section.item())
+
+    def _collect(self, events: Iterator[Event], event: Event) -> List[Event]:
+        # ノード1つ分のイベントを入力のまま取り出す
+        buffered = [event]
+        depth = 1 if isinstance(event, CollectionStartEvent) else 0
+
+        while depth:
+            event = next(events)
+            buffered.append(event)
+            if isinstance(event, CollectionStartEvent):
+                depth += 1
+            elif isinstance(event, CollectionEndEvent):
+                depth -= 1
+
+        return buffered
+
+    def _find_value(self, buffered: List[Event], by: Optional[str]) -> Any:
+        # 並べ替えに使う値を取り出す(byがなければスカラーの要素そのもの、あればマッピングの要素のbyの値)
+        if by is None:
+            return self._scalar_value(buffered[0]) if isinstance(buffered[0], ScalarEvent) else None
+
+        if not isinstance(buffered[0], MappingStartEvent):
+            return None
+
+        depth = 0
+        is_key = True
+        is_match = False
+
+        for event in buffered[1:-1]:
+            if depth == 0:
+                if is_key:
+                    is_match = isinstance(event, ScalarEvent) and self._scalar_value(event) == by
+                elif is_match:
+                    return self._scalar_value(event) if isinstance(event, ScalarEvent) else None
+
+            if isinstance(event, CollectionStartEvent):
+                depth += 1
+            elif isinstance(event, CollectionEndEvent):
+                depth -= 1
+
+            if depth == 0:
+                is_key = not is_key
+
+        return None
+
+    def _scalar_tag(self, event: ScalarEvent) -> str:
+        if event.tag is None or event.tag == '!':
+            return self.resolver.resolve(ScalarNode, event.value, event.implicit)
+
+        return event.tag
+
+    def _scalar_value(self, event: ScalarEvent) -> Any:
+        tag = self._scalar_tag(event)
+        if tag == MERGE_TAG:
+            return MERGE_KEY
+
+        constructor = SafeConstructor.yaml_constructors.get(tag, SafeConstructor.yaml_constructors[None])
+        return constructor(self.constructor, ScalarNode(tag, event.value, style=event.style))
+
+    def _scalar(self, event: ScalarEvent) -> ScalarEvent:
+        # 辞書からダンプした場合と同じ表現になるように、値を一度構築してからRepresenterで表現し直す
+        node = self.representer.represent_data(self._scalar_value(event))
+
+        detected_tag = self.resolver.resolve(ScalarNode, node.value, (True, False))
+        default_tag = self.resolver.resolve(ScalarNode, node.value, (False, True))
+        implicit = (node.tag == detected_tag, node.tag == default_tag)
+
+        return ScalarEvent(event.anchor, node.tag, implicit, node.value, style=node.style)
+
+    @classmethod
+    def _check_anchors(cls, events: Iterator[Event]) -> Iterator[Event]:
+        # 並べ替えによってアンカーより前にエイリアスが出力されると不正なYAMLになるため検出する
+        anchors = set()
+
+        for event in events:
+            if isinstance(event, AliasEvent):
+                if event.anchor not in anchors:
+                    raise AliasOrderError(event.anchor)
+            elif getattr(event, 'anchor', None):
+                anchors.add(event.anchor)
+
+            yield event
@@ -0,0 +1,118 @@
+import atexit
+import os
+import threading
+from typing import Optional
+
+# OpenAPIのスキーマ検証は途中で中断できないため、別プロセスで実行して制限時間を過ぎたらプロセスごと終了する
+# (スレッドでは打ち切った検証が裏で動き続け、サーバーモードなどの長時間動くプロセスでCPUを使い続ける)
+# 検証用のプロセスはプロセスごとに1つだけ起動して使い回し、制限時間を過ぎた場合だけ起動し直す
+
+
+def validate_spec_dict(spec_dict: dict) -> Optional[str]:
+    # OpenAPIのスキーマで検証し、エラーがあればその内容を返す
+    from openapi_spec_validator import validate_spec
+    from openapi_spec_validator.validation.exceptions import OpenAPIValidationError, ValidatorDetectError
+
+    try:
+        validate_spec(spec_dict)
+    except OpenAPIValidationError as e:
+        # エラー箇所はJSON Pointerで表す(パスのキーに含まれる/は~1にエスケープする)
+        path = '/'.join(str(key).replace('~', '~0').replace('/', '~1') for key in e.absolute_path)
+        return f'{e.message} (at /{path})' if path else e.message
+    except ValidatorDetectError as e:
+        return str(e)
+
+    return None
+
+
+class SchemaValidator:
+    def __init__(self, start_method: Optional[str] = None):
+        # start_methodを指定しなければmultiprocessingの既定の方法でプロセスを起動する
+        self.start_method = start_method
+        self.pool = None
+        # サーバーモードでは複数のスレッドから呼ばれるため、検証は1件ずつ行う
+        self.lock = threading.Lock()
+
+    def validate(self, spec_dict: dict, timeout: Optional[float]) -> Optional[str]:
+        if timeout is None:
+            return validate_spec_dict(spec_dict)
+
+        from multiprocessing import TimeoutError
+
+        with self.lock:
+            if self.pool is None:
+                self.pool = self._create_pool()
+
+            try:
+                return self.pool.apply_async(validate_spec_dict, (spec_dict,)).get(timeout)
+            except TimeoutError:
+                # 実行中の検証ごとプロセスを終了し、次の検証では起動し直す
+                self._terminate()
+                return f'validation timed out after {timeout:g} seconds'
+
+    def close(self):
+        with self.lock:
+            self._terminate()
+
+    def _create_pool(self):
+        import multiprocessing
+
+        context = multiprocessing.get_context(self.start_method)
+        if self.start_method == 'forkserver':
+            # 起動し直すたびにopenapi_spec_validatorを読み込まないように、forkserverで読み込んでおく
+            context.set_forkserver_preload(['openapi_spec_validator', 'openapi_sorter.validation'])
+        else:
+            # forkで起動したプロセスが読み込み済みのモジュールを引き継げるように、先に読み込んでおく
+            import openapi_spec_validator  # noqa: F401
+
+        return context.Pool(processes=1)
+
+    def _terminate(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_validator() -> SchemaValidator:
+    # プロセスごとに1つの検証用プロセスを使い回す(並列実行のワーカープロセスではワーカーごとに1つ)
+    global _validator
+
+    with _validator_lock:
+        if _validator is None:
+            _validator = SchemaValidator()
+
+        return _validator
+
+
+def set_validator(validator: SchemaValidator):
+    # サーバーなど、検証用プロセスの起動方法を変える場合に使う(それまでの検証用プロセスは終了する)
+    global _validator
+
+    with _validator_lock:
+        if _validator is not None:
+            _validator.close()
+
+        _validator = validator
+
+
+def _close_validator():
+    if _validator is not None:
+        _validator.close()
+
+
+def _reset_in_child():
+    # forkで起動したプロセスには親の検証用プロセスを使わせない(親のPoolを管理するスレッドは引き継がれない)
+    global _validator, _validator_lock
+
+    _validator = None
+    _validator_lock = threading.Lock()
+
+
+atexit.register(_close_validator)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_in_child)
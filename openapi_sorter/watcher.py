@@ -0,0 +1,150 @@
+import fnmatch
+import hashlib
+import os
+from time import monotonic, sleep
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+# ディレクトリを監視し、内容が変わったファイルだけをその場でソートし直す
+# 追加の依存を増やさないように、inotifyではなくmtimeとサイズのポーリングで変更を検出する
+
+WATCH_PATTERNS = ['*.yaml', '*.yml']
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.5
+
+
+class FileState(NamedTuple):
+    mtime_ns: int
+    size: int
+
+
+def file_digest(path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+
+    try:
+        with open(path, mode='rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    return digest.hexdigest()
+
+
+class Watcher:
+    def __init__(
+        self,
+        directory: str,
+        sort_kwargs: Optional[dict] = None,
+        on_errors: Optional[Callable[[List[str]], None]] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+        patterns: Optional[List[str]] = None,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.directory = directory
+        self.sort_kwargs = sort_kwargs or {}
+        self.on_errors = on_errors
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.patterns = WATCH_PATTERNS if patterns is None else patterns
+        self.clock = clock
+
+        self.states: Dict[str, FileState] = {}
+        # 最後に変更を検出した時刻(この時刻からdebounce秒変更がなければソートする)
+        self.pending: Dict[str, float] = {}
+        # 最後に処理した時点の内容のハッシュ(自分で書き込んだ結果も含む)
+        self.digests: Dict[str, str] = {}
+
+    def scan(self) -> Dict[str, FileState]:
+        states = {}
+
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+
+            for name in files:
+                if not any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns):
+                    continue
+
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                states[path] = FileState(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+        return states
+
+    def poll(self) -> List[str]:
+        now = self.clock()
+        states = self.scan()
+
+        for path in self.states.keys() - states.keys():
+            self.pending.pop(path, None)
+            self.digests.pop(path, None)
+
+        for path, state in states.items():
+            if self.states.get(path) != state:
+                self.pending[path] = now
+
+        self.states = states
+
+        ready = sorted(path for path, changed_at in self.pending.items() if now - changed_at >= self.debounce)
+        for path in ready:
+            del self.pending[path]
+
+        return ready
+
+    def run_once(self) -> Tuple[bool, List[str]]:
+        changed_files = []
+
+        for path in self.poll():
+            digest = file_digest(path)
+            # mtimeだけが変わった(touchされた)ファイルや、直前に自分で書き込んだファイルはソートしない
+            if digest is not None and self.digests.get(path) != digest:
+                self.digests[path] = digest
+                changed_files.append(path)
+
+        if not changed_files:
+            return True, []
+
+        # 読めないファイルなどのエラーはファイルごとに報告されるが、想定外のエラーでも監視は止めない
+        try:
+            result, errors = OpenApiSorter.sort(input_files=changed_files, is_overwrite=True, **self.sort_kwargs)
+        except (OSError, ValueError) as e:
+            result, errors = False, [str(e)]
+
+        # ソートで書き換えたファイルを次回のポーリングで変更として検出しないようにする
+        for path in changed_files:
+            digest = file_digest(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+
+            if digest is None or stat is None:
+                # ソート中に削除されたファイルは削除されたものとして扱う
+                self.states.pop(path, None)
+                self.digests.pop(path, None)
+                continue
+
+            self.digests[path] = digest
+            self.states[path] = FileState(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+        if errors and self.on_errors:
+            self.on_errors(errors)
+
+        return result, errors
+
+    def run(self, max_cycles: Optional[int] = None):
+        cycles = 0
+
+        while max_cycles is None or cycles < max_cycles:
+            self.run_once()
+            cycles += 1
+
+            if max_cycles is None or cycles < max_cycles:
+                sleep(self.poll_interval)
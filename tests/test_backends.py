@@ -0,0 +1,151 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import yaml
+
+import pytest
+from openapi_sorter.backends import BACKEND_C, BACKEND_PYTHON, get_backend, is_c_available
+from openapi_sorter.dumper import COpenApiDumper, OpenApiDumper
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+OPENAPI_STR = '''
+openapi: 3.0.0
+info:
+  title: backend test yaml
+  version: '1.0'
+  description: |-
+    test
+    テスト
+paths:
+  /charlie:
+    get:
+      summary: '#charlie'
+      description: 'key: value'
+      responses:
+        '200':
+          description: OK
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Charlie'
+  /alpha:
+    get:
+      summary: -alpha
+      parameters:
+        - name: q
+          in: query
+          schema:
+            type: string
+            pattern: '^[a-z]{1,3}$'
+            default: 'on'
+      responses:
+        '200':
+          description: OK
+components:
+  schemas:
+    Charlie:
+      type: object
+      properties:
+        id:
+          type: integer
+          example: 100
+    Alpha:
+      type: object
+      properties:
+        name:
+          type: string
+          example: "say \\"hi\\""
+tags:
+  - name: charlie
+  - name: alpha
+'''
+
+
+class TestBackends(TestCase):
+    def test_get_backend(self):
+        backend = get_backend(BACKEND_PYTHON)
+
+        assert backend.name == BACKEND_PYTHON
+        assert backend.loader is yaml.SafeLoader
+        assert backend.dumper is OpenApiDumper
+        assert get_backend(BACKEND_PYTHON) is backend
+
+        with pytest.raises(ValueError):
+            get_backend('unknown')
+
+    def test_get_backend_auto(self):
+        backend = get_backend()
+
+        if is_c_available():
+            assert backend.name == BACKEND_C
+            assert backend.loader is yaml.CSafeLoader
+            assert backend.dumper is COpenApiDumper
+        else:
+            assert backend.name == BACKEND_PYTHON
+
+    @pytest.mark.skipif(not is_c_available(), reason='PyYAML is built without libyaml')
+    def test_backends_identical_output(self):
+        outputs = []
+
+        for backend in [BACKEND_PYTHON, BACKEND_C]:
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml') as src, tempfile.NamedTemporaryFile() as dest:
+                src.write(OPENAPI_STR)
+                src.flush()
+
+                result, errors = OpenApiSorter.sort(input_files=[src.name], output_file=dest.name, backend=backend)
+
+                assert result
+                assert not errors
+
+                with open(dest.name, mode='r', encoding='utf_8') as f:
+                    outputs.append(f.read())
+
+        assert outputs[0] == outputs[1]
+        assert "summary: '#charlie'" in outputs[0]
+        assert '    test\n' in outputs[0]
+
+    def test_global_dumper_untouched(self):
+        safe_dumper_representers = dict(yaml.SafeDumper.yaml_representers)
+
+        assert yaml.dump('#alpha', Dumper=OpenApiDumper) == "'#alpha'\n"
+        assert yaml.dump('a\nb', Dumper=OpenApiDumper) == '|-\n  a\n  b\n'
+
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml') as src, tempfile.NamedTemporaryFile() as dest:
+            src.write(OPENAPI_STR)
+            src.flush()
+
+            OpenApiSorter.sort(input_files=[src.name], output_file=dest.name)
+
+        assert yaml.SafeDumper.yaml_representers == safe_dumper_representers
+        assert yaml.dump('#alpha', Dumper=yaml.SafeDumper) == '\'#alpha\'\n'
+        assert yaml.dump('a\nb', Dumper=yaml.SafeDumper) == "'a\n\n  b'\n"
+
+    def test_sort_threads(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            expected_file = os.path.join(tmpdir, 'expected.yaml')
+            with open(expected_file, mode='w', encoding='utf_8') as f:
+                f.write(OPENAPI_STR)
+            OpenApiSorter.sort(input_files=[expected_file], is_overwrite=True)
+
+            input_files = []
+            for i in range(16):
+                input_file = os.path.join(tmpdir, f'input-{i}.yaml')
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(OPENAPI_STR)
+                input_files.append(input_file)
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(
+                    executor.map(lambda x: OpenApiSorter.sort(input_files=[x], is_overwrite=True), input_files)
+                )
+
+            assert all(result for result, _ in results)
+
+            with open(expected_file, mode='r', encoding='utf_8') as f:
+                expected = f.read()
+
+            for input_file in input_files:
+                with open(input_file, mode='r', encoding='utf_8') as f:
+                    assert f.read() == expected
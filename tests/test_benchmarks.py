@@ -0,0 +1,85 @@
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import yaml
+
+from benchmarks import reorder, startup
+from benchmarks.run import PHASES, compare, run_size
+from benchmarks.spec_generator import generate_spec, generate_spec_yaml
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+
+class TestBenchmarks(TestCase):
+    def test_generate_spec(self):
+        spec = generate_spec(paths=20, schemas=10, tags=5, depth=2, description_lines=3)
+
+        assert len(spec['paths']) == 20
+        assert len(spec['components']['schemas']) == 10
+        assert len(spec['tags']) == 5
+        assert OpenApiSorter.is_openapi_document(spec)
+        assert not OpenApiSorter._is_sorted(spec)
+
+        # same seed, same document
+        assert generate_spec_yaml(paths=5, schemas=5, seed=1) == generate_spec_yaml(paths=5, schemas=5, seed=1)
+        assert yaml.safe_load(generate_spec_yaml(paths=5, schemas=5)) == generate_spec(paths=5, schemas=5)
+
+    def test_run_size(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = run_size('tiny', {'paths': 5, 'schemas': 5, 'tags': 2}, 'auto', 1, tmpdir)
+
+        assert result['size'] == 'tiny'
+        assert result['bytes'] > 0
+        assert list(result['phases']) == PHASES
+        for phase in result['phases'].values():
+            assert phase['seconds'] >= 0
+            assert phase['peak_bytes'] >= 0
+
+    def test_run_size_unsorted_input(self):
+        # every timed sort run starts from the unsorted document, not from the result of the previous run
+        is_sorted = []
+        sort_dict = OpenApiSorter._sort_dict
+
+        def record(openapi_json, **kwargs):
+            is_sorted.append(OpenApiSorter._is_sorted(openapi_json))
+            return sort_dict(openapi_json, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmpdir, patch.object(OpenApiSorter, '_sort_dict', side_effect=record):
+            run_size('tiny', {'paths': 5, 'schemas': 5, 'tags': 2}, 'auto', 3, tmpdir)
+
+        # 1 for the dumped content, 3 timed runs and 1 for the peak memory
+        assert is_sorted == [False] * 5
+
+    def test_compare(self):
+        def results(seconds):
+            return {'results': [{'size': 'small', 'phases': {phase: {'seconds': seconds} for phase in PHASES}}]}
+
+        assert compare(results(1.1), results(1.0), 0.2) == []
+        assert len(compare(results(1.3), results(1.0), 0.2)) == len(PHASES)
+        assert compare(results(1.3), {'results': []}, 0.2) == []
+
+    def test_startup(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = startup.run(1, tmpdir)
+
+        assert list(results) == ['python', 'import', 'check', 'check-no-validate']
+        for measured in results.values():
+            assert 0 < measured['min'] <= measured['median']
+
+    def test_reorder(self):
+        results = reorder.run(100, 1)
+
+        assert list(results) == ['lexical-unsorted', 'lexical-sorted', 'natural-unsorted', 'natural-sorted']
+        for measured in results.values():
+            assert measured['baseline'] > 0
+            assert measured['rules'] > 0
+
+        # both implementations produce the same order
+        section = reorder.generate_section(100)
+        for order in reorder.ORDERS:
+            expected = reorder.baseline_sort({'components': {'schemas': dict(section)}}, order)
+            rules = reorder.SortRules([reorder.SortRule(path=('components', 'schemas'), order=order)])
+
+            assert list(rules.sort({'components': {'schemas': dict(section)}})['components']['schemas']) == list(
+                expected['components']['schemas']
+            )
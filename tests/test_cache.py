@@ -0,0 +1,130 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import yaml
+
+import pytest
+from openapi_sorter.cache import OUTPUT_FORMAT_VERSION, SortCache
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+OPENAPI_STR = '''
+openapi: 3.0.0
+info:
+  title: cache test yaml
+  version: '1.0'
+paths:
+  /bravo:
+    get:
+      responses:
+        '200':
+          description: OK
+  /alpha:
+    get:
+      responses:
+        '200':
+          description: OK
+'''
+
+
+class TestSortCache(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_cache_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            self.cache = SortCache(cache_dir=os.path.join(tmpdir, 'cache'))
+
+            yield
+
+    def test_key(self):
+        assert self.cache.key(b'alpha') == self.cache.key(b'alpha')
+        assert self.cache.key(b'alpha') != self.cache.key(b'bravo')
+        assert self.cache.key(b'alpha') != self.cache.key(b'alpha', namespace='validated')
+        assert self.cache.key(b'alpha', indent=2) != self.cache.key(b'alpha', indent=4)
+
+        # entries written before a change of the output are not reused, even with the same version number
+        key = self.cache.key(b'alpha')
+        with patch('openapi_sorter.cache.OUTPUT_FORMAT_VERSION', OUTPUT_FORMAT_VERSION + 1):
+            assert self.cache.key(b'alpha') != key
+
+    def test_add_contains(self):
+        key = self.cache.key(b'alpha')
+
+        assert not self.cache.contains(key)
+
+        self.cache.add(key)
+
+        assert self.cache.contains(key)
+
+    def test_evict(self):
+        keys = [self.cache.key(str(i).encode()) for i in range(10)]
+        for i, key in enumerate(keys):
+            self.cache.add(key)
+            entry_path = os.path.join(self.cache.cache_dir, key[:2], key)
+            os.utime(entry_path, (i, i))
+
+        entry_size = os.stat(entry_path)
+        entry_size = getattr(entry_size, 'st_blocks', 0) * 512 or entry_size.st_size
+
+        self.cache.max_size = entry_size * 4
+        self.cache.evict()
+
+        # 古いエントリから削除される
+        assert [self.cache.contains(key) for key in keys] == [False] * 6 + [True] * 4
+
+    def test_sort_with_cache(self):
+        input_file = os.path.join(self.tmpdir, 'input.yaml')
+        with open(input_file, mode='w', encoding='utf_8') as f:
+            f.write(OPENAPI_STR)
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, cache=self.cache)
+
+        assert result
+        assert not errors
+
+        with open(input_file, mode='rb') as f:
+            sorted_content = f.read()
+
+        assert self.cache.contains(self.cache.key(sorted_content))
+
+        # 2回目はソート済みとしてパースを省略する
+        with patch('openapi_sorter.openapi_sorter.yaml.load', wraps=yaml.load) as load:
+            result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, cache=self.cache)
+
+            assert result
+            assert not errors
+            assert load.call_count == 0
+
+        output_file = os.path.join(self.tmpdir, 'output.yaml')
+        result, errors = OpenApiSorter.sort(input_files=[input_file], output_file=output_file, cache=self.cache)
+
+        assert result
+        with open(output_file, mode='rb') as f:
+            assert f.read() == sorted_content
+
+    def test_stream_is_cached_separately(self):
+        content = '''openapi: 3.0.0
+x-common: &common
+  type: object
+components:
+  schemas:
+    Bravo: *common
+    Alpha:
+      type: string
+'''
+        input_file = os.path.join(self.tmpdir, 'input.yaml')
+        with open(input_file, mode='w', encoding='utf_8') as f:
+            f.write(content)
+
+        OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True, cache=self.cache)
+
+        with open(input_file, mode='r', encoding='utf_8') as f:
+            assert '&common' in f.read()
+
+        # イベント単位で出力した内容(アンカー名を残す)は、通常のモードではソート済みとして扱わない
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, cache=self.cache)
+
+        assert result
+        with open(input_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == OpenApiSorter.sort_string(content)
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import tempfile
+from unittest import TestCase
+
+import pytest
+from openapi_sorter.changes import ChangeFilter, GitError, changed_files
+
+ROOT_STR = '''openapi: 3.0.0
+info:
+  title: changes test yaml
+  version: '1.0'
+paths:
+  /alpha:
+    $ref: './paths/alpha.yaml'
+'''
+
+ALPHA_PATH_STR = '''get:
+  responses:
+    '200':
+      $ref: '../schemas/alpha.yaml#/Alpha'
+'''
+
+ALPHA_SCHEMA_STR = '''Alpha:
+  type: object
+'''
+
+OTHER_STR = '''openapi: 3.0.0
+info:
+  title: other yaml
+  version: '1.0'
+paths: {}
+'''
+
+
+class TestChanges(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_repository(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            self.files = {}
+
+            for name, content in [
+                ('openapi.yaml', ROOT_STR),
+                ('paths/alpha.yaml', ALPHA_PATH_STR),
+                ('schemas/alpha.yaml', ALPHA_SCHEMA_STR),
+                ('other/openapi.yaml', OTHER_STR),
+            ]:
+                path = os.path.join(tmpdir, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, mode='w', encoding='utf_8') as f:
+                    f.write(content)
+                self.files[name] = path
+
+            self.git('init', '-q')
+            self.git('add', '.')
+            self.git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'initial')
+
+            yield
+
+    def git(self, *args: str):
+        subprocess.run(['git', *args], cwd=self.tmpdir, check=True)
+
+    def write(self, name: str, content: str):
+        with open(self.files[name], mode='a', encoding='utf_8') as f:
+            f.write(content)
+
+    def test_changed_files(self):
+        assert changed_files('HEAD', cwd=self.tmpdir) == set()
+
+        self.write('schemas/alpha.yaml', '  description: changed\n')
+        untracked = os.path.join(self.tmpdir, 'new.yaml')
+        with open(untracked, mode='w', encoding='utf_8') as f:
+            f.write(OTHER_STR)
+
+        # paths are resolved from the top of the repository, not from cwd
+        assert changed_files('HEAD', cwd=os.path.join(self.tmpdir, 'paths')) == {
+            os.path.realpath(self.files['schemas/alpha.yaml']),
+            os.path.realpath(untracked),
+        }
+
+        # staged changes are included
+        self.git('add', '.')
+        assert len(changed_files('HEAD', cwd=self.tmpdir)) == 2
+
+    def test_changed_files_error(self):
+        with pytest.raises(GitError):
+            changed_files('no-such-revision', cwd=self.tmpdir)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with pytest.raises(GitError):
+                changed_files('HEAD', cwd=tmpdir)
+
+    def test_filter(self):
+        input_files = [self.files[name] for name in ['openapi.yaml', 'other/openapi.yaml', 'schemas/alpha.yaml']]
+
+        assert list(ChangeFilter(set()).filter(input_files)) == []
+
+        # the root file reaches the changed schema through paths/alpha.yaml, which is not an input
+        changed = {os.path.realpath(self.files['schemas/alpha.yaml'])}
+        assert list(ChangeFilter(changed).filter(input_files)) == [
+            self.files['openapi.yaml'],
+            self.files['schemas/alpha.yaml'],
+        ]
+
+        changed = {os.path.realpath(self.files['openapi.yaml'])}
+        assert list(ChangeFilter(changed).filter(input_files)) == [self.files['openapi.yaml']]
+
+    def test_filter_cycle(self):
+        self.write('schemas/alpha.yaml', "  properties:\n    root:\n      $ref: '../openapi.yaml'\n")
+
+        change_filter = ChangeFilter({os.path.realpath(self.files['other/openapi.yaml'])})
+
+        assert not change_filter.is_changed(self.files['openapi.yaml'])
+        assert not change_filter.is_changed(self.files['schemas/alpha.yaml'])
+        assert change_filter.is_changed(self.files['other/openapi.yaml'])
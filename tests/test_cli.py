@@ -1,12 +1,34 @@
+import io
+import os
 import re
+import socket
+import tempfile
 from time import sleep
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
 import pytest
 from _pytest.python_api import raises
-from openapi_sorter.cli import main
-from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.cache import DEFAULT_CACHE_MAX_SIZE
+from openapi_sorter.changes import GitError
+from openapi_sorter.cli import iter_file_list, main, print_changed, print_errors
+from openapi_sorter.instrumentation import TimingReporter
+from openapi_sorter.limits import DEFAULT_LIMITS, ResourceLimits
+from openapi_sorter.openapi_sorter import OpenApiSorter, SortFileResult
+from openapi_sorter.rules import DEFAULT_RULES, SortRule
+from openapi_sorter.server import SOCKET_ENV
+from openapi_sorter.watcher import DEFAULT_POLL_INTERVAL, Watcher
+
+OPENAPI_STR = '''openapi: 3.0.0
+info:
+  title: cli test yaml
+  version: '1.0'
+paths:
+  /bravo: {}
+  /alpha: {}
+'''
+
+USAGE = 'usage: openapi_sorter [-h] (-o OUTPUT | --overwrite | --check | --watch DIR) [--files-from FILE] [-0] [--backend {auto,c,python}] [--format {auto,yaml,json}] [-j JOBS] [--stream] [--splice] [--splice-verify] [--timings {json,text}] [--profile PATH] [--cache] [--cache-dir CACHE_DIR] [--cache-max-size CACHE_MAX_SIZE] [--follow-refs] [--since REV] [--config PATH] [--validate | --no-validate] [--validate-timeout VALIDATE_TIMEOUT] [--max-bytes MAX_BYTES] [--max-depth MAX_DEPTH] [--max-nodes MAX_NODES] [--max-aliases MAX_ALIASES] [--no-server] [--poll-interval POLL_INTERVAL] [--debounce DEBOUNCE] [FILE ...]'
 
 
 class TestCli(TestCase):
@@ -18,15 +40,15 @@ class TestCli(TestCase):
     def _pass_monkeypatch(self, monkeypatch):
         self.monkeypatch = monkeypatch
 
-    @patch('sys.argv', ['openapi_sorter'])
+    @patch('sys.argv', ['openapi_sorter', '--overwrite'])
     def test_main_no_input(self):
         try:
             main()
         except SystemExit:
             captured = self.capsys.readouterr()
 
-            assert re.sub(r'.[\s]{2,}', ' ', captured.err) == (
-                '''usage: openapi_sorter [-h] (-o OUTPUT | --overwrite) FILE [FILE ...]
+            assert re.sub(r'\s{2,}', ' ', captured.err) == (
+                f'''{USAGE}
 openapi_sorter: error: the following arguments are required: FILE
 '''
             )
@@ -37,9 +59,9 @@ openapi_sorter: error: the following arguments are required: FILE
             main()
         except SystemExit:
             captured = self.capsys.readouterr()
-            assert re.sub(r'.[\s]{2,}', ' ', captured.err) == (
-                '''usage: openapi_sorter [-h] (-o OUTPUT | --overwrite) FILE [FILE ...]
-openapi_sorter: error: one of the arguments -o/--output --overwrite is required
+            assert re.sub(r'\s{2,}', ' ', captured.err) == (
+                f'''{USAGE}
+openapi_sorter: error: one of the arguments -o/--output --overwrite --check --watch is required
 '''
             )
 
@@ -50,8 +72,8 @@ openapi_sorter: error: one of the arguments -o/--output --overwrite is required
         except SystemExit:
             captured = self.capsys.readouterr()
 
-            assert re.sub(r'.[\s]{2,}', ' ', captured.err) == (
-                '''usage: openapi_sorter [-h] (-o OUTPUT | --overwrite) FILE [FILE ...]
+            assert re.sub(r'\s{2,}', ' ', captured.err) == (
+                f'''{USAGE}
 openapi_sorter: error: argument -o/--output: not allowed with argument --overwrite
 '''
             )
@@ -63,8 +85,8 @@ openapi_sorter: error: argument -o/--output: not allowed with argument --overwri
         except SystemExit:
             captured = self.capsys.readouterr()
 
-            assert re.sub(r'.[\s]{2,}', ' ', captured.err) == (
-                '''usage: openapi_sorter [-h] (-o OUTPUT | --overwrite) FILE [FILE ...]
+            assert re.sub(r'\s{2,}', ' ', captured.err) == (
+                f'''{USAGE}
 openapi_sorter: error: the '--output' option can only be used when processing a single input file
 '''
             )
@@ -80,6 +102,319 @@ openapi_sorter: error: the '--output' option can only be used when processing a
 
         assert kwargs.get('input_files') == ['input-1.yaml', 'input-2.yaml']
         assert kwargs.get('is_overwrite') is True
+        assert kwargs.get('backend') == 'auto'
+        assert kwargs.get('cache') is None
+        assert kwargs.get('on_result') is print_changed
+        assert kwargs.get('on_timing') is None
+        assert kwargs.get('profile_file') is None
+        assert kwargs.get('is_validate') is None
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_check(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('input_files') == ['input.yaml']
+        assert kwargs.get('is_check') is True
+        assert kwargs.get('is_overwrite') is None
+        assert kwargs.get('output_file') is None
+
+        # unsorted files exit with 1
+        sort.return_value = (False, ['input.yaml is not sorted.'])
+
+        with raises(SystemExit) as e:
+            main()
+
+        assert e.value.code == 1
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--backend', 'python'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_backend(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('backend') == 'python'
+
+    @patch('sys.argv', ['openapi_sorter', 'input-1.yaml', 'input-2.yaml', '--overwrite', '--jobs', '4'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_jobs(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('jobs') == 4
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--stream'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_stream(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('is_stream') is True
+        assert kwargs.get('is_overwrite') is True
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check', '--no-validate'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_no_validate(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('is_validate') is False
+        assert kwargs.get('is_check') is True
+        assert kwargs.get('is_validate_schema') is None
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check', '--validate', '--validate-timeout', '5'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_validate(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('is_validate_schema') is True
+        assert kwargs.get('validate_timeout') == 5.0
+        assert kwargs.get('is_validate') is None
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--config', 'missing.yaml'])
+    def test_main_config_missing(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert 'openapi_sorter: error: argument --config: ' in captured.err
+        assert 'missing.yaml' in captured.err
+
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_config(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_file = os.path.join(tmpdir, 'rules.yaml')
+            with open(config_file, mode='w', encoding='utf_8') as f:
+                f.write('rules:\n  - path: components.*\n')
+
+            with patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--config', config_file]):
+                main()
+
+        rules = sort.call_args.kwargs.get('rules')
+
+        assert rules.rules[-1] == SortRule(path=('components', '*'))
+
+        # the default rules are used without a configuration file
+        with patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite']), patch(
+            'openapi_sorter.cli.load_rules', return_value=DEFAULT_RULES
+        ) as load_rules:
+            main()
+
+        load_rules.assert_called_once_with(None)
+        assert sort.call_args.kwargs.get('rules') is DEFAULT_RULES
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', 'fragment.yaml', '--overwrite', '--follow-refs'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_follow_refs(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('input_files') == ['input.yaml', 'fragment.yaml']
+        assert kwargs.get('is_follow_refs') is True
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '-o', 'output.json', '--format', 'json'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_format(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('output_format') == 'json'
+        assert kwargs.get('output_file') == 'output.json'
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--format', 'json', '--stream'])
+    def test_main_format_stream(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert re.sub(r'\s{2,}', ' ', captured.err) == (
+            f'''{USAGE}
+openapi_sorter: error: the '--format json' option cannot be used with '--stream'
+'''
+        )
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--splice'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_splice(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('is_splice') is True
+        assert kwargs.get('is_overwrite') is True
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--splice', '--splice-verify'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_splice_verify(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert kwargs.get('is_splice') is True
+        assert kwargs.get('is_splice_verify') is True
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--splice-verify'])
+    def test_main_splice_verify_without_splice(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert re.sub(r'\s{2,}', ' ', captured.err) == (
+            f'''{USAGE}
+openapi_sorter: error: the '--splice-verify' option requires '--splice'
+'''
+        )
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--splice', '--stream'])
+    def test_main_splice_stream(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert re.sub(r'\s{2,}', ' ', captured.err) == (
+            f'''{USAGE}
+openapi_sorter: error: the '--splice' option cannot be used with '--stream'
+'''
+        )
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check', '--validate', '--stream'])
+    def test_main_validate_stream(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert re.sub(r'\s{2,}', ' ', captured.err) == (
+            f'''{USAGE}
+openapi_sorter: error: the '--validate' option cannot be used with '--stream'
+'''
+        )
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--timings=json', '--profile', 'sort.prof'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_timings(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        kwargs = sort.call_args.kwargs
+
+        assert isinstance(kwargs.get('on_timing'), TimingReporter)
+        assert kwargs.get('on_timing').format == 'json'
+        assert kwargs.get('profile_file') == 'sort.prof'
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--overwrite', '--cache-dir', '/tmp/cache'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_cache(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        cache = sort.call_args.kwargs.get('cache')
+
+        assert cache.cache_dir == '/tmp/cache'
+        assert cache.max_size == DEFAULT_CACHE_MAX_SIZE
+
+    @patch(
+        'sys.argv', ['openapi_sorter', 'input.yaml', '--check', '--max-bytes', '100', '--max-depth=10', '--max-nodes=0']
+    )
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_limits(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        assert sort.call_args.kwargs.get('limits') == ResourceLimits(
+            max_bytes=100, max_depth=10, max_nodes=None, max_aliases=DEFAULT_LIMITS.max_aliases
+        )
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check', '--max-aliases=-1'])
+    def test_main_limits_negative(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert captured.err.endswith('openapi_sorter: error: argument --max-aliases: must not be negative\n')
+
+    @patch('sys.argv', ['openapi_sorter', 'alpha.yaml', 'bravo.yaml', '--overwrite', '--since', 'origin/main'])
+    @patch.object(OpenApiSorter, 'sort')
+    @patch('openapi_sorter.cli.changed_files')
+    def test_main_since(self, changed_files: Mock, sort: Mock):
+        changed_files.return_value = {os.path.realpath('bravo.yaml')}
+        sort.return_value = (True, [])
+
+        main()
+
+        changed_files.assert_called_once_with('origin/main')
+        assert list(sort.call_args.kwargs.get('input_files')) == ['bravo.yaml']
+
+    @patch('sys.argv', ['openapi_sorter', 'alpha.yaml', 'bravo.yaml', '--check', '--since', 'origin/main'])
+    @patch.object(OpenApiSorter, 'sort')
+    @patch('openapi_sorter.cli.changed_files')
+    def test_main_since_stale_socket(self, changed_files: Mock, sort: Mock):
+        changed_files.return_value = {os.path.realpath('bravo.yaml')}
+        sort.return_value = (True, [])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # the socket file of a server that is no longer running
+            socket_path = os.path.join(tmpdir, 'sorter.sock')
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+                server.bind(socket_path)
+
+            with patch.dict(os.environ, {SOCKET_ENV: socket_path}):
+                main()
+
+        # the files are sorted locally once forwarding fails
+        assert list(sort.call_args.kwargs.get('input_files')) == ['bravo.yaml']
+
+    @patch('sys.argv', ['openapi_sorter', 'alpha.yaml', '--check', '--since', 'unknown'])
+    @patch('openapi_sorter.cli.changed_files')
+    def test_main_since_error(self, changed_files: Mock):
+        changed_files.side_effect = GitError("fatal: bad revision 'unknown'")
+
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert captured.err.endswith("openapi_sorter: error: argument --since: fatal: bad revision 'unknown'\n")
 
     @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--output', 'output.yaml'])
     @patch.object(OpenApiSorter, 'sort')
@@ -134,3 +469,169 @@ error message(2)
 error message(2)
 '''
         )
+
+    @patch('sys.argv', ['openapi_sorter', '--watch', '.', '--debounce', '2', '--backend', 'python'])
+    @patch.object(Watcher, 'run')
+    @patch.object(Watcher, '__init__', return_value=None)
+    def test_main_watch(self, init: Mock, run: Mock):
+        main()
+
+        args, kwargs = init.call_args
+
+        assert args == ('.',)
+        assert kwargs.get('debounce') == 2.0
+        assert kwargs.get('poll_interval') == DEFAULT_POLL_INTERVAL
+        assert kwargs.get('on_errors') is print_errors
+        assert kwargs.get('sort_kwargs').get('backend') == 'python'
+        assert kwargs.get('sort_kwargs').get('on_result') is print_changed
+        assert kwargs.get('sort_kwargs').get('on_timing').format == 'text'
+        assert 'input_files' not in kwargs.get('sort_kwargs')
+        run.assert_called_once_with()
+
+        # stopped with Ctrl-C
+        run.side_effect = KeyboardInterrupt
+
+        main()
+
+    @patch('sys.argv', ['openapi_sorter', '--watch', '.', 'input.yaml'])
+    def test_main_watch_with_inputs(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert re.sub(r'\s{2,}', ' ', captured.err) == (
+            f'''{USAGE}
+openapi_sorter: error: the '--watch' option does not take input files
+'''
+        )
+
+    @patch('sys.argv', ['openapi_sorter', '--check', '--files-from', '-', '-0', 'input.yaml'])
+    @patch.object(OpenApiSorter, 'sort')
+    def test_main_files_from(self, sort: Mock):
+        sort.return_value = (True, [])
+
+        with patch('sys.stdin', io.TextIOWrapper(io.BytesIO(b'alpha.yaml\0bravo.yaml\0'))):
+            main()
+
+            kwargs = sort.call_args.kwargs
+
+            # the list is read lazily by the sorter
+            assert list(kwargs.get('input_files')) == ['input.yaml', 'alpha.yaml', 'bravo.yaml']
+            assert kwargs.get('is_check') is True
+
+    @patch('sys.argv', ['openapi_sorter', '--overwrite', '--files-from', 'missing.txt'])
+    def test_main_files_from_missing(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert "argument --files-from: can't open 'missing.txt'" in captured.err
+
+    def test_main_files_from_sort(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_files = []
+            for i in range(3):
+                input_file = os.path.join(tmpdir, f'input {i}.yaml')
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(OPENAPI_STR)
+                input_files.append(input_file)
+
+            files_from = os.path.join(tmpdir, 'files.txt')
+            with open(files_from, mode='w', encoding='utf_8', newline='') as f:
+                f.write('\r\n'.join(input_files) + '\n\n')
+
+            with patch('sys.argv', ['openapi_sorter', '--overwrite', '--files-from', files_from, '-j', '2']):
+                main()
+
+            captured = self.capsys.readouterr()
+
+            assert captured.out == ''.join(f'{input_file} was sorted.\n' for input_file in input_files)
+
+    def test_iter_file_list(self):
+        with patch('openapi_sorter.cli.FILE_LIST_CHUNK_SIZE', 3):
+            assert list(iter_file_list(io.BytesIO(b'alpha.yaml\n\nbravo charlie.yaml'))) == [
+                'alpha.yaml',
+                'bravo charlie.yaml',
+            ]
+            assert list(iter_file_list(io.BytesIO(b'alpha\nbravo.yaml\0'), separator=b'\0')) == ['alpha\nbravo.yaml']
+
+    @patch('sys.argv', ['openapi_sorter', '-', '-o', '-'])
+    def test_main_stdin(self):
+        with patch('sys.stdin', io.TextIOWrapper(io.BytesIO(OPENAPI_STR.encode('utf_8')))):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert captured.out == OpenApiSorter.sort_string(OPENAPI_STR)
+
+    @patch('sys.argv', ['openapi_sorter', '-', '--check'])
+    def test_main_stdin_check(self):
+        with patch('sys.stdin', io.TextIOWrapper(io.BytesIO(OPENAPI_STR.encode('utf_8')))):
+            with raises(SystemExit):
+                main()
+
+        captured = self.capsys.readouterr()
+
+        assert captured.out == '- is not sorted.\n'
+
+    @patch('sys.argv', ['openapi_sorter', '-', 'input.yaml', '--check'])
+    def test_main_stdin_with_inputs(self):
+        with raises(SystemExit):
+            main()
+
+        captured = self.capsys.readouterr()
+
+        assert re.sub(r'\s{2,}', ' ', captured.err) == (
+            f'''{USAGE}
+openapi_sorter: error: the standard input '-' can only be used as the only input
+'''
+        )
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check'])
+    @patch.object(OpenApiSorter, 'sort')
+    @patch('openapi_sorter.cli.forward')
+    def test_main_forward(self, forward: Mock, sort: Mock):
+        forward.return_value = (True, [])
+
+        main()
+
+        assert forward.call_args.args[0]['input_files'] == ['input.yaml']
+        assert sort.call_count == 0
+
+        # no server is running
+        forward.return_value = None
+        sort.return_value = (True, [])
+
+        main()
+
+        assert sort.call_count == 1
+
+    @patch('sys.argv', ['openapi_sorter', 'input.yaml', '--check', '--no-server'])
+    @patch.object(OpenApiSorter, 'sort')
+    @patch('openapi_sorter.cli.forward')
+    def test_main_no_server(self, forward: Mock, sort: Mock):
+        sort.return_value = (True, [])
+
+        main()
+
+        assert forward.call_count == 0
+        assert sort.call_count == 1
+
+    @patch('sys.argv', ['openapi_sorter', 'serve', '--socket', '/tmp/sorter.sock'])
+    @patch('openapi_sorter.cli.serve')
+    def test_main_serve(self, serve: Mock):
+        main()
+
+        assert serve.call_args.args[0] == '/tmp/sorter.sock'
+
+    def test_print_changed(self):
+        print_changed(SortFileResult(input_file='-', output_file='-', is_changed=True))
+        print_changed(SortFileResult(input_file='input.yaml', output_file='output.yaml', is_changed=True))
+        print_changed(SortFileResult(input_file='input.yaml', output_file='input.yaml'))
+        print_changed(SortFileResult(input_file='input.yaml', error='input.yaml is not YAML file.'))
+
+        captured = self.capsys.readouterr()
+
+        assert captured.out == 'output.yaml was sorted.\n'
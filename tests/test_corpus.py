@@ -0,0 +1,209 @@
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+from functools import lru_cache
+from time import perf_counter
+from typing import Callable, Dict
+from unittest import TestCase
+
+import yaml
+
+import pytest
+from benchmarks import reorder
+from benchmarks.spec_generator import generate_spec, generate_spec_yaml
+from openapi_sorter.backends import BACKEND_C, BACKEND_PYTHON, is_c_available
+from openapi_sorter.formats import dump_json
+from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.rules import ORDER_LEXICAL, SortRule, SortRules
+
+# 生成したspecのソート結果をgoldenファイルと比較し、入力サイズを変えたときの処理時間・メモリ使用量の伸びを確認する
+# goldenファイルの更新: python -m tests.test_corpus
+
+GOLDEN_FILE = os.path.join(os.path.dirname(__file__), 'golden', 'corpus_sorted.yaml')
+
+# goldenファイルの入力(深いネスト・複数行・Unicode・MATCH_REGEX/SEARCH_REGEXに該当する文字列を含む)
+GOLDEN_CORPUS = {'paths': 12, 'schemas': 6, 'tags': 4, 'depth': 3, 'description_lines': 3, 'seed': 2024}
+
+LARGE_CORPUS = {'paths': 2000, 'schemas': 1000, 'tags': 100, 'depth': 2, 'description_lines': 3}
+
+# 4倍の入力で計測する(線形なら約4倍、2乗になると約16倍になる)
+SCALING_SIZES = [100, 400]
+
+# 入力サイズの伸びに対して許容する倍率(計測のばらつきを含む)
+TIME_SCALING_TOLERANCE = 2.5
+MEMORY_SCALING_TOLERANCE = 1.5
+
+BACKENDS = [BACKEND_PYTHON, BACKEND_C] if is_c_available() else [BACKEND_PYTHON]
+
+SAFE_LOADER = yaml.CSafeLoader if is_c_available() else yaml.SafeLoader
+SAFE_DUMPER = yaml.CSafeDumper if is_c_available() else yaml.SafeDumper
+
+
+@lru_cache(maxsize=None)
+def corpus_yaml(**options) -> str:
+    # 同じ入力を複数のテストで使うため、生成結果を使い回す
+    return generate_spec_yaml(**options)
+
+
+def scaling_corpus_yaml(size: int) -> str:
+    return corpus_yaml(
+        paths=size, schemas=size, tags=max(1, size // 20), depth=2, description_lines=3, dumper=SAFE_DUMPER
+    )
+
+
+def measure_seconds(func: Callable[[], object], repeat: int = 3) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        func()
+        seconds.append(perf_counter() - start_time)
+
+    return min(seconds)
+
+
+def measure_peak_bytes(func: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def read_golden() -> str:
+    with open(GOLDEN_FILE, mode='r', encoding='utf_8') as f:
+        return f.read()
+
+
+class TestCorpus(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_tmpdir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            yield
+
+    def test_golden(self):
+        content = corpus_yaml(**GOLDEN_CORPUS)
+        golden = read_golden()
+
+        for backend in BACKENDS:
+            assert OpenApiSorter.sort_string(content, backend=backend) == golden
+
+            output_stream = io.StringIO()
+            OpenApiSorter.sort_stream(io.StringIO(content), output_stream, backend=backend, is_stream=True)
+
+            assert output_stream.getvalue() == golden
+
+        assert OpenApiSorter.is_sorted_string(golden)
+        assert OpenApiSorter.sort_string(golden) == golden
+
+    def test_golden_json(self):
+        golden = read_golden()
+
+        assert OpenApiSorter.sort_string(json.dumps(generate_spec(**GOLDEN_CORPUS))) == dump_json(
+            yaml.safe_load(golden)
+        )
+
+    def test_golden_splice(self):
+        content = corpus_yaml(**GOLDEN_CORPUS)
+
+        spliced = OpenApiSorter.sort_string(content, is_splice=True)
+
+        # 元の書式のまま並べ替えるので、内容と順序だけがgoldenファイルと一致する
+        assert OpenApiSorter.sort_string(spliced) == read_golden()
+        assert OpenApiSorter.is_sorted_string(spliced)
+
+    def test_large_corpus(self):
+        input_file = os.path.join(self.tmpdir, 'openapi.yaml')
+        with open(input_file, mode='w', encoding='utf_8') as f:
+            f.write(corpus_yaml(**LARGE_CORPUS, dumper=SAFE_DUMPER))
+
+        document_file = os.path.join(self.tmpdir, 'document.yaml')
+        stream_file = os.path.join(self.tmpdir, 'stream.yaml')
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], output_file=document_file, is_validate=False)
+        assert result
+
+        result, errors = OpenApiSorter.sort(
+            input_files=[input_file], output_file=stream_file, is_stream=True, is_validate=False
+        )
+        assert result
+
+        with open(input_file, mode='r', encoding='utf_8') as f:
+            original = OpenApiSorter.load_yaml(f.read())
+        with open(document_file, mode='r', encoding='utf_8') as f:
+            sorted_content = f.read()
+        with open(stream_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == sorted_content
+
+        # 並び順以外は変わらない(tagsはnameの順に並べ替えられる)
+        original['tags'].sort(key=lambda tag: tag['name'])
+
+        assert OpenApiSorter.load_yaml(sorted_content) == original
+        assert len(original['paths']) == LARGE_CORPUS['paths']
+
+        result, errors = OpenApiSorter.sort(input_files=[document_file], is_check=True, is_validate=False)
+
+        assert result
+
+
+class TestScaling(TestCase):
+    def assert_linear(self, measured: Dict[int, float], sizes: Dict[int, int], tolerance: float, name: str):
+        small, large = SCALING_SIZES
+        growth = measured[large] / measured[small]
+        limit = sizes[large] / sizes[small] * tolerance
+
+        assert growth <= limit, f'{name} grew {growth:.1f}x for {sizes[large] / sizes[small]:.1f}x input'
+
+    def test_time_scaling(self):
+        sizes = {size: len(scaling_corpus_yaml(size)) for size in SCALING_SIZES}
+
+        def scaling_corpus_json(size: int) -> str:
+            return json.dumps(yaml.load(scaling_corpus_yaml(size), Loader=SAFE_LOADER))
+
+        # (入力の生成, 計測する処理)
+        cases = {
+            'sort': (scaling_corpus_yaml, OpenApiSorter.sort_string),
+            'check': (scaling_corpus_yaml, OpenApiSorter.is_sorted_string),
+            'sort json': (scaling_corpus_json, OpenApiSorter.sort_string),
+        }
+
+        for name, (generate, case) in cases.items():
+            contents = {size: generate(size) for size in SCALING_SIZES}
+
+            measured = {size: measure_seconds(lambda: case(contents[size])) for size in SCALING_SIZES}
+
+            self.assert_linear(measured, sizes, TIME_SCALING_TOLERANCE, name)
+
+    def test_reorder_scaling(self):
+        # 巨大なセクションの並べ替えだけを計測する(ファイル全体の処理時間には埋もれる変化も検出する)
+        rules = SortRules([SortRule(path=('components', 'schemas'), order=ORDER_LEXICAL)])
+        sections = {size: reorder.generate_section(size * 50) for size in SCALING_SIZES}
+
+        measured = {size: reorder.measure(rules.sort, section, 3) for size, section in sections.items()}
+
+        self.assert_linear(
+            measured, {size: len(section) for size, section in sections.items()}, TIME_SCALING_TOLERANCE, 'reorder'
+        )
+
+    def test_memory_scaling(self):
+        sizes = {size: len(scaling_corpus_yaml(size)) for size in SCALING_SIZES}
+
+        measured = {
+            size: measure_peak_bytes(lambda: OpenApiSorter.sort_string(scaling_corpus_yaml(size)))
+            for size in SCALING_SIZES
+        }
+
+        self.assert_linear(measured, sizes, MEMORY_SCALING_TOLERANCE, 'peak memory')
+
+
+def main():
+    # 生成処理や出力の書式を意図して変更した場合に、goldenファイルを作り直す
+    with open(GOLDEN_FILE, mode='w', encoding='utf_8', newline='\n') as f:
+        f.write(OpenApiSorter.sort_string(corpus_yaml(**GOLDEN_CORPUS)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import yaml
+
+import pytest
+from openapi_sorter.cache import SortCache
+from openapi_sorter.formats import (
+    FORMAT_JSON,
+    FORMAT_YAML,
+    SNIFF_SIZE,
+    detect_format,
+    dump_json,
+    load_json,
+    read_head,
+    sniff_format,
+    sniff_stream,
+)
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+OPENAPI_JSON = {
+    'openapi': '3.0.0',
+    'info': {'title': 'format test json', 'version': '1.0'},
+    'paths': {'/bravo': {}, '/alpha': {}},
+    'components': {'schemas': {'Zulu': {'type': 'object'}, 'Alpha': {'description': 'テスト'}}},
+}
+
+SORTED_JSON_STR = '''{
+  "openapi": "3.0.0",
+  "info": {
+    "title": "format test json",
+    "version": "1.0"
+  },
+  "paths": {
+    "/alpha": {},
+    "/bravo": {}
+  },
+  "components": {
+    "schemas": {
+      "Alpha": {
+        "description": "テスト"
+      },
+      "Zulu": {
+        "type": "object"
+      }
+    }
+  }
+}
+'''
+
+
+class TestFormats(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+
+            self.json_file = os.path.join(tmpdir, 'openapi.json')
+            with open(self.json_file, mode='w', encoding='utf_8') as f:
+                json.dump(OPENAPI_JSON, f)
+
+            self.yaml_file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(self.yaml_file, mode='w', encoding='utf_8') as f:
+                yaml.safe_dump(OPENAPI_JSON, f, allow_unicode=True, sort_keys=False)
+
+            yield
+
+    def test_detect_format(self):
+        assert detect_format('openapi.json', '') == FORMAT_JSON
+        assert detect_format('openapi.YML', '{}') == FORMAT_YAML
+        assert detect_format('openapi', '\ufeff\n  {"openapi": "3.0.0"}') == FORMAT_JSON
+        assert detect_format(None, b'[]') == FORMAT_JSON
+        assert sniff_format('openapi: 3.0.0') == FORMAT_YAML
+
+    def test_sniff_stream(self):
+        content = '{"openapi": "3.0.0", "x-long": "' + 'a' * SNIFF_SIZE + '"}'
+
+        input_format, stream = sniff_stream(io.StringIO(content))
+
+        assert input_format == FORMAT_JSON
+        assert stream.read(10) + stream.read() == content
+
+        assert read_head(self.json_file) == json.dumps(OPENAPI_JSON).encode('utf_8')
+        assert read_head(os.path.join(self.tmpdir, 'none')) == b''
+
+    def test_load_dump(self):
+        assert load_json('\ufeff{"a": [1]}') == {'a': [1]}
+
+        with pytest.raises(ValueError):
+            load_json('{a: 1}')
+
+        assert dump_json({'date': datetime.date(2024, 1, 2), 'text': 'テスト'}) == (
+            '{\n  "date": "2024-01-02",\n  "text": "テスト"\n}\n'
+        )
+
+        with pytest.raises(TypeError):
+            dump_json({'binary': b'data'})
+
+    def test_sort_string(self):
+        assert OpenApiSorter.sort_string(json.dumps(OPENAPI_JSON)) == SORTED_JSON_STR
+        assert OpenApiSorter.sort_string(json.dumps(OPENAPI_JSON), output_format=FORMAT_YAML) == (
+            OpenApiSorter.sort_string(yaml.safe_dump(OPENAPI_JSON, sort_keys=False))
+        )
+
+        # YAML flow style is not JSON
+        assert OpenApiSorter.sort_string('{openapi: 3.0.0, info: {title: flow, version: 1.0}, paths: {}}')
+
+    def test_sort_json(self):
+        # JSON files are read without PyYAML
+        with patch.object(OpenApiSorter, 'load_yaml') as load_yaml:
+            result, errors = OpenApiSorter.sort(input_files=[self.json_file], is_overwrite=True, is_stream=True)
+
+            assert load_yaml.call_count == 0
+
+        assert result
+
+        with open(self.json_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == SORTED_JSON_STR
+
+    def test_sort_json_without_extension(self):
+        # the content decides the format as in the normal mode, so stream mode keeps the file JSON
+        input_file = os.path.join(self.tmpdir, 'openapi')
+        with open(input_file, mode='w', encoding='utf_8') as f:
+            json.dump(OPENAPI_JSON, f)
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True)
+
+        assert result
+        with open(input_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == SORTED_JSON_STR
+
+        output = io.StringIO()
+        OpenApiSorter.sort_stream(io.StringIO(json.dumps(OPENAPI_JSON)), output, is_stream=True)
+
+        assert output.getvalue() == SORTED_JSON_STR
+
+    def test_convert(self):
+        output_file = os.path.join(self.tmpdir, 'output.json')
+
+        # the output format follows the extension of the output file
+        result, errors = OpenApiSorter.sort(input_files=[self.yaml_file], output_file=output_file)
+
+        assert result
+
+        with open(output_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == SORTED_JSON_STR
+
+        output_file = os.path.join(self.tmpdir, 'output')
+        result, errors = OpenApiSorter.sort(
+            input_files=[self.json_file], output_file=output_file, output_format=FORMAT_YAML
+        )
+
+        assert result
+
+        with open(output_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == OpenApiSorter.sort_string(yaml.safe_dump(OPENAPI_JSON, sort_keys=False))
+
+        with pytest.raises(ValueError):
+            OpenApiSorter.sort(input_files=[self.yaml_file], is_overwrite=True, is_stream=True, output_format='json')
+
+        with pytest.raises(ValueError):
+            OpenApiSorter.sort(input_files=[self.yaml_file], is_overwrite=True, output_format='toml')
+
+    def test_cache(self):
+        cache = SortCache(cache_dir=os.path.join(self.tmpdir, 'cache'))
+        output_file = os.path.join(self.tmpdir, 'output.yaml')
+
+        OpenApiSorter.sort(input_files=[self.json_file], is_overwrite=True, cache=cache)
+
+        # the sorted JSON is recorded in the cache, but is not what a YAML output needs
+        result, errors = OpenApiSorter.sort(input_files=[self.json_file], output_file=output_file, cache=cache)
+
+        assert result
+
+        with open(output_file, mode='r', encoding='utf_8') as f:
+            assert yaml.safe_load(f) == json.loads(SORTED_JSON_STR)
+
+    def test_invalid_json(self):
+        with open(self.json_file, mode='w', encoding='utf_8') as f:
+            f.write('{"openapi": ')
+
+        result, errors = OpenApiSorter.sort(input_files=[self.json_file], is_check=True)
+
+        assert not result
+        assert errors == [f'{self.json_file} is not JSON file.']
@@ -0,0 +1,50 @@
+import io
+import json
+from unittest import TestCase
+
+from openapi_sorter.instrumentation import PhaseTimer, TimingReporter
+
+
+class TestInstrumentation(TestCase):
+    def test_phase_timer(self):
+        timer = PhaseTimer()
+
+        with timer.phase('load'):
+            pass
+
+        with timer.phase('load'):
+            pass
+
+        try:
+            with timer.phase('sort'):
+                raise ValueError()
+        except ValueError:
+            pass
+
+        assert list(timer.timings) == ['load', 'sort']
+        assert all(seconds >= 0 for seconds in timer.timings.values())
+
+    def test_timing_reporter_json(self):
+        stream = io.StringIO()
+        reporter = TimingReporter(format='json', stream=stream)
+
+        reporter('alpha.yaml', 'load', 0.5)
+        reporter('bravo.yaml', 'load', 0.25)
+        reporter('alpha.yaml', 'total', 1.0)
+
+        assert json.loads(stream.getvalue()) == {'file': 'alpha.yaml', 'timings': {'load': 0.5, 'total': 1.0}}
+
+        reporter('bravo.yaml', 'total', 0.5)
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1]) == {'file': 'bravo.yaml', 'timings': {'load': 0.25, 'total': 0.5}}
+
+    def test_timing_reporter_text(self):
+        stream = io.StringIO()
+        reporter = TimingReporter(format='text', stream=stream)
+
+        reporter('alpha.yaml', 'load', 0.5)
+        reporter('alpha.yaml', 'total', 1.0)
+
+        assert stream.getvalue() == 'alpha.yaml: load=0.5000s, total=1.0000s\n'
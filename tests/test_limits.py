@@ -0,0 +1,192 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+from openapi_sorter.limits import DEFAULT_LIMITS, LimitError, ResourceLimits
+from openapi_sorter.openapi_sorter import OpenApiSorter
+
+OPENAPI_STR = '''openapi: 3.0.0
+info:
+  title: limits test yaml
+  version: '1.0'
+paths:
+  /bravo: {}
+  /alpha: {}
+'''
+
+# 9^4個のノードに展開されるエイリアス(billion laughsの縮小版)
+LAUGHS_STR = '''openapi: 3.0.0
+info:
+  title: limits test yaml
+  version: '1.0'
+paths: {}
+x-a: &a [lol, lol, lol, lol, lol, lol, lol, lol, lol]
+x-b: &b [*a, *a, *a, *a, *a, *a, *a, *a, *a]
+x-c: &c [*b, *b, *b, *b, *b, *b, *b, *b, *b]
+x-d: [*c, *c, *c, *c, *c, *c, *c, *c, *c]
+'''
+
+
+class TestLimits(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+
+            self.input_file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(self.input_file, mode='w', encoding='utf_8') as f:
+                f.write(OPENAPI_STR)
+
+            self.laughs_file = os.path.join(tmpdir, 'laughs.yaml')
+            with open(self.laughs_file, mode='w', encoding='utf_8') as f:
+                f.write(LAUGHS_STR)
+
+            yield
+
+    def test_check_size(self):
+        limits = ResourceLimits(max_bytes=len(OPENAPI_STR))
+
+        limits.check_file(self.input_file)
+        assert limits.read(io.BytesIO(OPENAPI_STR.encode('utf_8'))) == OPENAPI_STR.encode('utf_8')
+
+        limits = ResourceLimits(max_bytes=len(OPENAPI_STR) - 1)
+
+        with pytest.raises(LimitError, match='larger than'):
+            limits.check_file(self.input_file)
+
+        with pytest.raises(LimitError, match='larger than'):
+            limits.read(io.BytesIO(OPENAPI_STR.encode('utf_8')))
+
+    def test_scan_yaml(self):
+        # the root mapping, 3 keys, 2 + 4 scalars in info and 2 + 2 + 2 nodes in paths
+        ResourceLimits(max_depth=3, max_nodes=15).scan_yaml(OPENAPI_STR)
+
+        with pytest.raises(LimitError, match='nested deeper than 2 levels'):
+            ResourceLimits(max_depth=2).scan_yaml(OPENAPI_STR)
+
+        with pytest.raises(LimitError, match='more than 14 nodes'):
+            ResourceLimits(max_nodes=14).scan_yaml(OPENAPI_STR)
+
+    def test_scan_aliases(self):
+        ResourceLimits(max_aliases=27, max_nodes=9000).scan_yaml(LAUGHS_STR)
+
+        with pytest.raises(LimitError, match='more than 26 aliases'):
+            ResourceLimits(max_aliases=26).scan_yaml(LAUGHS_STR)
+
+        # the aliases are counted as the nodes of the anchored collections
+        with pytest.raises(LimitError, match='more than 8000 nodes'):
+            ResourceLimits(max_nodes=8000).scan_yaml(LAUGHS_STR)
+
+        # an alias to a nested anchor counts its depth (x-d > *c > *b > *a)
+        ResourceLimits(max_depth=5).scan_yaml(LAUGHS_STR)
+
+        with pytest.raises(LimitError, match='nested deeper than 4 levels'):
+            ResourceLimits(max_depth=4).scan_yaml(LAUGHS_STR)
+
+    def test_scan_skipped(self):
+        with patch.object(ResourceLimits, '_scan_events') as scan_events:
+            # no aliases to anchors and fewer characters than the node limit
+            DEFAULT_LIMITS.scan_yaml(OPENAPI_STR)
+            DEFAULT_LIMITS.scan_yaml_file(self.input_file)
+            DEFAULT_LIMITS.scan_yaml(OPENAPI_STR + "x-text: 'R&D &amp; *emphasis*'\n")
+
+            assert scan_events.call_count == 0
+
+            DEFAULT_LIMITS.scan_yaml(LAUGHS_STR)
+            DEFAULT_LIMITS.scan_yaml_file(self.laughs_file)
+            ResourceLimits(max_depth=10).scan_yaml(OPENAPI_STR)
+
+            assert scan_events.call_count == 3
+
+            # anchors and aliases split across the chunks of the file
+            with patch('openapi_sorter.limits.SCAN_CHUNK_SIZE', 7):
+                DEFAULT_LIMITS.scan_yaml_file(self.laughs_file)
+
+            assert scan_events.call_count == 4
+
+    def test_check_document(self):
+        # counted the same way as the scan
+        ResourceLimits(max_depth=3, max_nodes=15).check_document(OpenApiSorter.load_yaml(OPENAPI_STR))
+
+        with pytest.raises(LimitError, match='more than 14 nodes'):
+            ResourceLimits(max_nodes=14).check_document(OpenApiSorter.load_yaml(OPENAPI_STR))
+
+        with pytest.raises(LimitError, match='nested deeper than 2 levels'):
+            ResourceLimits(max_depth=2).check_document({'a': {'b': [1]}})
+
+        with pytest.raises(LimitError, match='more than 4 nodes'):
+            ResourceLimits(max_nodes=4).check_document({'a': [1, 2]})
+
+    def test_sort(self):
+        limits = ResourceLimits(max_nodes=1000)
+
+        for options in [{'is_overwrite': True}, {'is_overwrite': True, 'is_stream': True}, {'is_check': True}]:
+            result, errors = OpenApiSorter.sort(
+                input_files=[self.input_file, self.laughs_file], limits=limits, **options
+            )
+
+            assert not result
+            assert errors == [f'{self.laughs_file} was rejected: the document has more than 1000 nodes']
+
+        # the rejected file is left unchanged
+        with open(self.laughs_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == LAUGHS_STR
+
+        result, errors = OpenApiSorter.sort(
+            input_files=[self.input_file], is_check=True, limits=ResourceLimits(max_bytes=10)
+        )
+
+        assert errors == [f'{self.input_file} was rejected: the file is larger than 10 bytes']
+
+    def test_sort_string(self):
+        limits = ResourceLimits(max_nodes=1000)
+
+        assert OpenApiSorter.sort_string(OPENAPI_STR, limits=limits) == OpenApiSorter.sort_string(OPENAPI_STR)
+        assert not OpenApiSorter.is_sorted_string(OPENAPI_STR, limits=limits)
+
+        for options in [{}, {'is_splice': True}]:
+            with pytest.raises(LimitError, match='more than 1000 nodes'):
+                OpenApiSorter.sort_string(LAUGHS_STR, limits=limits, **options)
+
+            with pytest.raises(LimitError, match='larger than'):
+                OpenApiSorter.sort_string(OPENAPI_STR, limits=ResourceLimits(max_bytes=10), **options)
+
+        with pytest.raises(LimitError, match='more than 1000 nodes'):
+            OpenApiSorter.is_sorted_string(LAUGHS_STR, limits=limits)
+
+    def test_sort_follow_refs(self):
+        with open(self.input_file, mode='w', encoding='utf_8') as f:
+            f.write(OPENAPI_STR.replace('/alpha: {}', "/alpha:\n    $ref: 'laughs.yaml'"))
+
+        input_files = [self.input_file, self.laughs_file]
+
+        # the referenced file is rejected while the references are collected
+        with patch.object(OpenApiSorter, 'load_yaml', wraps=OpenApiSorter.load_yaml) as load_yaml:
+            result, errors = OpenApiSorter.sort(
+                input_files=input_files, is_check=True, is_follow_refs=True, limits=ResourceLimits(max_aliases=10)
+            )
+
+            assert load_yaml.call_count == 1
+
+        assert errors == [
+            f'{self.laughs_file} was rejected: the document has more than 10 aliases',
+            f'{self.input_file} is not sorted.',
+        ]
+
+        result, errors = OpenApiSorter.sort(
+            input_files=input_files, is_check=True, is_follow_refs=True, limits=ResourceLimits(max_bytes=200)
+        )
+
+        assert errors[0] == f'{self.laughs_file} was rejected: the file is larger than 200 bytes'
+
+    def test_sort_json(self):
+        json_file = os.path.join(self.tmpdir, 'openapi.json')
+        with open(json_file, mode='w', encoding='utf_8') as f:
+            f.write('{"openapi": "3.0.0", "info": {"title": "limits", "version": "1.0"}, "paths": {"/a": {}}}')
+
+        result, errors = OpenApiSorter.sort(input_files=[json_file], is_check=True, limits=ResourceLimits(max_depth=2))
+
+        assert errors == [f'{json_file} was rejected: the document is nested deeper than 2 levels']
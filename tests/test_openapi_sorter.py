@@ -1,13 +1,34 @@
+import io
+import os
+import pstats
+import re
+import subprocess
+import sys
 import tempfile
+import time
 from unittest import TestCase
+from unittest.mock import patch
 
 import yaml
 
 import pytest
-from openapi_sorter.openapi_sorter import OpenApiSorter
+from benchmarks.spec_generator import SPECIAL_STRINGS, generate_spec
+from openapi_sorter.cache import SortCache
+from openapi_sorter.openapi_sorter import (
+    MATCH_REGEX,
+    SEARCH_REGEX,
+    InvalidOpenApiError,
+    InvalidYamlError,
+    OpenApiSorter,
+)
+from openapi_sorter.validation import SchemaValidator
 
 
 class TestOpenApiSorter(TestCase):
+    @pytest.fixture(autouse=True)
+    def _pass_capsys(self, capsys):
+        self.capsys = capsys
+
     @pytest.fixture(autouse=True)
     def create_openapi_yaml(self):
         openapi_str = '''
@@ -105,6 +126,8 @@ tags:
   - name: bravo
   - name: charlie
 '''
+        self.openapi_str = openapi_str
+
         try:
             with tempfile.NamedTemporaryFile() as src, open(src.name, 'w') as input_file:
                 self.input_file_name = src.name
@@ -165,6 +188,460 @@ key1: value1
             assert not result
             assert errors == [f'{dummy_file.name} is not YAML file.']
 
+    def test_sort_no_validate(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_file = os.path.join(tmpdir, 'input.yaml')
+
+            for content, error in [('', 'YAML'), ('a', 'OpenAPI'), ('- alpha', 'OpenAPI')]:
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(content)
+
+                result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_validate=False)
+
+                assert not result
+                assert errors == [f'{input_file} is not {error} file.']
+
+            for is_stream in [False, True]:
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write('tags:\n  - name: bravo\n  - name: alpha\n')
+
+                with patch.object(OpenApiSorter, 'is_openapi_document') as is_openapi_document:
+                    result, errors = OpenApiSorter.sort(
+                        input_files=[input_file], is_overwrite=True, is_stream=is_stream, is_validate=False
+                    )
+
+                    assert result
+                    assert not errors
+                    assert is_openapi_document.call_count == 0
+
+                with open(input_file, mode='r', encoding='utf_8') as f:
+                    assert f.read() == 'tags:\n- name: alpha\n- name: bravo\n'
+
+    def test_sort_validate_schema(self):
+        result, errors = OpenApiSorter.sort(
+            input_files=[self.input_file_name], is_overwrite=True, is_validate_schema=True
+        )
+
+        assert result
+        assert not errors
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_file = os.path.join(tmpdir, 'input.yaml')
+            with open(input_file, mode='w', encoding='utf_8') as f:
+                f.write(self.openapi_str.replace('description: OK', 'descriptio: OK', 1))
+
+            result, errors = OpenApiSorter.sort(input_files=[input_file], is_check=True, is_validate_schema=True)
+
+            assert not result
+            assert len(errors) == 1
+            assert errors[0].startswith(f'{input_file} is not valid OpenAPI file: ')
+            assert errors[0].endswith(' (at /paths/~1charlie/get/responses/200)')
+
+        with pytest.raises(ValueError):
+            OpenApiSorter.sort(
+                input_files=[self.input_file_name], is_overwrite=True, is_stream=True, is_validate_schema=True
+            )
+
+    def test_sort_validate_schema_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = SortCache(cache_dir=tmpdir)
+
+            validate_schema = patch.object(OpenApiSorter, 'validate_schema', wraps=OpenApiSorter.validate_schema)
+
+            with validate_schema as validate_schema:
+                # unsorted but valid files are validated only once
+                for _ in range(2):
+                    result, errors = OpenApiSorter.sort(
+                        input_files=[self.input_file_name], is_check=True, cache=cache, is_validate_schema=True
+                    )
+
+                    assert errors == [f'{self.input_file_name} is not sorted.']
+
+                assert validate_schema.call_count == 1
+
+                # sorted without schema validation: the sorted cache entry does not skip the validation
+                OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True, cache=cache)
+                OpenApiSorter.sort(
+                    input_files=[self.input_file_name], is_check=True, cache=cache, is_validate_schema=True
+                )
+
+                assert validate_schema.call_count == 2
+
+                result, errors = OpenApiSorter.sort(
+                    input_files=[self.input_file_name], is_check=True, cache=cache, is_validate_schema=True
+                )
+
+                assert result
+                assert validate_schema.call_count == 2
+
+    def test_validate_schema_timeout(self):
+        openapi_json = yaml.safe_load(self.openapi_str)
+
+        # a new validation process is forked after the patch
+        validator = SchemaValidator('fork')
+        try:
+            with patch('openapi_spec_validator.validate_spec', side_effect=lambda _: time.sleep(1)):
+                error = validator.validate(openapi_json, timeout=0.01)
+        finally:
+            validator.close()
+
+        assert error == 'validation timed out after 0.01 seconds'
+
+        assert OpenApiSorter.validate_schema(openapi_json, timeout=None) is None
+        assert OpenApiSorter.validate_schema({'openapi': '3.0.0'}) is not None
+
+    def test_validate_schema_timeout_terminated(self):
+        # the timed out validation is stopped instead of running on in the background
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pid_file = os.path.join(tmpdir, 'pid')
+
+            def busy(_):
+                with open(pid_file, mode='w') as f:
+                    f.write(str(os.getpid()))
+                while True:
+                    pass
+
+            validator = SchemaValidator('fork')
+            try:
+                with patch('openapi_spec_validator.validate_spec', side_effect=busy):
+                    error = validator.validate({'openapi': '3.0.0'}, timeout=0.5)
+            finally:
+                validator.close()
+
+            assert error == 'validation timed out after 0.5 seconds'
+
+            with open(pid_file, mode='r') as f:
+                pid = int(f.read())
+
+            assert pid != os.getpid()
+            with self.assertRaises(ProcessLookupError):
+                os.kill(pid, 0)
+
+    def test_validate_schema_reuse(self):
+        # one validation process is reused for every file and only replaced after a timeout
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pid_file = os.path.join(tmpdir, 'pid')
+
+            def record(spec_dict):
+                with open(pid_file, mode='a') as f:
+                    f.write(f'{os.getpid()}\n')
+                if spec_dict.get('x-slow'):
+                    time.sleep(1)
+
+            validator = SchemaValidator('fork')
+            try:
+                with patch('openapi_spec_validator.validate_spec', side_effect=record):
+                    assert validator.validate({}, timeout=5) is None
+                    assert validator.validate({}, timeout=5) is None
+                    assert validator.validate({'x-slow': True}, timeout=0.2) == 'validation timed out after 0.2 seconds'
+                    assert validator.validate({}, timeout=5) is None
+            finally:
+                validator.close()
+
+            with open(pid_file, mode='r') as f:
+                pids = f.read().split()
+
+            assert pids[0] == pids[1] == pids[2] != pids[3]
+
+    def test_lazy_import(self):
+        # the validator is imported only when an OpenAPI document is validated
+        code = (
+            'import sys; import openapi_sorter.cli; '
+            'assert "openapi_spec_validator" not in sys.modules; '
+            'assert "concurrent.futures.process" not in sys.modules'
+        )
+
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+    def test_sort_parse_once(self):
+        with patch('openapi_sorter.openapi_sorter.yaml.load', wraps=yaml.load) as load:
+            result, errors = OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True)
+
+            assert result
+            assert not errors
+            assert load.call_count == 1
+
+    def test_is_valid_file(self):
+        # the path-based checks read and parse the file, the document-based checks take the parsed content
+        assert OpenApiSorter.is_valid_yaml(self.input_file_name)
+        assert OpenApiSorter.is_valid_openapi(self.input_file_name)
+        assert OpenApiSorter.is_openapi_document(yaml.safe_load(self.openapi_str))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            broken_file = os.path.join(tmpdir, 'broken.yaml')
+            with open(broken_file, mode='w', encoding='utf_8') as f:
+                f.write('key1: value1\n  key2: value2\n')
+
+            assert not OpenApiSorter.is_valid_yaml(broken_file)
+            assert not OpenApiSorter.is_valid_openapi(broken_file)
+
+    def test_sort_jobs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_files = []
+            for i, content in enumerate([self.openapi_str, 'alpha: bravo', self.openapi_str, '']):
+                input_file = os.path.join(tmpdir, f'input-{i}.yaml')
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(content)
+                input_files.append(input_file)
+
+            result, errors = OpenApiSorter.sort(input_files=input_files, is_overwrite=True, jobs=3)
+
+            assert not result
+            assert errors == [
+                f'{input_files[1]} is not OpenAPI file.',
+                f'{input_files[3]} is not YAML file.',
+            ]
+
+            for input_file in [input_files[0], input_files[2]]:
+                with open(input_file, mode='r', encoding='utf_8') as f:
+                    openapi_json = yaml.load(f, Loader=yaml.SafeLoader)
+
+                original_openapi_json = yaml.load(self.openapi_str, Loader=yaml.SafeLoader)
+
+                self.assert_paths(openapi_json, original_openapi_json)
+                self.assert_tags(openapi_json, original_openapi_json)
+
+    def test_sort_unreadable_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            first_file = os.path.join(tmpdir, 'a.yaml')
+            missing_file = os.path.join(tmpdir, 'missing.yaml')
+            latin_file = os.path.join(tmpdir, 'latin.yaml')
+            last_file = os.path.join(tmpdir, 'b.yaml')
+            for input_file in [first_file, last_file]:
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(self.openapi_str)
+            with open(latin_file, mode='wb') as f:
+                f.write(self.openapi_str.replace('テスト', 'café').encode('latin_1'))
+
+            input_files = [first_file, missing_file, latin_file, last_file]
+            for jobs in [1, 2]:
+                results = []
+                result, errors = OpenApiSorter.sort(
+                    input_files=input_files, is_check=True, jobs=jobs, on_result=results.append
+                )
+
+                assert not result
+                assert [r.input_file for r in results] == input_files
+                assert errors[0] == f'{first_file} is not sorted.'
+                assert errors[1].startswith(f'{missing_file} cannot be processed: ')
+                assert errors[2] == f'{latin_file} is not UTF-8 file.'
+                assert errors[3] == f'{last_file} is not sorted.'
+
+    def test_sort_jobs_iterator(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_files = []
+            for i in range(20):
+                input_file = os.path.join(tmpdir, f'input-{i}.yaml')
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(self.openapi_str)
+                input_files.append(input_file)
+
+            consumed = []
+            results = []
+
+            def iter_input_files():
+                for input_file in input_files:
+                    consumed.append(input_file)
+                    yield input_file
+
+            def on_result(result):
+                results.append((result.input_file, len(consumed)))
+
+            result, errors = OpenApiSorter.sort(
+                input_files=iter_input_files(), is_overwrite=True, jobs=2, on_result=on_result
+            )
+
+            assert result
+
+            # results come in input order while only a few files are read ahead
+            assert [input_file for input_file, _ in results] == input_files
+            assert results[0][1] <= 6
+
+    def test_sort_check(self):
+        with open(self.input_file_name, mode='rb') as f:
+            original_content = f.read()
+
+        result, errors = OpenApiSorter.sort(input_files=[self.input_file_name], is_check=True)
+
+        assert not result
+        assert errors == [f'{self.input_file_name} is not sorted.']
+
+        # check mode never writes
+        with open(self.input_file_name, mode='rb') as f:
+            assert f.read() == original_content
+
+        with patch.object(OpenApiSorter, '_dump') as dump:
+            OpenApiSorter.sort(input_files=[self.input_file_name], is_check=True)
+
+            dump.assert_not_called()
+
+        OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True)
+
+        result, errors = OpenApiSorter.sort(input_files=[self.input_file_name], is_check=True)
+
+        assert result
+        assert not errors
+
+    def test_is_sorted(self):
+        assert OpenApiSorter._is_sorted({'paths': {'/alpha': {}, '/bravo': {}}})
+        assert not OpenApiSorter._is_sorted({'paths': {'/bravo': {}, '/alpha': {}}})
+        assert not OpenApiSorter._is_sorted({'components': {'schemas': {'Bravo': {}, 'Alpha': {}}}})
+        assert not OpenApiSorter._is_sorted({'components': {'requestBodies': {'Bravo': {}, 'Alpha': {}}}})
+        assert OpenApiSorter._is_sorted({'components': {'responses': {'Bravo': {}, 'Alpha': {}}}})
+        assert not OpenApiSorter._is_sorted({'tags': [{'name': 'bravo'}, {'name': 'alpha'}]})
+
+    def test_sort_write_if_changed(self):
+        os.chmod(self.input_file_name, 0o640)
+
+        results = []
+        result, errors = OpenApiSorter.sort(
+            input_files=[self.input_file_name], is_overwrite=True, on_result=results.append
+        )
+
+        assert result
+        assert [(r.input_file, r.output_file, r.is_changed) for r in results] == [
+            (self.input_file_name, self.input_file_name, True)
+        ]
+        assert os.stat(self.input_file_name).st_mode & 0o777 == 0o640
+
+        os.utime(self.input_file_name, (0, 0))
+
+        results = []
+        OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True, on_result=results.append)
+
+        # already sorted file is not rewritten
+        assert [(r.input_file, r.output_file, r.is_changed) for r in results] == [
+            (self.input_file_name, self.input_file_name, False)
+        ]
+        assert os.stat(self.input_file_name).st_mtime == 0
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_file = os.path.join(tmpdir, 'output.yaml')
+
+            results = []
+            OpenApiSorter.sort(input_files=[self.input_file_name], output_file=output_file, on_result=results.append)
+            OpenApiSorter.sort(input_files=[self.input_file_name], output_file=output_file, on_result=results.append)
+
+            assert [result.is_changed for result in results] == [True, False]
+            assert os.listdir(tmpdir) == ['output.yaml']
+
+    def test_sort_quiet(self):
+        OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True)
+
+        captured = self.capsys.readouterr()
+
+        assert captured.out == ''
+        assert captured.err == ''
+
+    def test_sort_timings(self):
+        timings = []
+
+        OpenApiSorter.sort(
+            input_files=[self.input_file_name],
+            is_overwrite=True,
+            on_timing=lambda *args: timings.append(args),
+        )
+
+        assert [(input_file, phase) for input_file, phase, _ in timings] == [
+            (self.input_file_name, phase) for phase in ['read', 'load', 'validate', 'sort', 'dump', 'write', 'total']
+        ]
+        assert all(seconds >= 0 for _, _, seconds in timings)
+
+    def test_sort_profile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_files = []
+            for i in range(2):
+                input_file = os.path.join(tmpdir, f'input-{i}.yaml')
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(self.openapi_str)
+                input_files.append(input_file)
+
+            profile_file = os.path.join(tmpdir, 'sort.prof')
+
+            result, errors = OpenApiSorter.sort(
+                input_files=input_files, is_overwrite=True, jobs=2, profile_file=profile_file
+            )
+
+            assert result
+
+            stats = pstats.Stats(profile_file)
+            assert any(func[2] == '_sort_dict' for func in stats.stats)
+
+    def test_represent_str_identical(self):
+        # the representer before the single-pass classifier
+        def represent_str(dumper, instance):
+            if "\n" in instance:
+                instance = "\n".join([line.rstrip() for line in instance.splitlines()])
+                return dumper.represent_scalar('tag:yaml.org,2002:str', instance, style="|")
+            elif re.match(MATCH_REGEX, instance) or re.search(SEARCH_REGEX, instance):
+                return dumper.represent_scalar('tag:yaml.org,2002:str', instance, style="'")
+            else:
+                return dumper.represent_scalar('tag:yaml.org,2002:str', instance)
+
+        class ReferenceDumper(yaml.SafeDumper):
+            pass
+
+        ReferenceDumper.add_representer(str, represent_str)
+
+        strings = SPECIAL_STRINGS + ['', 'plain', '#a\nb', 'a\n#b', 'a: b\nc', 'trailing  \n  spaces  ', '-\n']
+        documents = [
+            yaml.safe_load(self.openapi_str),
+            generate_spec(paths=20, schemas=20, tags=5, description_lines=3),
+            {'strings': strings, 'prefixed': [f'{a}{b}' for a in strings for b in strings]},
+        ]
+
+        for document in documents:
+            expected = yaml.dump(document, allow_unicode=True, sort_keys=False, indent=2, Dumper=ReferenceDumper)
+
+            assert OpenApiSorter._dump(document) == expected
+
+    def test_sort_document(self):
+        openapi_json = yaml.safe_load(self.openapi_str)
+        original_openapi_json = yaml.safe_load(self.openapi_str)
+
+        sorted_openapi_json = OpenApiSorter.sort_document(openapi_json)
+
+        self.assert_paths(sorted_openapi_json, original_openapi_json)
+        self.assert_component_request_bodies(sorted_openapi_json, original_openapi_json)
+        self.assert_tags(sorted_openapi_json, original_openapi_json)
+        self.assert_others(sorted_openapi_json, original_openapi_json)
+
+        with pytest.raises(InvalidOpenApiError):
+            OpenApiSorter.sort_document({'alpha': 'bravo'})
+
+    def test_sort_string(self):
+        OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True)
+
+        with open(self.input_file_name, mode='r', encoding='utf_8') as f:
+            expected = f.read()
+
+        assert OpenApiSorter.sort_string(self.openapi_str) == expected
+
+        with pytest.raises(InvalidYamlError):
+            OpenApiSorter.sort_string('')
+
+        with pytest.raises(InvalidYamlError):
+            OpenApiSorter.sort_string('key1: value1\n  key2: value2\n')
+
+        with pytest.raises(InvalidOpenApiError):
+            OpenApiSorter.sort_string('alpha: bravo')
+
+    def test_sort_stream(self):
+        expected = OpenApiSorter.sort_string(self.openapi_str)
+
+        for is_stream in [False, True]:
+            output_stream = io.StringIO()
+
+            OpenApiSorter.sort_stream(io.StringIO(self.openapi_str), output_stream, is_stream=is_stream)
+
+            assert output_stream.getvalue() == expected
+
+            with pytest.raises(InvalidOpenApiError):
+                OpenApiSorter.sort_stream(io.StringIO('alpha: bravo'), io.StringIO(), is_stream=is_stream)
+
+            with pytest.raises(InvalidYamlError):
+                OpenApiSorter.sort_stream(io.StringIO(''), io.StringIO(), is_stream=is_stream)
+
     def test_sort_overwrite(self):
         result, errors = OpenApiSorter.sort(input_files=[self.input_file_name], is_overwrite=True)
 
@@ -197,6 +674,36 @@ key1: value1
 
         self.assert_others(openapi_json, original_openapi_json)
 
+    def test_sort_overwrite_symlink(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            real_dir = os.path.join(tmpdir, 'real')
+            link_dir = os.path.join(tmpdir, 'link')
+            os.makedirs(real_dir)
+            os.makedirs(link_dir)
+
+            for is_stream in [False, True]:
+                real_file = os.path.join(real_dir, 'real.yaml')
+                link_file = os.path.join(link_dir, 'link.yaml')
+                with open(real_file, mode='w', encoding='utf_8') as f:
+                    f.write(self.openapi_str)
+                os.chmod(real_file, 0o640)
+                if not os.path.islink(link_file):
+                    os.symlink(os.path.relpath(real_file, link_dir), link_file)
+
+                result, errors = OpenApiSorter.sort(input_files=[link_file], is_overwrite=True, is_stream=is_stream)
+
+                assert result
+                assert not errors
+                assert os.path.islink(link_file)
+                assert os.stat(real_file).st_mode & 0o777 == 0o640
+                assert os.listdir(link_dir) == ['link.yaml']
+                assert os.listdir(real_dir) == ['real.yaml']
+
+                with open(real_file, mode='r', encoding='utf_8') as f:
+                    openapi_json = yaml.load(f, Loader=yaml.SafeLoader)
+
+                assert list(openapi_json['paths']) == ['/alpha', '/bravo', '/charlie']
+
     def test_sort_output(self):
         with tempfile.NamedTemporaryFile() as dest:
             result, errors = OpenApiSorter.sort(input_files=[self.input_file_name], output_file=dest.name)
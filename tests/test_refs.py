@@ -0,0 +1,209 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.refs import ParseCache, RefGraph, find_refs, scan_refs
+
+ROOT_STR = '''
+openapi: 3.0.0
+info:
+  title: refs test yaml
+  version: '1.0'
+paths:
+  /bravo:
+    $ref: './paths/bravo.yaml'
+  /alpha:
+    get:
+      responses:
+        '200':
+          description: OK
+          content:
+            application/json:
+              schema:
+                $ref: './schemas/alpha.yaml#/Alpha'
+components:
+  schemas:
+    Bravo:
+      $ref: 'schemas/bravo.yaml'
+    Alpha:
+      $ref: '#/components/schemas/Bravo'
+'''
+
+BRAVO_PATH_STR = '''
+get:
+  responses:
+    '200':
+      description: OK
+      content:
+        application/json:
+          schema:
+            $ref: '../schemas/bravo.yaml'
+'''
+
+ALPHA_SCHEMA_STR = '''
+Alpha:
+  type: object
+  properties:
+    bravo:
+      $ref: './bravo.yaml'
+'''
+
+BRAVO_SCHEMA_STR = '''
+type: object
+properties:
+  alpha:
+    $ref: './alpha.yaml#/Alpha'
+  url:
+    $ref: 'https://example.com/schemas/url.yaml'
+'''
+
+OTHER_STR = '''
+openapi: 3.0.0
+info:
+  title: other yaml
+  version: '1.0'
+paths:
+  /bravo: {}
+  /alpha: {}
+'''
+
+
+class TestRefs(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_split_spec(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            self.files = {}
+
+            for name, content in [
+                ('openapi.yaml', ROOT_STR),
+                ('paths/bravo.yaml', BRAVO_PATH_STR),
+                ('schemas/alpha.yaml', ALPHA_SCHEMA_STR),
+                ('schemas/bravo.yaml', BRAVO_SCHEMA_STR),
+                ('other/openapi.yaml', OTHER_STR),
+            ]:
+                path = os.path.join(tmpdir, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, mode='w', encoding='utf_8') as f:
+                    f.write(content)
+                self.files[name] = path
+
+            yield
+
+    def test_find_refs(self):
+        parse_cache = ParseCache(load=OpenApiSorter.load_yaml)
+
+        assert find_refs(parse_cache.get(self.files['openapi.yaml']).document) == [
+            'schemas/bravo.yaml',
+            './schemas/alpha.yaml',
+            './paths/bravo.yaml',
+        ]
+        assert find_refs(parse_cache.get(self.files['schemas/bravo.yaml']).document) == ['./alpha.yaml']
+        assert find_refs(['alpha', {'$ref': 1}]) == []
+
+    def test_scan_refs(self):
+        with open(self.files['openapi.yaml'], mode='r', encoding='utf_8') as f:
+            assert scan_refs(f.read()) == ['./paths/bravo.yaml', './schemas/alpha.yaml', 'schemas/bravo.yaml']
+
+        # same-file references and URLs are skipped as in find_refs
+        assert scan_refs(BRAVO_SCHEMA_STR) == ['./alpha.yaml']
+
+        content = '{"$ref": "./alpha.json#/Alpha", "b": {"$ref":"bravo.json"}}'
+        assert scan_refs(content) == ['./alpha.json', 'bravo.json']
+
+    def test_parse_cache(self):
+        with patch.object(OpenApiSorter, 'load_yaml', wraps=OpenApiSorter.load_yaml) as load_yaml:
+            parse_cache = ParseCache(load=OpenApiSorter.load_yaml)
+
+            parsed = parse_cache.get(self.files['openapi.yaml'])
+            assert parse_cache.get(os.path.join(self.tmpdir, 'schemas', '..', 'openapi.yaml')) is parsed
+            assert load_yaml.call_count == 1
+
+        assert parse_cache.get(os.path.join(self.tmpdir, 'missing.yaml')) is None
+
+    def test_groups(self):
+        graph = RefGraph(ParseCache(load=OpenApiSorter.load_yaml))
+
+        input_files = [self.files[name] for name in ['other/openapi.yaml', 'openapi.yaml', 'schemas/alpha.yaml']]
+        for input_file in input_files:
+            graph.add(input_file)
+
+        groups = graph.groups(input_files)
+
+        # referenced files come first, files that are not inputs (paths/bravo.yaml) are not sorted
+        assert groups == [
+            [self.files['other/openapi.yaml']],
+            [self.files['schemas/alpha.yaml'], self.files['openapi.yaml']],
+        ]
+        assert graph.is_referenced(self.files['schemas/bravo.yaml'])
+        assert not graph.is_referenced(self.files['openapi.yaml'])
+
+    def test_sort_follow_refs(self):
+        input_files = list(self.files.values())
+
+        # fragments are not OpenAPI documents on their own
+        result, errors = OpenApiSorter.sort(input_files=input_files, is_check=True)
+
+        assert not result
+        assert len(errors) == 5
+
+        for jobs in [1, 2]:
+            with patch.object(OpenApiSorter, 'load_yaml', wraps=OpenApiSorter.load_yaml) as load_yaml:
+                result, errors = OpenApiSorter.sort(
+                    input_files=input_files, is_overwrite=True, is_follow_refs=True, jobs=jobs
+                )
+
+                assert result
+                assert not errors
+
+                # every file is parsed once (in this process)
+                assert load_yaml.call_count == len(input_files)
+
+        with open(self.files['openapi.yaml'], mode='r', encoding='utf_8') as f:
+            assert f.read() == OpenApiSorter.sort_string(ROOT_STR)
+
+        with open(self.files['other/openapi.yaml'], mode='r', encoding='utf_8') as f:
+            assert f.read() == OpenApiSorter.sort_string(OTHER_STR)
+
+        result, errors = OpenApiSorter.sort(input_files=input_files, is_check=True, is_follow_refs=True)
+
+        assert result
+
+        with pytest.raises(ValueError):
+            OpenApiSorter.sort(input_files=input_files, is_overwrite=True, is_stream=True, is_follow_refs=True)
+
+    def test_sort_follow_refs_not_openapi(self):
+        # a file that nobody refers to still has to be an OpenAPI document
+        input_file = os.path.join(self.tmpdir, 'schemas', 'charlie.yaml')
+        with open(input_file, mode='w', encoding='utf_8') as f:
+            f.write('type: object\n')
+
+        result, errors = OpenApiSorter.sort(
+            input_files=[input_file, self.files['schemas/alpha.yaml']], is_overwrite=True, is_follow_refs=True
+        )
+
+        assert not result
+        assert errors == [f'{input_file} is not OpenAPI file.']
+
+    def test_sort_follow_refs_not_utf_8(self):
+        latin_file = os.path.join(self.tmpdir, 'schemas', 'latin.yaml')
+        with open(latin_file, mode='wb') as f:
+            f.write('description: café\n'.encode('latin_1'))
+
+        with open(self.files['other/openapi.yaml'], mode='a', encoding='utf_8') as f:
+            f.write("components:\n  schemas:\n    Latin:\n      $ref: '../schemas/latin.yaml'\n")
+
+        parsed = ParseCache(load=OpenApiSorter.load_yaml).get(latin_file)
+
+        assert parsed.document is None
+        assert parsed.error is None
+
+        result, errors = OpenApiSorter.sort(
+            input_files=[self.files['other/openapi.yaml'], latin_file], is_check=True, is_follow_refs=True
+        )
+
+        assert not result
+        assert f'{latin_file} is not YAML file.' in errors
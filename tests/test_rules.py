@@ -0,0 +1,315 @@
+import io
+import locale
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+import yaml
+
+import pytest
+from openapi_sorter.backends import get_backend
+from openapi_sorter.cache import SortCache
+from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.rules import (
+    DEFAULT_RULES,
+    RuleError,
+    SortRule,
+    SortRules,
+    find_config,
+    lexical_key,
+    load_rules,
+    natural_key,
+    rules_from_config,
+    sorted_indexes,
+    tomllib,
+)
+from openapi_sorter.streaming import StreamingSorter
+
+HTTP_METHODS = ['get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace']
+
+OPENAPI_STR = '''
+openapi: 3.0.0
+info:
+  title: rules test yaml
+  version: '1.0'
+paths:
+  /bravo:
+    post:
+      responses:
+        '200':
+          description: OK
+    get:
+      parameters:
+        - name: q
+          in: query
+        - name: id
+          in: path
+      responses:
+        '404':
+          description: Not Found
+        '200':
+          description: OK
+  /alpha:
+    get:
+      responses:
+        '200':
+          description: OK
+components:
+  parameters:
+    Limit:
+      name: limit
+      in: query
+    Id:
+      name: id
+      in: path
+  schemas:
+    Item10:
+      type: object
+      properties:
+        zulu:
+          type: string
+        alpha:
+          type: string
+    Item2:
+      type: object
+tags:
+  - description: no name
+  - name: charlie
+  - name: alpha
+'''
+
+RULES_CONFIG = {
+    'rules': [
+        {'path': 'components.*'},
+        {'path': 'components.schemas', 'order': 'natural'},
+        {'path': 'components.schemas.*.properties'},
+        {'path': 'paths.*', 'order': HTTP_METHODS},
+        {'path': 'paths.*.*.responses'},
+        {'path': ['paths', '*', '*', 'parameters'], 'by': 'name'},
+    ]
+}
+
+
+class TestRules(TestCase):
+    def setUp(self):
+        self.rules = rules_from_config(RULES_CONFIG)
+
+    def test_default_rules(self):
+        openapi_json = yaml.safe_load(OPENAPI_STR)
+
+        DEFAULT_RULES.sort(openapi_json)
+
+        assert list(openapi_json['paths']) == ['/alpha', '/bravo']
+        assert list(openapi_json['paths']['/bravo']) == ['post', 'get']
+        assert list(openapi_json['components']['schemas']) == ['Item10', 'Item2']
+        assert list(openapi_json['components']['parameters']) == ['Limit', 'Id']
+        # tags without a name are sorted last
+        assert [tag.get('name') for tag in openapi_json['tags']] == ['alpha', 'charlie', None]
+        assert DEFAULT_RULES.is_sorted(openapi_json)
+
+    def test_sort(self):
+        openapi_json = yaml.safe_load(OPENAPI_STR)
+
+        assert not self.rules.is_sorted(openapi_json)
+
+        sorted_openapi_json = self.rules.sort(openapi_json)
+
+        assert sorted_openapi_json is openapi_json
+        assert list(openapi_json) == ['openapi', 'info', 'paths', 'components', 'tags']
+        assert list(openapi_json['paths']) == ['/alpha', '/bravo']
+        assert list(openapi_json['paths']['/bravo']) == ['get', 'post']
+        assert list(openapi_json['paths']['/bravo']['get']['responses']) == ['200', '404']
+        assert [p['name'] for p in openapi_json['paths']['/bravo']['get']['parameters']] == ['id', 'q']
+        assert list(openapi_json['components']) == ['parameters', 'schemas']
+        assert list(openapi_json['components']['parameters']) == ['Id', 'Limit']
+        assert list(openapi_json['components']['schemas']) == ['Item2', 'Item10']
+        assert list(openapi_json['components']['schemas']['Item10']['properties']) == ['alpha', 'zulu']
+        assert self.rules.is_sorted(openapi_json)
+
+    def test_wildcard_merge(self):
+        # the more specific rule wins, the rules of * still apply below it
+        rules = rules_from_config(
+            {
+                'default-rules': False,
+                'rules': [
+                    {'path': 'components.*', 'order': ['Zulu']},
+                    {'path': 'components.*.*.properties'},
+                    {'path': 'components.schemas'},
+                ],
+            }
+        )
+
+        openapi_json = {
+            'components': {
+                'schemas': {'Zulu': {'properties': {'b': {}, 'a': {}}}, 'Alpha': {}},
+                'parameters': {'Alpha': {}, 'Zulu': {}},
+            }
+        }
+
+        rules.sort(openapi_json)
+
+        assert list(openapi_json['components']['schemas']) == ['Alpha', 'Zulu']
+        assert list(openapi_json['components']['schemas']['Zulu']['properties']) == ['a', 'b']
+        assert list(openapi_json['components']['parameters']) == ['Zulu', 'Alpha']
+
+    def test_sorted_section(self):
+        # sections that are already in order are not rebuilt
+        openapi_json = DEFAULT_RULES.sort(yaml.safe_load(OPENAPI_STR))
+        paths = openapi_json['paths']
+        tags = openapi_json['tags']
+
+        DEFAULT_RULES.sort(openapi_json)
+
+        assert openapi_json['paths'] is paths
+        assert openapi_json['tags'] is tags
+
+        assert sorted_indexes(['alpha', 'bravo', 'bravo'], lexical_key) is None
+        assert sorted_indexes(['bravo', None, 'alpha'], lexical_key) == [2, 0, 1]
+        assert sorted_indexes(['Item10', 'Item2'], natural_key) == [1, 0]
+
+    def test_locale_order(self):
+        rules = rules_from_config({'default-rules': False, 'rules': [{'path': 'paths', 'order': 'locale'}]})
+
+        # the C locale compares code points
+        collate = locale.setlocale(locale.LC_COLLATE)
+        try:
+            locale.setlocale(locale.LC_COLLATE, 'C')
+            openapi_json = rules.sort({'paths': {'b': {}, 'B': {}, 'a': {}}})
+        finally:
+            locale.setlocale(locale.LC_COLLATE, collate)
+
+        assert list(openapi_json['paths']) == ['B', 'a', 'b']
+
+    def test_natural_key(self):
+        values = ['Item10', 'item1', 'Item2', None, 'Item', '10', '9']
+
+        assert sorted(values, key=natural_key) == ['9', '10', 'Item', 'Item2', 'Item10', 'item1', None]
+
+    def test_streaming(self):
+        backend = get_backend()
+
+        expected = OpenApiSorter._dump(self.rules.sort(yaml.safe_load(OPENAPI_STR)), backend=backend)
+
+        output_stream = io.StringIO()
+        result = StreamingSorter(backend, rules=self.rules).sort(io.StringIO(OPENAPI_STR), output_stream)
+
+        assert not result.is_sorted
+        assert output_stream.getvalue() == expected
+
+        result = StreamingSorter(backend, rules=self.rules).sort(io.StringIO(expected))
+
+        assert result.is_sorted
+
+    def test_pickle(self):
+        rules = pickle.loads(pickle.dumps(self.rules))
+
+        assert rules == self.rules
+        assert rules.sort(yaml.safe_load(OPENAPI_STR)) == self.rules.sort(yaml.safe_load(OPENAPI_STR))
+
+    def test_sort_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = SortCache(cache_dir=os.path.join(tmpdir, 'cache'))
+
+            input_files = []
+            for i in range(2):
+                input_file = os.path.join(tmpdir, f'input-{i}.yaml')
+                with open(input_file, mode='w', encoding='utf_8') as f:
+                    f.write(OPENAPI_STR)
+                input_files.append(input_file)
+
+            # sorted with the default rules and recorded in the cache
+            OpenApiSorter.sort(input_files=input_files, is_overwrite=True, cache=cache)
+
+            result, errors = OpenApiSorter.sort(input_files=input_files, is_check=True, cache=cache, rules=self.rules)
+
+            assert not result
+            assert errors == [f'{input_file} is not sorted.' for input_file in input_files]
+
+            for is_stream in [False, True]:
+                result, errors = OpenApiSorter.sort(
+                    input_files=input_files, is_overwrite=True, is_stream=is_stream, jobs=2, rules=self.rules
+                )
+
+                assert result
+
+                for input_file in input_files:
+                    with open(input_file, mode='r', encoding='utf_8') as f:
+                        assert f.read() == OpenApiSorter.sort_string(OPENAPI_STR, rules=self.rules)
+
+    def test_invalid_config(self):
+        for config in [
+            [],
+            {'rules': {}},
+            {'rules': ['paths']},
+            {'rules': [{'path': ''}]},
+            {'rules': [{'path': 'paths', 'order': 'random'}]},
+            {'rules': [{'path': 'paths', 'order': [1]}]},
+            {'rules': [{'path': 'paths', 'by': 1}]},
+            {'rules': [{'path': 'paths', 'key': 'name'}]},
+        ]:
+            with pytest.raises(RuleError):
+                rules_from_config(config)
+
+        assert rules_from_config(None) == DEFAULT_RULES
+        assert rules_from_config({'default-rules': False}) == SortRules([])
+        assert rules_from_config({'rules': [{'path': 'tags', 'by': 'name'}]}).rules[-1] == SortRule(
+            path=('tags',), by='name'
+        )
+
+
+class TestLoadRules(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_config_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            self.sub_dir = os.path.join(tmpdir, 'specs', 'v1')
+            os.makedirs(self.sub_dir)
+
+            yield
+
+    def test_yaml(self):
+        config_file = os.path.join(self.tmpdir, '.openapi-sorter.yaml')
+        with open(config_file, mode='w', encoding='utf_8') as f:
+            yaml.safe_dump(RULES_CONFIG, f)
+
+        assert find_config(self.sub_dir) == config_file
+        assert load_rules(directory=self.sub_dir) == rules_from_config(RULES_CONFIG)
+        assert load_rules(config_file) == rules_from_config(RULES_CONFIG)
+
+    @pytest.mark.skipif(tomllib is None, reason='tomllib (Python 3.11+) or tomli is not installed')
+    def test_pyproject(self):
+        # pyproject.toml without the section is skipped
+        with open(os.path.join(self.sub_dir, 'pyproject.toml'), mode='w', encoding='utf_8') as f:
+            f.write('[tool.black]\nline-length = 120\n')
+
+        pyproject_file = os.path.join(self.tmpdir, 'pyproject.toml')
+        with open(pyproject_file, mode='w', encoding='utf_8') as f:
+            f.write('''
+[tool.openapi-sorter]
+rules = [
+  { path = "components.*" },
+  { path = "paths.*", order = ["get", "post"] },
+]
+''')
+
+        assert find_config(self.sub_dir) == pyproject_file
+
+        rules = load_rules(directory=self.sub_dir)
+
+        assert rules.rules[len(DEFAULT_RULES.rules) :] == [
+            SortRule(path=('components', '*')),
+            SortRule(path=('paths', '*'), order=('get', 'post')),
+        ]
+
+    def test_no_config(self):
+        assert find_config(self.sub_dir) is None
+        assert load_rules(directory=self.sub_dir) is DEFAULT_RULES
+
+    def test_invalid_file(self):
+        config_file = os.path.join(self.tmpdir, '.openapi-sorter.yaml')
+        with open(config_file, mode='w', encoding='utf_8') as f:
+            f.write('rules: [')
+
+        with pytest.raises(RuleError):
+            load_rules(config_file)
@@ -0,0 +1,262 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+from openapi_sorter import __version__
+from openapi_sorter.cache import SortCache
+from openapi_sorter.limits import ResourceLimits
+from openapi_sorter.openapi_sorter import OpenApiSorter, OpenApiSorterError
+from openapi_sorter.rules import ORDER_LOCALE, SortRule, SortRules
+from openapi_sorter.server import (
+    SOCKET_ENV,
+    ServerError,
+    SortClient,
+    SortServer,
+    decode_sort_kwargs,
+    default_socket_path,
+    encode_sort_kwargs,
+    forward,
+)
+
+OPENAPI_STR = '''openapi: 3.0.0
+info:
+  title: server test yaml
+  version: '1.0'
+paths:
+  /bravo: {}
+  /alpha: {}
+'''
+
+
+class TestServer(TestCase):
+    @pytest.fixture(autouse=True)
+    def start_server(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            self.socket_path = os.path.join(tmpdir, 'sorter.sock')
+
+            self.input_file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(self.input_file, mode='w', encoding='utf_8') as f:
+                f.write(OPENAPI_STR)
+
+            self.server = SortServer(self.socket_path)
+            thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+            thread.start()
+
+            self.client = SortClient(self.socket_path)
+
+            yield
+
+            self.server.shutdown()
+            thread.join()
+            self.server.server_close()
+
+    def test_ping(self):
+        response = self.client.ping()
+
+        assert response['pid'] == os.getpid()
+        assert oct(os.stat(self.socket_path).st_mode & 0o777) == oct(0o700)
+
+        with pytest.raises(ServerError):
+            SortServer(self.socket_path)
+
+    def test_sort_check(self):
+        assert self.client.sort_string(OPENAPI_STR) == OpenApiSorter.sort_string(OPENAPI_STR)
+
+        assert self.client.request({'command': 'check', 'content': OPENAPI_STR}) == {'ok': True, 'is_sorted': False}
+        assert self.client.request({'command': 'check', 'content': OpenApiSorter.sort_string(OPENAPI_STR)}) == {
+            'ok': True,
+            'is_sorted': True,
+        }
+
+        # rules are sent as the configuration format
+        rules = SortRules([SortRule(path=('paths',), order=('/bravo', '/alpha'))]).to_config()
+        assert self.client.request({'command': 'check', 'content': OPENAPI_STR, 'rules': rules})['is_sorted']
+
+        rules = [{'path': 'paths', 'order': 'reverse'}]
+        assert not self.client.request({'command': 'check', 'content': OPENAPI_STR, 'rules': rules})['ok']
+
+        with pytest.raises(OpenApiSorterError):
+            self.client.sort_string('openapi: [')
+
+    def test_validate(self):
+        assert self.client.request({'command': 'validate', 'content': OPENAPI_STR}) == {'ok': True, 'error': None}
+
+        response = self.client.request({'command': 'validate', 'content': 'openapi: 3.0.0\n'})
+
+        assert not response['ok']
+        assert response['error']
+
+    def test_limits(self):
+        # content is checked with the default limits unless the request has its own
+        aliases = ''.join(f'  a{i}: *a\n' for i in range(100_001))
+        bomb = f'openapi: 3.0.0\nx-anchor: &a [1]\nx-aliases:\n{aliases}'
+
+        for command in ['sort', 'check', 'validate']:
+            response = self.client.request({'command': command, 'content': bomb})
+
+            assert response == {'ok': False, 'error': 'content was rejected: the document has more than 100000 aliases'}
+
+            response = self.client.request({'command': command, 'content': OPENAPI_STR, 'limits': {'max_bytes': 10}})
+
+            assert response == {'ok': False, 'error': 'content was rejected: the file is larger than 10 bytes'}
+
+        response = self.client.request({'command': 'sort', 'content': OPENAPI_STR, 'limits': {'max_nodes': 1000}})
+
+        assert response == {'ok': True, 'content': OpenApiSorter.sort_string(OPENAPI_STR)}
+
+        response = self.client.request({'command': 'sort', 'content': OPENAPI_STR, 'limits': {'unknown': 1}})
+
+        assert not response['ok']
+
+    def test_invalid_request(self):
+        assert self.client.request({'command': 'unknown'}) == {'ok': False, 'error': 'invalid request'}
+        assert self.client.request({'command': 'sort'}) == {'ok': False, 'error': 'content must be a string'}
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+            client.sendall(b'not json\n')
+
+            assert json.loads(client.makefile('rb').readline()) == {'ok': False, 'error': 'invalid request'}
+
+    def test_version_mismatch(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+            client.sendall(b'{"command": "ping", "version": "0.0.0"}\n')
+
+            response = json.loads(client.makefile('rb').readline())
+
+        assert not response['ok']
+        assert response['version'] == __version__
+
+    def test_forward(self):
+        results = []
+
+        result, errors = forward(
+            {'input_files': [self.input_file], 'is_check': True, 'on_result': results.append}, self.socket_path
+        )
+
+        assert not result
+        assert errors == [f'{self.input_file} is not sorted.']
+        assert [(r.input_file, r.error) for r in results] == [(self.input_file, errors[0])]
+
+        result, errors = forward({'input_files': [self.input_file], 'is_overwrite': True}, self.socket_path)
+
+        assert result
+        assert results[0].timings is not None
+
+        with open(self.input_file, mode='r', encoding='utf_8') as f:
+            assert f.read() == OpenApiSorter.sort_string(OPENAPI_STR)
+
+    def test_forward_relative_paths(self):
+        # the results name the files as given, like a local run
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        try:
+            missing_file = os.path.join('.', 'missing.yaml')
+            kwargs = {'input_files': ['openapi.yaml', missing_file], 'is_check': True}
+
+            local_results = []
+            local = OpenApiSorter.sort(**kwargs, on_result=local_results.append)
+
+            results = []
+            forwarded = forward({**kwargs, 'on_result': results.append}, self.socket_path)
+        finally:
+            os.chdir(cwd)
+
+        assert forwarded == local
+        assert forwarded[1][0] == 'openapi.yaml is not sorted.'
+        assert forwarded[1][1].startswith(f'{missing_file} cannot be processed: ')
+        assert [(r.input_file, r.error) for r in results] == [(r.input_file, r.error) for r in local_results]
+
+    def test_forward_locale(self):
+        # locale rules depend on the LC_COLLATE of the process, so they are sorted locally
+        rules = SortRules([SortRule(path=('paths',), order=ORDER_LOCALE)])
+
+        with patch.object(SortClient, 'run') as run:
+            assert forward({'input_files': [self.input_file], 'rules': rules}, self.socket_path) is None
+
+        assert run.call_count == 0
+
+    def test_concurrent_requests(self):
+        # a client that has not sent its request yet does not block the others
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+            idle.connect(self.socket_path)
+
+            responses = []
+            thread = threading.Thread(target=lambda: responses.append(self.client.ping()), daemon=True)
+            thread.start()
+            thread.join(5)
+
+            assert responses and responses[0]['ok']
+
+    def test_forward_fallback(self):
+        # no server
+        assert forward({'input_files': [self.input_file], 'is_check': True}, os.path.join(self.tmpdir, 'none')) is None
+
+        # the server rejects the arguments before sorting any file
+        assert forward({'input_files': [self.input_file], 'is_check': True, 'unknown': 1}, self.socket_path) is None
+
+        with patch.object(SortClient, 'request', return_value={'ok': False, 'error': 'version'}):
+            assert forward({'input_files': [self.input_file], 'is_check': True}, self.socket_path) is None
+
+    def test_stale_socket(self):
+        self.server.shutdown()
+        self.server.socket.close()
+
+        assert os.path.exists(self.socket_path)
+        assert not SortClient(self.socket_path).ping()
+
+        # the socket file left by a dead server is replaced
+        server = SortServer(self.socket_path)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.start()
+
+        try:
+            assert self.client.ping()
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+        assert not os.path.exists(self.socket_path)
+
+    def test_encode_sort_kwargs(self):
+        cache = SortCache(cache_dir='cache', max_size=10)
+        rules = SortRules([SortRule(path=('paths',), order='natural')])
+
+        limits = ResourceLimits(max_bytes=100, max_aliases=10)
+
+        data = encode_sort_kwargs(
+            {
+                'input_files': ['openapi.yaml'],
+                'output_file': None,
+                'rules': rules,
+                'cache': cache,
+                'limits': limits,
+                'on_timing': print,
+            }
+        )
+
+        assert json.loads(json.dumps(data)) == data
+        assert data['input_files'] == [os.path.abspath('openapi.yaml')]
+        assert 'on_timing' not in data
+
+        kwargs = decode_sort_kwargs(data)
+
+        assert kwargs['rules'].to_config() == rules.to_config()
+        assert kwargs['cache'].cache_dir == os.path.abspath('cache')
+        assert kwargs['cache'].max_size == 10
+        assert kwargs['limits'] == limits
+
+    def test_default_socket_path(self):
+        with patch.dict(os.environ, {SOCKET_ENV: '/tmp/sorter.sock'}):
+            assert default_socket_path() == '/tmp/sorter.sock'
+
+        with patch.dict(os.environ, {SOCKET_ENV: '', 'XDG_RUNTIME_DIR': self.tmpdir}):
+            assert default_socket_path() == os.path.join(self.tmpdir, 'openapi-sorter.sock')
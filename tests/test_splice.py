@@ -0,0 +1,204 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from openapi_sorter.backends import get_backend
+from openapi_sorter.cache import SortCache
+from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.rules import rules_from_config
+from openapi_sorter.splice import SpliceError, SpliceSorter
+
+OPENAPI_STR = '''# splice test yaml
+openapi: 3.0.0
+info:
+  title: "splice test yaml"  # keep the quotes
+  version: '1.0'
+  description: |
+    # not a comment
+    text
+paths:
+  # about bravo
+  /bravo:
+    get:
+      summary: >-
+        folded
+        text
+  /alpha: &alpha
+    get: {responses: {'200': {description: OK}}}
+
+  # about charlie
+  /charlie:
+    $ref: './charlie.yaml'
+components:
+  schemas:
+    Zulu:
+      type: object
+    Alpha:
+      type: string
+tags:
+  - name: zulu
+    description: z
+  # alpha tag
+  - name: alpha
+'''
+
+SORTED_STR = '''# splice test yaml
+openapi: 3.0.0
+info:
+  title: "splice test yaml"  # keep the quotes
+  version: '1.0'
+  description: |
+    # not a comment
+    text
+paths:
+  /alpha: &alpha
+    get: {responses: {'200': {description: OK}}}
+  # about bravo
+  /bravo:
+    get:
+      summary: >-
+        folded
+        text
+
+  # about charlie
+  /charlie:
+    $ref: './charlie.yaml'
+components:
+  schemas:
+    Alpha:
+      type: string
+    Zulu:
+      type: object
+tags:
+  # alpha tag
+  - name: alpha
+  - name: zulu
+    description: z
+'''
+
+
+class TestSplice(TestCase):
+    def test_sort_string(self):
+        assert OpenApiSorter.sort_string(OPENAPI_STR, is_splice=True) == SORTED_STR
+        assert OpenApiSorter.sort_string(SORTED_STR, is_splice=True) == SORTED_STR
+
+        # the keys are in the same order as the normal mode
+        assert OpenApiSorter.sort_string(SORTED_STR) == OpenApiSorter.sort_string(OPENAPI_STR)
+
+    def test_no_trailing_newline(self):
+        assert OpenApiSorter.sort_string(OPENAPI_STR[:-1], is_splice=True) == SORTED_STR[:-1]
+        assert OpenApiSorter.sort_string(OPENAPI_STR + '# end', is_splice=True) == SORTED_STR + '# end'
+
+    def test_crlf(self):
+        content = OPENAPI_STR.replace('\n', '\r\n')
+
+        assert OpenApiSorter.sort_string(content, is_splice=True) == SORTED_STR.replace('\n', '\r\n')
+
+    def test_rules(self):
+        rules = rules_from_config({'rules': [{'path': 'paths.*.*.parameters', 'by': 'name'}]})
+
+        content = '''openapi: 3.0.0
+info: {title: rules, version: '1.0'}
+paths:
+  /alpha:
+    get:
+      parameters:
+        - name: q  # query
+          in: query
+        -   name: id
+            in: path
+'''
+
+        assert OpenApiSorter.sort_string(content, is_splice=True, rules=rules) == ('''openapi: 3.0.0
+info: {title: rules, version: '1.0'}
+paths:
+  /alpha:
+    get:
+      parameters:
+        -   name: id
+            in: path
+        - name: q  # query
+          in: query
+''')
+
+    def test_fallback(self):
+        backend = get_backend()
+        splicer = SpliceSorter(backend)
+
+        # flow style sections cannot be reordered as text
+        content = "openapi: 3.0.0\ninfo: {title: flow, version: '1.0'}\npaths: {/bravo: {}, /alpha: {}}\n"
+        node, _ = splicer.load(content)
+
+        with self.assertRaises(SpliceError):
+            splicer.splice(content, node)
+
+        assert OpenApiSorter.sort_string(content, is_splice=True) == OpenApiSorter.sort_string(content)
+
+        # the trailing blank line belongs to the |+ scalar, so moving it changes the content
+        content = '''openapi: 3.0.0
+info: {title: keep, version: '1.0'}
+paths:
+  /bravo:
+    description: |+
+      text
+
+  /alpha: {}
+'''
+        node, document = splicer.load(content)
+        spliced = splicer.splice(content, node)
+
+        assert not splicer.verify(spliced, OpenApiSorter.sort_document(document))
+        assert OpenApiSorter.sort_string(content, is_splice=True) == OpenApiSorter.sort_string(content)
+
+    def test_needs_verify(self):
+        backend = get_backend()
+
+        # entries moved as whole lines keep their content, so plain documents are not parsed again
+        assert not SpliceSorter(backend).needs_verify(OPENAPI_STR.replace('&alpha', ''))
+        assert SpliceSorter(backend, is_verify=True).needs_verify(OPENAPI_STR.replace('&alpha', ''))
+
+        # aliases and block scalars keeping trailing blank lines can change when entries are moved
+        assert SpliceSorter(backend).needs_verify(OPENAPI_STR + 'x-alias: *alpha\n')
+        assert not SpliceSorter(backend).needs_verify(OPENAPI_STR)
+        for header in ['|+', '>+', '|2+', '|+2', '|+  # keep']:
+            assert SpliceSorter(backend).needs_verify(f'description: {header}\n  text\n')
+        assert not SpliceSorter(backend).needs_verify('description: |-\n  text\n')
+
+        with patch.object(SpliceSorter, 'verify', wraps=SpliceSorter(backend).verify) as verify:
+            assert OpenApiSorter.sort_string(OPENAPI_STR, is_splice=True) == SORTED_STR
+            assert verify.call_count == 0
+
+            assert OpenApiSorter.sort_string(OPENAPI_STR, is_splice=True, is_splice_verify=True) == SORTED_STR
+            assert verify.call_count == 1
+
+    def test_sort_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = SortCache(cache_dir=os.path.join(tmpdir, 'cache'))
+
+            input_file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(input_file, mode='w', encoding='utf_8') as f:
+                f.write(OPENAPI_STR)
+
+            result, errors = OpenApiSorter.sort(input_files=[input_file], is_check=True, is_splice=True)
+
+            assert not result
+
+            for _ in range(2):
+                result, errors = OpenApiSorter.sort(
+                    input_files=[input_file], is_overwrite=True, is_splice=True, cache=cache
+                )
+
+                assert result
+
+                with open(input_file, mode='r', encoding='utf_8') as f:
+                    assert f.read() == SORTED_STR
+
+            # the spliced content is not what the normal mode writes
+            result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, cache=cache)
+
+            with open(input_file, mode='r', encoding='utf_8') as f:
+                assert f.read() == OpenApiSorter.sort_string(OPENAPI_STR)
+
+            with self.assertRaises(ValueError):
+                OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True, is_splice=True)
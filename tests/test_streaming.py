@@ -0,0 +1,156 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+import pytest
+from openapi_sorter.backends import BACKEND_C, BACKEND_PYTHON, get_backend, is_c_available
+from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.streaming import StreamingSorter
+from tests.test_backends import OPENAPI_STR
+
+EXTRA_STR = '''x-scalars:
+  float: 1.50
+  hex: 0x1F
+  null: ~
+  bool: yes
+  date: 2020-01-01
+  empty-list: []
+  empty-map: {}
+  flow: [alpha, bravo]
+  multiline: "alpha  \\nbravo"
+  '123': '456'
+'''
+
+
+class TestStreamingSorter(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_tmpdir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+
+            yield
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, mode='w', encoding='utf_8') as f:
+            f.write(content)
+        return path
+
+    def read(self, path):
+        with open(path, mode='r', encoding='utf_8') as f:
+            return f.read()
+
+    def test_same_output_as_dict_sort(self):
+        backends = [BACKEND_PYTHON, BACKEND_C] if is_c_available() else [BACKEND_PYTHON]
+
+        for backend in backends:
+            yaml_backend = get_backend(backend)
+            content = OPENAPI_STR + EXTRA_STR
+
+            openapi_json = OpenApiSorter._sort_dict(OpenApiSorter.load_yaml(content, backend=yaml_backend))
+            expected = OpenApiSorter._dump(openapi_json, backend=yaml_backend)
+
+            output = io.StringIO()
+            result = StreamingSorter(yaml_backend).sort(io.StringIO(content), output)
+
+            assert output.getvalue() == expected
+            assert result.header == {'openapi': '3.0.0'}
+            assert not result.is_sorted
+            assert result.documents == 1
+
+    def test_sort_stream(self):
+        input_file = self.write('input.yaml', OPENAPI_STR)
+        expected_file = self.write('expected.yaml', OPENAPI_STR)
+
+        result, errors = OpenApiSorter.sort(input_files=[expected_file], is_overwrite=True)
+        assert result
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True)
+
+        assert result
+        assert not errors
+        assert self.read(input_file) == self.read(expected_file)
+        assert sorted(os.listdir(self.tmpdir)) == ['expected.yaml', 'input.yaml']
+
+    def test_sort_stream_check(self):
+        input_file = self.write('input.yaml', OPENAPI_STR)
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_check=True, is_stream=True)
+
+        assert not result
+        assert errors == [f'{input_file} is not sorted.']
+        assert self.read(input_file) == OPENAPI_STR
+
+        OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True)
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_check=True, is_stream=True)
+
+        assert result
+        assert not errors
+
+    def test_sort_stream_invalid(self):
+        empty_file = self.write('empty.yaml', '')
+        broken_file = self.write('broken.yaml', 'key1: value1\n  key2: value2\n')
+        not_openapi_file = self.write('not-openapi.yaml', 'alpha: bravo\n')
+
+        result, errors = OpenApiSorter.sort(
+            input_files=[empty_file, broken_file, not_openapi_file], is_overwrite=True, is_stream=True
+        )
+
+        assert not result
+        assert errors == [
+            f'{empty_file} is not YAML file.',
+            f'{broken_file} is not YAML file.',
+            f'{not_openapi_file} is not OpenAPI file.',
+        ]
+        assert self.read(not_openapi_file) == 'alpha: bravo\n'
+        assert sorted(os.listdir(self.tmpdir)) == ['broken.yaml', 'empty.yaml', 'not-openapi.yaml']
+
+    def test_alias_before_anchor(self):
+        content = '''
+openapi: 3.0.0
+components:
+  schemas:
+    Bravo: &bravo
+      type: object
+    Alpha: *bravo
+'''
+        input_file = self.write('input.yaml', content)
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True)
+
+        assert not result
+        assert errors == [f'{input_file} cannot be sorted in stream mode: alias *bravo would precede its anchor.']
+        assert self.read(input_file) == content
+        assert sorted(os.listdir(self.tmpdir)) == ['input.yaml']
+
+    def test_merge_key(self):
+        content = '''openapi: 3.0.0
+x-common: &common
+  type: object
+components:
+  schemas:
+    Bravo:
+      <<: *common
+      description: bravo
+    Alpha:
+      description: alpha
+'''
+        input_file = self.write('input.yaml', content)
+
+        result, errors = OpenApiSorter.sort(input_files=[input_file], is_overwrite=True, is_stream=True)
+
+        assert result
+        assert not errors
+        assert self.read(input_file) == '''openapi: 3.0.0
+x-common: &common
+  type: object
+components:
+  schemas:
+    Alpha:
+      description: alpha
+    Bravo:
+      <<: *common
+      description: bravo
+'''
@@ -0,0 +1,155 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+from openapi_sorter.openapi_sorter import OpenApiSorter
+from openapi_sorter.watcher import Watcher, file_digest
+from tests.test_backends import OPENAPI_STR
+
+
+class TestWatcher(TestCase):
+    @pytest.fixture(autouse=True)
+    def create_watch_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.tmpdir = tmpdir
+            self.now = 0.0
+            self.errors = []
+            self.watcher = Watcher(tmpdir, on_errors=self.errors.extend, debounce=1.0, clock=lambda: self.now)
+
+            yield
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmpdir, name)
+        with open(path, mode='w', encoding='utf_8') as f:
+            f.write(content)
+        return path
+
+    def test_scan(self):
+        self.write('alpha.yaml', OPENAPI_STR)
+        self.write('bravo.yml', OPENAPI_STR)
+        self.write('charlie.json', '{}')
+        os.makedirs(os.path.join(self.tmpdir, '.git'))
+        self.write(os.path.join('.git', 'delta.yaml'), OPENAPI_STR)
+
+        assert sorted(os.path.basename(path) for path in self.watcher.scan()) == ['alpha.yaml', 'bravo.yml']
+
+    def test_run_once(self):
+        path = self.write('alpha.yaml', OPENAPI_STR)
+
+        with patch.object(OpenApiSorter, 'sort', wraps=OpenApiSorter.sort) as sort:
+            # debounce: the file is not sorted until it stays unchanged for 1 second
+            assert self.watcher.run_once() == (True, [])
+            assert sort.call_count == 0
+
+            self.now = 1.0
+            assert self.watcher.run_once() == (True, [])
+            assert sort.call_count == 1
+            assert sort.call_args.kwargs.get('input_files') == [path]
+            assert sort.call_args.kwargs.get('is_overwrite') is True
+
+            with open(path, mode='r', encoding='utf_8') as f:
+                sorted_content = f.read()
+
+            assert sorted_content != OPENAPI_STR
+            assert self.watcher.digests[path] == file_digest(path)
+
+            # the rewritten file is not detected as a change
+            self.now = 5.0
+            self.watcher.run_once()
+            assert sort.call_count == 1
+
+            # touched but unchanged content is not sorted again
+            os.utime(path, ns=(0, 0))
+            self.watcher.run_once()
+            self.now = 10.0
+            self.watcher.run_once()
+            assert sort.call_count == 1
+
+            # changed content is sorted again
+            self.write('alpha.yaml', OPENAPI_STR)
+            self.watcher.run_once()
+            self.now = 15.0
+            self.watcher.run_once()
+            assert sort.call_count == 2
+
+            with open(path, mode='r', encoding='utf_8') as f:
+                assert f.read() == sorted_content
+
+    def test_run_once_burst(self):
+        path = self.write('alpha.yaml', 'alpha: bravo')
+
+        with patch.object(OpenApiSorter, 'sort', wraps=OpenApiSorter.sort) as sort:
+            self.watcher.run_once()
+
+            # a burst of writes restarts the debounce
+            self.now = 0.5
+            self.write('alpha.yaml', 'alpha: charlie\n')
+            self.watcher.run_once()
+
+            self.now = 1.2
+            self.watcher.run_once()
+            assert sort.call_count == 0
+
+            self.now = 1.5
+            assert self.watcher.run_once() == (False, [f'{path} is not OpenAPI file.'])
+            assert sort.call_count == 1
+            assert self.errors == [f'{path} is not OpenAPI file.']
+
+    def test_removed(self):
+        path = self.write('alpha.yaml', OPENAPI_STR)
+
+        self.watcher.run_once()
+        self.now = 1.0
+        self.watcher.run_once()
+
+        os.remove(path)
+        self.watcher.run_once()
+
+        assert path not in self.watcher.states
+        assert path not in self.watcher.digests
+
+    def test_run_once_not_utf_8(self):
+        latin_path = os.path.join(self.tmpdir, 'latin.yaml')
+        with open(latin_path, mode='wb') as f:
+            f.write('openapi: 3.0.0\ninfo:\n  title: café\n'.encode('latin_1'))
+        path = self.write('alpha.yaml', OPENAPI_STR)
+
+        self.watcher.run_once()
+        self.now = 1.0
+        assert self.watcher.run_once() == (False, [f'{latin_path} is not UTF-8 file.'])
+
+        # the other file is still sorted and the watcher keeps polling
+        with open(path, mode='r', encoding='utf_8') as f:
+            assert f.read() != OPENAPI_STR
+
+        self.now = 5.0
+        assert self.watcher.run_once() == (True, [])
+
+    def test_removed_while_sorting(self):
+        path = self.write('alpha.yaml', OPENAPI_STR)
+        sort = OpenApiSorter.sort
+
+        def sort_and_remove(**kwargs):
+            result = sort(**kwargs)
+            os.remove(path)
+            return result
+
+        self.watcher.run_once()
+        self.now = 1.0
+        with patch.object(OpenApiSorter, 'sort', side_effect=sort_and_remove):
+            assert self.watcher.run_once() == (True, [])
+
+        assert path not in self.watcher.states
+        assert path not in self.watcher.digests
+
+    def test_run_once_sort_raises(self):
+        self.write('alpha.yaml', OPENAPI_STR)
+
+        self.watcher.run_once()
+        self.now = 1.0
+        with patch.object(OpenApiSorter, 'sort', side_effect=PermissionError('denied')):
+            assert self.watcher.run_once() == (False, ['denied'])
+
+        assert self.errors == ['denied']